@@ -0,0 +1,62 @@
+""" Slice latency of a C-ordered .npy memmap against the same volume stored
+as a bricked .bvol file (raw and gzip bricks), for each slice axis. The
+pages of the files are evicted before every read (posix_fadvise, Linux), so
+the reads hit the disk as in a first visit: the z-slices of the memmap
+touch every page of the file, the bricked file reads about the same bytes
+in every direction. The file is reopened for every read, mapped pages are
+not evicted.
+
+Usage: python benchmark_bricks.py [volume.npy]
+Without arguments, a synthetic 384^3 float32 volume is used.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from vispy_canvas.volume_bricks import BrickSource, write_bricks
+from vispy_canvas.volume_source import MemmapSource
+
+N_READS = 8
+
+if __name__ == '__main__':
+  directory = tempfile.mkdtemp()
+  if len(sys.argv) > 1:
+    filename = sys.argv[1]
+  else:
+    filename = os.path.join(directory, 'benchmark.npy')
+    x = np.linspace(0, 30, 384, dtype=np.float32)
+    vol = np.sin(x[:, None, None] + x[None, :, None] * 0.5 + x[None, None, :])
+    vol[:, :64] = 0 # dead traces
+    np.save(filename, vol)
+    del vol
+
+  files = [('npy', MemmapSource.open, filename)]
+  for codec in ('none', 'gzip'):
+    output = os.path.join(directory, 'benchmark_{}.bvol'.format(codec))
+    write_bricks(np.load(filename, mmap_mode='r'), output, codec=codec)
+    print('{}: {:.1f} MB, bricks {}'.format(
+      output, os.path.getsize(output) / 2**20,
+      BrickSource.open(output).data.kinds))
+    files.append(('bvol ' + codec, BrickSource.open, output))
+
+  rng = np.random.default_rng(0)
+  print('{:>10} {:>10} {:>10} {:>10}  (ms per slice, cold page cache)'
+        .format('file', 'x', 'y', 'z'))
+  for label, open_source, path in files:
+    fd = os.open(path, os.O_RDONLY)
+    shape = open_source(path).shape
+    row = []
+    for axis in range(3):
+      elapsed = 0.
+      for pos in rng.integers(0, shape[axis], N_READS):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        start = time.perf_counter()
+        source = open_source(path)
+        np.array(source.get_slice(axis, pos)) # a memmap slice is lazy
+        elapsed += time.perf_counter() - start
+        del source
+      row.append(elapsed / N_READS * 1e3)
+    os.close(fd)
+    print('{:>10} {:>10.2f} {:>10.2f} {:>10.2f}'.format(label, *row))
@@ -0,0 +1,59 @@
+""" Slice latency of a chunked HDF5 dataset against the size of its chunk
+cache, for each slice axis. The slice moves by one sample between reads, as
+when dragging it: with a cache holding a full slice, the next positions
+within the same chunks are served without decompressing them again.
+
+Usage: python benchmark_hdf5_cache.py [file.h5 dataset]
+Without arguments, a synthetic 256^3 gzip dataset with 64^3 chunks is used.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy as np
+from vispy_canvas.hdf5_cache import (DEFAULT_CACHE, chunk_cache_config,
+                                     format_cache_config, open_hdf5_dataset)
+
+N_STEPS = 32
+
+if len(sys.argv) > 2:
+  filename, name = sys.argv[1], sys.argv[2]
+else:
+  filename = os.path.join(tempfile.mkdtemp(), 'benchmark.h5')
+  name = 'seismic'
+  rng = np.random.default_rng(0)
+  with h5py.File(filename, 'w') as f:
+    f.create_dataset(name, data=rng.standard_normal((256, 256, 256),
+                     dtype=np.float32), chunks=(64, 64, 64),
+                     compression='gzip')
+
+f = h5py.File(filename, 'r')
+dset = f[name]
+auto = chunk_cache_config(dset.shape, dset.chunks, dset.dtype.itemsize)
+del dset # closed, so each configuration below opens it with its own cache
+print(format_cache_config(name, auto))
+
+caches = [('1 MB', DEFAULT_CACHE)] # the HDF5 1.x default
+for mb in (4, 16, 64, 256):
+  nbytes = mb << 20
+  caches.append(('{} MB'.format(mb),
+                 {'nbytes': nbytes, 'nslots': auto['nslots'], 'w0': 0.75}))
+caches.append(('auto', 'auto'))
+
+print('{:>10} {:>10} {:>10} {:>10}  (ms per slice, {} steps)'.format(
+  'cache', 'x', 'y', 'z', N_STEPS))
+for label, cache in caches:
+  data, config = open_hdf5_dataset(f, name, cache)
+  row = []
+  for axis in range(3):
+    start_pos = data.shape[axis] // 2 - N_STEPS // 2
+    index = [slice(None)] * 3
+    start = time.perf_counter()
+    for pos in range(start_pos, start_pos + N_STEPS):
+      index[axis] = pos
+      data[tuple(index)]
+    row.append((time.perf_counter() - start) / N_STEPS * 1e3)
+  print('{:>10} {:>10.2f} {:>10.2f} {:>10.2f}'.format(label, *row))
+  del data
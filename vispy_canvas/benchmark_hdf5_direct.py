@@ -0,0 +1,47 @@
+""" Compare the slice latency of plain HDF5 hyperslab reads (HDF5Source) and
+parallel direct-chunk reads (DirectChunkHDF5Source) on a gzip dataset. The
+positions are one chunk apart, so no read is served by a cache.
+
+Usage: python benchmark_hdf5_direct.py [file.h5 dataset]
+Without arguments, a synthetic 256^3 gzip dataset with 32^3 chunks is used:
+a slice of any direction touches 64 chunks.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import h5py
+import numpy as np
+from vispy_canvas.hdf5_direct import DirectChunkHDF5Source
+from vispy_canvas.volume_source import HDF5Source, get_chunk_executor
+
+if len(sys.argv) > 2:
+  filename, name = sys.argv[1], sys.argv[2]
+else:
+  filename = os.path.join(tempfile.mkdtemp(), 'benchmark.h5')
+  name = 'seismic'
+  # Smooth data compresses like seismic, unlike white noise.
+  x = np.linspace(0, 20, 256, dtype=np.float32)
+  vol = np.sin(x[:, None, None] + x[None, :, None] * 0.5 + x[None, None, :])
+  with h5py.File(filename, 'w') as f:
+    f.create_dataset(name, data=vol, chunks=(32, 32, 32), compression='gzip')
+
+f = h5py.File(filename, 'r')
+sources = [('hyperslab', HDF5Source(f[name])),
+           ('direct', DirectChunkHDF5Source(f[name]))]
+print('{} {} chunks {} {}, {} chunk threads'.format(
+  name, f[name].shape, f[name].chunks, f[name].compression,
+  get_chunk_executor()._max_workers))
+print('{:>10} {:>10} {:>10} {:>10}  (ms per slice)'.format(
+  'reader', 'x', 'y', 'z'))
+for label, source in sources:
+  row = []
+  for axis in range(3):
+    step = f[name].chunks[axis]
+    positions = range(0, source.shape[axis], step)
+    start = time.perf_counter()
+    for pos in positions:
+      source.get_slice(axis, pos)
+    row.append((time.perf_counter() - start) / len(positions) * 1e3)
+  print('{:>10} {:>10.2f} {:>10.2f} {:>10.2f}'.format(label, *row))
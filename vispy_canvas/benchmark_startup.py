@@ -0,0 +1,65 @@
+""" Measure the startup of vispy_canvas: the import time of the package (in
+fresh interpreters, for a few typical entry points), then the construction of
+a SeismicCanvas and the time to its first frame with a synthetic volume.
+
+Usage: python benchmark_startup.py [n_imports] [size]
+"""
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+N_IMPORTS = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 256
+
+# What a script imports first, timed in a new interpreter each run.
+ENTRY_POINTS = [
+  'import vispy_canvas',
+  'from vispy_canvas import VolumeSource',
+  'from vispy_canvas import volume_slices',
+  'from vispy_canvas import SeismicCanvas, Colorbar',
+]
+TIMER = ('import time; t = time.perf_counter(); {}; '
+         'print(time.perf_counter() - t)')
+
+print('{:>44} {:>10} {:>10}'.format('import (fresh interpreter)', 'min ms',
+                                    'median ms'))
+for statement in ENTRY_POINTS:
+  times = [float(subprocess.check_output(
+             [sys.executable, '-W', 'ignore', '-c', TIMER.format(statement)]))
+           for _ in range(N_IMPORTS)]
+  print('{:>44} {:>10.1f} {:>10.1f}'.format(
+    statement, min(times) * 1e3, np.median(times) * 1e3))
+
+# Canvas construction and first frame, in this process.
+from vispy import app
+from vispy_canvas import SeismicCanvas, XYZAxis, volume_slices
+
+rng = np.random.default_rng(0)
+volume = rng.standard_normal((SIZE, SIZE, SIZE), dtype=np.float32)
+
+start = time.perf_counter()
+nodes = volume_slices(volume, x_pos=SIZE // 2, y_pos=SIZE // 2,
+                      z_pos=SIZE // 2, clims=(-3, 3))
+t_slices = time.perf_counter() - start
+
+start = time.perf_counter()
+canvas = SeismicCanvas(visual_nodes=nodes + [XYZAxis()])
+t_canvas = time.perf_counter() - start
+
+drawn = []
+canvas.events.draw.connect(lambda event: drawn.append(time.perf_counter()),
+                           position='last')
+start = time.perf_counter()
+canvas.show()
+while not drawn:
+  app.process_events()
+t_frame = drawn[0] - start
+canvas.close()
+
+print('{}^3 volume'.format(SIZE))
+print('{:>44} {:>10.1f}'.format('volume_slices (ms)', t_slices * 1e3))
+print('{:>44} {:>10.1f}'.format('SeismicCanvas construction (ms)',
+                                t_canvas * 1e3))
+print('{:>44} {:>10.1f}'.format('show to first frame (ms)', t_frame * 1e3))
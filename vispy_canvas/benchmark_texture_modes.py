@@ -0,0 +1,36 @@
+""" Compare the texture modes of AxisAlignedImage: bytes uploaded and latency
+of one slice update, for a multi-attribute overlay of large slices. The
+latency is the CPU side of the update (read, quantize, set_data); the bytes
+are what the next draw uploads to the GPU.
+
+Usage: python benchmark_texture_modes.py [n_attributes] [size]
+"""
+import sys
+import time
+
+import numpy as np
+from vispy_canvas import volume_slices
+
+N_ATTRIBUTES = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+SIZE = int(sys.argv[2]) if len(sys.argv) > 2 else 1024
+N_STEPS = 50
+
+# Thin volumes along x, with large x slices (SIZE x SIZE).
+rng = np.random.default_rng(0)
+volumes = [rng.standard_normal((N_STEPS + 1, SIZE, SIZE), dtype=np.float32)
+           for _ in range(N_ATTRIBUTES)]
+clims = [(-3, 3)] * N_ATTRIBUTES
+cmaps = ['grays'] + ['viridis'] * (N_ATTRIBUTES - 1)
+
+print('{} attributes, {}x{} slices, {} updates'.format(
+  N_ATTRIBUTES, SIZE, SIZE, N_STEPS))
+print('{:>8} {:>16} {:>12}'.format('mode', 'bytes/update', 'ms/update'))
+for mode in ('float32', 'uint16', 'uint8'):
+  image, = volume_slices(volumes, x_pos=0, cmaps=cmaps, clims=clims,
+                         texture_mode=mode)
+  n_bytes = sum(img._data.nbytes for img in image.overlaid_images)
+  start = time.perf_counter()
+  for pos in range(1, N_STEPS + 1):
+    image._update_location(pos, coarse=False)
+  elapsed = (time.perf_counter() - start) / N_STEPS
+  print('{:>8} {:>16,} {:>12.2f}'.format(mode, n_bytes, elapsed * 1e3))
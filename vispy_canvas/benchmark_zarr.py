@@ -0,0 +1,53 @@
+""" Slice latency of a Zarr array read by Zarr (array[index], the chunks
+fetched one after the other) and by ZarrSource (the chunks fetched and
+decoded concurrently), for a directory and a zip store. The positions are
+one chunk apart and no chunk cache is used, so every read goes to the store.
+
+Usage: python benchmark_zarr.py [store.zarr|store.zip [array path]]
+Without arguments, a synthetic 256^3 float32 array with 32^3 chunks is
+written to both stores: a slice of any direction touches 64 chunks.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from vispy_canvas.volume_convert import convert_volume
+from vispy_canvas.volume_source import ZarrSource, get_chunk_executor
+
+if __name__ == '__main__':
+  if len(sys.argv) > 1:
+    stores = [(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)]
+  else:
+    directory = tempfile.mkdtemp()
+    x = np.linspace(0, 20, 256, dtype=np.float32)
+    vol = np.sin(x[:, None, None] + x[None, :, None] * 0.5 + x[None, None, :])
+    stores = []
+    for name in ('benchmark.zarr', 'benchmark.zip'):
+      output = os.path.join(directory, name)
+      convert_volume(vol, output, chunk=32, codec='gzip')
+      stores.append((output, 'seismic'))
+
+  print('{} chunk fetching threads'.format(get_chunk_executor()._max_workers))
+  print('{:>24} {:>10} {:>10} {:>10}  (ms per slice)'.format(
+    'store / reader', 'x', 'y', 'z'))
+  for store, path in stores:
+    source = ZarrSource.open(store, path=path, cache_bytes=None)
+
+    def read_zarr(axis, pos):
+      index = [slice(None)] * 3
+      index[axis] = pos
+      return source.data[tuple(index)]
+
+    for label, read in (('zarr', read_zarr),
+                        ('concurrent', source.get_slice)):
+      row = []
+      for axis in range(3):
+        positions = range(0, source.shape[axis], source.data.chunks[axis])
+        start = time.perf_counter()
+        for pos in positions:
+          read(axis, pos)
+        row.append((time.perf_counter() - start) / len(positions) * 1e3)
+      print('{:>24} {:>10.2f} {:>10.2f} {:>10.2f}'.format(
+        os.path.basename(store) + ' / ' + label, *row))
@@ -38,6 +38,11 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     install_requires=['numpy', 'vispy', 'PyQt5', 'PyOpenGL', 'matplotlib'],
+    extras_require={'hdf5': ['h5py'], 'zarr': ['zarr<3', 'numcodecs'],
+                    'blosc': ['hdf5plugin']},
+    entry_points={
+        'console_scripts': ['vispy_canvas=vispy_canvas.__main__:main'],
+    },
 
     zip_safe=True,
 
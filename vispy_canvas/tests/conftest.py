@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pytest
+
+# No display is needed: the Qt tests run on the offscreen platform.
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def vispy_app():
+  """ The vispy application on the PyQt5 backend, for the timers and the
+  queued Qt signals. Process its events with vispy_app.process_events().
+  """
+  pytest.importorskip('PyQt5')
+  from vispy import app
+  return app.use_app('pyqt5')
+
+
+@pytest.fixture(autouse=True)
+def stats_dir(tmp_path, monkeypatch):
+  """ The statistics sidecar files of the tests go to a temporary directory
+  (see volume_stats.STATS_DIR), not to the user cache.
+  """
+  from vispy_canvas import volume_stats
+  directory = str(tmp_path / 'stats')
+  monkeypatch.setattr(volume_stats, 'STATS_DIR', directory)
+  return directory
+
+
+@pytest.fixture(scope='session')
+def volume():
+  """ A factory of random float32 volumes, volume(shape, seed=0): the same
+  shape and seed give the same volume.
+  """
+  def make(shape, seed=0):
+    vol = np.random.default_rng(seed).standard_normal(shape)
+    return vol.astype(np.float32)
+  return make
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+import pytest
+
+from vispy_canvas.axis_aligned_image import AxisAlignedImage
+
+
+@pytest.mark.parametrize('texture_mode', ['float32', 'uint16', 'uint8'])
+def test_slices_reuse_gpu_scaled_buffers(texture_mode, volume):
+  image = AxisAlignedImage([volume((30, 20, 10))], axis='x', pos=3, limit=(0, 29),
+                           clims=[(-2, 2)], texture_mode=texture_mode)
+  # Scaled by the clim on the GPU: the buffer is uploaded as it is.
+  assert type(image._texture).__name__ == 'GPUScaledTexture2D'
+  data = image._data
+  assert data.dtype == np.dtype(texture_mode)
+  image._update_location(7)
+  assert image._data is data
+
+
+@pytest.mark.parametrize('texture_mode', ['uint16', 'uint8'])
+def test_quantized_buffer(texture_mode):
+  image = AxisAlignedImage([np.zeros((4, 3, 2), np.float32)], axis='x',
+                           clims=[(-2, 2)], texture_mode=texture_mode)
+  q_max = np.iinfo(texture_mode).max
+  data = np.array([[-5, -2, 0, 2], [5, np.nan, 1, -1]], np.float32)
+  buf = image._to_buffer(0, data, image.flips)
+  assert buf.dtype == np.dtype(texture_mode)
+  # The clim maps to [0, q_max], clipped outside; NaN is the clim minimum.
+  expected = np.rint(np.array([[0, 0, 0.5, 1], [1, 0, 0.75, 0.25]]) * q_max)
+  assert np.array_equal(buf, expected)
+  # A constant clim maps everything to 0.
+  image.clims[0] = (1, 1)
+  assert not image._to_buffer(0, data, image.flips).any()
+
+
+def test_float32_buffer_is_a_copy():
+  image = AxisAlignedImage([np.zeros((4, 3, 2), np.float32)], axis='x',
+                           clims=[(-2, 2)])
+  data = np.array([[-5, np.nan], [1, 2]], np.float64)
+  buf = image._to_buffer(0, data, image.flips)
+  assert buf.dtype == np.float32
+  assert np.array_equal(buf, data, equal_nan=True)
+  flipped = image._to_buffer(0, data, (not image.flips[0], image.flips[1]))
+  assert np.array_equal(flipped, data[::-1], equal_nan=True)
+
+
+def test_coarse_level(volume):
+  from vispy_canvas.volume_slices import build_pyramid
+  vol = volume((8, 256, 128))
+  image = AxisAlignedImage([vol], axis='x', limit=(0, 7), clims=[(-2, 2)],
+                           lod_funcs=[[level] for level in
+                                      build_pyramid(vol, 2)])
+  for lod_pixels, level in ((256 * 128, 0), (8192, 1), (2048, 2), (100, 2)):
+    image.lod_pixels = lod_pixels
+    assert image._coarse_level() == level
+  # A move shows the coarse level, the full resolution otherwise.
+  image.lod_pixels = 8192
+  image._update_location(4)
+  assert image.level == 1 and image._data.shape == (128, 64)
+  image._update_location(4, coarse=False)
+  assert image.level == 0 and image._data.shape == (256, 128)
+
+
+def _slice(limit=(0, 29)):
+  vol = np.arange(30 * 4 * 3, dtype=np.float32).reshape(30, 4, 3)
+  return AxisAlignedImage([vol], axis='x', pos=3, limit=limit,
+                          clims=[(0, vol.max())])
+
+
+def _wait_drag(vispy_app, image):
+  deadline = time.time() + 5
+  while image._drag_timer.running and time.time() < deadline:
+    vispy_app.process_events()
+    time.sleep(0.001)
+
+
+def test_drag_updates_are_skipped_and_merged(vispy_app):
+  image = _slice()
+  applied = image.applied_updates
+  image._drag_to(5) # applied at once
+  image._drag_to(6)
+  image._drag_to(7) # merged with 6
+  image._drag_to(7) # unchanged
+  image._drag_to(5)
+  assert image.pos == 5
+  _wait_drag(vispy_app, image)
+  assert image.pos == 5 and image._pending_pos is None
+  image._drag_to(5) # unchanged
+  image._drag_to(9)
+  _wait_drag(vispy_app, image)
+  assert image.pos == 9
+  assert image._data[0, 0] == 9 * 12
+  stats = image.update_stats()
+  assert stats['applied'] - applied == 2
+  assert stats['skipped'] == 2 and stats['merged'] == 2
+  assert stats['fetches_avoided'] == 4
+
+
+def test_explicit_move_wins_over_drag(vispy_app):
+  image = _slice()
+  image._drag_to(5)
+  image._drag_to(8) # pending
+  image._update_location(12) # e.g. a slider, while dragging
+  _wait_drag(vispy_app, image)
+  assert image.pos == 12
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+import pytest
+
+from vispy_canvas.camera_mixin import AnimationClock, InertiaTurntableCamera
+
+
+class _Animated(object):
+  """ Animated for n ticks, recording the dt of each. """
+  def __init__(self, n):
+    self.n = n
+    self.dts = []
+
+  def animate(self, dt):
+    self.dts.append(dt)
+    return len(self.dts) < self.n
+
+
+def test_camera_animate_rotates_and_decays():
+  camera = InertiaTurntableCamera(azimuth=0., elevation=0.,
+                                  inertia_factor=0.9, min_speed=1.)
+  camera.velocity[:] = (60., 30.)
+  assert camera.animate(0.1)
+  assert camera.azimuth == pytest.approx(6.)
+  assert camera.elevation == pytest.approx(3.)
+  # The decay is per 1/60 s, whatever the frame rate.
+  assert np.allclose(camera.velocity, np.array([60., 30.]) * 0.9 ** 6)
+  velocity = camera.velocity.copy()
+  camera.animate(1 / 60.)
+  camera.animate(1 / 60.)
+  assert np.allclose(camera.velocity, velocity * 0.9 ** 2)
+
+
+def test_camera_animate_stops_under_min_speed():
+  camera = InertiaTurntableCamera(inertia_factor=0.5, min_speed=10.)
+  camera.velocity[:] = (12., 0.)
+  assert not camera.animate(1 / 60.)
+  assert not camera.velocity.any()
+  azimuth = camera.azimuth
+  assert not camera.animate(1 / 60.)
+  assert camera.azimuth == azimuth
+
+
+def test_clock_removes_finished_objects(vispy_app):
+  clock = AnimationClock(interval=1.)
+  short, long = _Animated(1), _Animated(3)
+  clock.start(short)
+  clock.start(long)
+  clock.start(long) # once
+  assert clock.running and clock._timer.running
+  clock._tick()
+  assert clock._animated == [long]
+  clock._tick()
+  clock._tick()
+  assert not clock.running and not clock._timer.running
+  assert len(short.dts) == 1 and len(long.dts) == 3
+  assert all(dt >= 0 for dt in long.dts)
+  # Restarted on demand.
+  clock.start(short)
+  assert clock._timer.running
+  clock.stop(short)
+  assert not clock._timer.running
+
+
+def test_clock_ticks_with_elapsed_time(vispy_app):
+  clock = AnimationClock(interval=0.01)
+  animated = _Animated(3)
+  clock.start(animated)
+  deadline = time.time() + 5
+  while clock.running and time.time() < deadline:
+    vispy_app.process_events()
+    time.sleep(0.005)
+  assert not clock.running
+  assert len(animated.dts) == 3
+  # The dt are the real elapsed times, about the interval.
+  assert all(dt > 0.002 for dt in animated.dts)
@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODE = '''
+import sys
+from vispy_canvas.colorbar_MPL import Colorbar
+bar = Colorbar(size=(200, 10), cmap='viridis', clim=(-1, 2),
+               label_color='#000000', border_color=(0, 0, 0))
+assert bar._data.shape[-1] == 4
+print('matplotlib' in sys.modules)
+'''
+
+
+def _imports_matplotlib(home):
+  """ Create a colorbar in a fresh interpreter with its disk cache in home,
+  return whether Matplotlib was imported.
+  """
+  env = dict(os.environ, PYTHONPATH=ROOT, HOME=str(home))
+  out = subprocess.run([sys.executable, '-c', CODE], env=env, check=True,
+                       stdout=subprocess.PIPE, universal_newlines=True)
+  return out.stdout.split()[-1] == 'True'
+
+
+def test_cache_hit_skips_matplotlib(tmp_path):
+  assert _imports_matplotlib(tmp_path) # rendered
+  assert os.listdir(str(tmp_path / '.cache' / 'vispy_canvas' / 'colorbars'))
+  assert not _imports_matplotlib(tmp_path) # read from the disk cache
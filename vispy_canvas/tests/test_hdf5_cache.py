@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+h5py = pytest.importorskip('h5py')
+
+from vispy_canvas.hdf5_cache import chunk_cache_config, next_prime, \
+  open_hdf5_dataset
+from vispy_canvas.volume_source import ArraySource, HDF5Source
+
+
+def test_chunk_cache_holds_a_slice():
+  config = chunk_cache_config((100, 90, 70), (32, 32, 32), 4)
+  chunk_bytes = 32**3 * 4
+  assert config['slice_chunks'] == {0: 9, 1: 12, 2: 12}
+  assert config['nbytes'] == 12 * chunk_bytes
+  assert all(config['fits'].values())
+  assert config['nslots'] == next_prime(1200)
+  small = chunk_cache_config((100, 90, 70), (32, 32, 32), 4,
+                             max_bytes=4 * chunk_bytes)
+  assert small['nbytes'] == 4 * chunk_bytes and not any(
+    small['fits'].values())
+
+
+def _write(tmp_path, vol, **kwargs):
+  filename = str(tmp_path / 'vol.h5')
+  with h5py.File(filename, 'w') as f:
+    f.create_dataset('seismic', data=vol, **kwargs)
+  return filename
+
+
+def test_open_sets_the_cache(tmp_path):
+  vol = np.zeros((100, 90, 70), dtype=np.float32)
+  filename = _write(tmp_path, vol, chunks=(32, 32, 32), compression='gzip')
+  with h5py.File(filename, 'r') as f:
+    dset, config = open_hdf5_dataset(f, 'seismic')
+    nslots, nbytes, w0 = dset.id.get_access_plist().get_chunk_cache()
+    assert (nslots, nbytes, w0) == (config['nslots'], config['nbytes'],
+                                    config['w0'])
+  with h5py.File(_write(tmp_path, vol), 'r') as f:
+    assert open_hdf5_dataset(f, 'seismic')[1] is None # contiguous
+
+
+def test_source_matches_array(tmp_path, volume):
+  vol = volume((50, 40, 30))
+  filename = _write(tmp_path, vol, chunks=(16, 16, 16), compression='gzip')
+  source = HDF5Source.open(filename, 'seismic').flipped('z')
+  reference = ArraySource(vol).flipped('z')
+  for axis in 'xyz':
+    for pos in (0, 17, 29):
+      assert np.array_equal(source.get_slice(axis, pos),
+                            reference.get_slice(axis, pos))
+    for positions in ([3, 1, 2], [25, 0, 9, 0]):
+      assert np.array_equal(source.get_slices(axis, positions),
+                            reference.get_slices(axis, positions))
+
+
+@pytest.mark.parametrize('lazy', [True, False])
+def test_file_closed_on_error(tmp_path, monkeypatch, lazy):
+  from vispy_canvas import volume_slices_hdf5 as module
+  filename = _write(tmp_path, np.zeros((8, 8, 8), np.float32))
+  files, File = [], h5py.File
+  def open_file(*args, **kwargs):
+    files.append(File(*args, **kwargs))
+    return files[-1]
+  monkeypatch.setattr(module.h5py, 'File', open_file)
+  with pytest.raises(KeyError):
+    module.volume_slices_hdf5(filename, ['seismic', 'missing'],
+                              cmaps=['grays'] * 2, clims=[(0, 1)] * 2,
+                              lazy=lazy)
+  assert len(files) == 1 and not files[0].id.valid
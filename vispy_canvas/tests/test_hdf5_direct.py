@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+h5py = pytest.importorskip('h5py')
+
+from vispy_canvas.hdf5_direct import DirectChunkHDF5Source, _lzf_decompress
+from vispy_canvas.volume_source import HDF5Source
+
+FILTERS = {
+  'gzip': {'compression': 'gzip', 'shuffle': True, 'fletcher32': True},
+  'plain': {},
+  'lzf': {'compression': 'lzf'},
+}
+
+
+@pytest.fixture(scope='module')
+def h5file(tmp_path_factory, volume):
+  vol = volume((100, 90, 70), seed=1)
+  filename = str(tmp_path_factory.mktemp('hdf5') / 'vol.h5')
+  with h5py.File(filename, 'w') as f:
+    for name, kwargs in FILTERS.items():
+      f.create_dataset(name, data=vol, chunks=(32, 32, 32), **kwargs)
+    # Unwritten chunks read as the fill value.
+    dset = f.create_dataset('sparse', shape=vol.shape, dtype='f4',
+                            chunks=(32, 32, 32), compression='gzip',
+                            fillvalue=7)
+    dset[:32, :32, :32] = 1
+    f.create_dataset('contiguous', data=vol)
+  with h5py.File(filename, 'r') as f:
+    yield f
+
+
+@pytest.mark.parametrize('name', list(FILTERS) + ['sparse', 'contiguous'])
+def test_matches_hyperslab_reads(h5file, name):
+  source = DirectChunkHDF5Source(h5file[name]).flipped('z')
+  reference = HDF5Source(h5file[name]).flipped('z')
+  # lzf chunks are decoded here only with python-lzf, else read by HDF5.
+  direct = name != 'contiguous' and (
+    name != 'lzf' or _lzf_decompress() is not None)
+  assert source.direct == direct
+  for axis in 'xyz':
+    for pos in (0, 33, 69):
+      assert np.array_equal(source.get_slice(axis, pos),
+                            reference.get_slice(axis, pos))
+  assert np.array_equal(source.get_slices('z', [5, 3, 40]),
+                        reference.get_slices('z', [5, 3, 40]))
+  assert np.array_equal(source.get_slices('x', [1, 99]),
+                        reference.get_slices('x', [1, 99]))
+  assert np.array_equal(source.get_region('y', 10, (5, 80), (3, 60), 4),
+                        reference.get_region('y', 10, (5, 80), (3, 60), 4))
+
+
+@pytest.mark.parametrize('step', [1, 3, 32, 40])
+def test_strided_region_skips_chunks(h5file, step):
+  source = DirectChunkHDF5Source(h5file['gzip'])
+  reference = HDF5Source(h5file['gzip'])
+  decoded = []
+  decode = source._decode_chunk
+  source._decode_chunk = lambda mask, raw: decoded.append(1) or decode(
+    mask, raw)
+  region = source.get_region('z', 10, (0, 100), (5, 90), step)
+  assert np.array_equal(region,
+                        reference.get_region('z', 10, (0, 100), (5, 90), step))
+  # Only the chunks holding a kept sample are decoded.
+  rows = {k // 32 for k in range(0, 100, step)}
+  cols = {k // 32 for k in range(5, 90, step)}
+  assert len(decoded) == len(rows) * len(cols)
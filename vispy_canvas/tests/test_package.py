@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code):
+  """ Run code in a fresh interpreter: the imports done by other tests must
+  not hide the import order under test.
+  """
+  env = dict(os.environ, PYTHONPATH=ROOT)
+  subprocess.run([sys.executable, '-c', code], env=env, check=True)
+
+
+@pytest.mark.parametrize('first', [
+  'vispy_canvas.volume_slices', 'vispy_canvas.volume_slices_hdf5',
+  'vispy_canvas.volume_slices_hdf5_pilot', 'vispy_canvas.batch_render'])
+def test_volume_slices_is_the_function(first):
+  _run('import inspect, {}\n'
+       'import vispy_canvas\n'
+       'from vispy_canvas import volume_slices\n'
+       'assert inspect.isfunction(volume_slices), volume_slices\n'
+       'assert inspect.isfunction(vispy_canvas.volume_slices)\n'
+       .format(first))
+
+
+def test_lazy_exports():
+  _run('import sys, vispy_canvas\n'
+       'assert "vispy.scene" not in sys.modules\n'
+       'from vispy_canvas import SliceCache\n'
+       'assert "vispy_canvas.volume_slices" not in sys.modules\n')
@@ -0,0 +1,53 @@
+import gc
+
+import numpy as np
+
+from vispy_canvas.slice_cache import SliceCache
+from vispy_canvas.volume_source import ArraySource, SliceFunc
+
+
+def test_slice_func_matches_source(volume):
+  vol = volume((20, 16, 12))
+  cache = SliceCache()
+  source = ArraySource(vol).flipped('z')
+  reference = ArraySource(vol).flipped('z')
+  for axis in 'xyz':
+    func = SliceFunc(source, axis, cache=cache)
+    for pos in (0, 5, 5, 11):
+      image = func(pos)
+      expected = reference.get_slice(axis, pos, orient=False)
+      assert np.array_equal(image, expected)
+  assert cache.hits == 3 and cache.misses == 9
+
+
+def test_eviction_is_lru():
+  image = np.zeros((10, 10), dtype=np.float32)
+  cache = SliceCache(max_bytes=2 * image.nbytes)
+  cache.put((0, 'x', 0), image)
+  cache.put((0, 'x', 1), image)
+  cache.get((0, 'x', 0))
+  cache.put((0, 'x', 2), image)
+  assert (0, 'x', 0) in cache and (0, 'x', 1) not in cache
+  assert cache.evictions == 1 and cache.nbytes == 2 * image.nbytes
+
+
+def test_released_volume_is_discarded(volume):
+  vol = volume((20, 16, 12))
+  cache = SliceCache()
+  SliceFunc(ArraySource(vol), 'x', cache=cache)(3)
+  assert len(cache) == 1
+  del vol
+  gc.collect()
+  assert len(cache) == 0
+
+
+def test_forget_releases_held_volume():
+  vol = [[[1.]]] # a list cannot be weak-referenced, the cache holds it
+  cache = SliceCache()
+  vol_id = cache.volume_id(vol)
+  cache.put((vol_id, 'x', 0), np.ones((1, 1)))
+  cache.forget(vol)
+  assert len(cache) == 0 and vol_id not in cache._volumes
+  cache.volume_id(vol)
+  cache.clear()
+  assert vol_id not in cache._volumes
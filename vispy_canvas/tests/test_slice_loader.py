@@ -0,0 +1,80 @@
+import threading
+import time
+
+import pytest
+
+QtCore = pytest.importorskip('PyQt5.QtCore')
+
+from vispy_canvas.slice_loader import SliceLoader
+
+
+class _Node(object):
+  """ The part of AxisAlignedImage used by the loader. The first read waits
+  for the release event; fail is the set of positions that raise.
+  """
+  def __init__(self, fail=()):
+    self.limit = None
+    self.fail = set(fail)
+    self.reads = []
+    self.updates = []
+    self.started = threading.Event()
+    self.release = threading.Event()
+
+  def read_images(self, pos):
+    self.reads.append(pos)
+    self.started.set()
+    self.release.wait(5)
+    if pos in self.fail:
+      raise IOError('cannot read {}'.format(pos))
+    return [pos]
+
+  def _update_location(self, pos, images=None):
+    self.updates.append((pos, images))
+
+  def update(self):
+    pass
+
+
+def _wait(vispy_app, loader, node):
+  deadline = time.time() + 5
+  while loader.pending(node) and time.time() < deadline:
+    vispy_app.process_events()
+    time.sleep(0.001)
+  vispy_app.process_events() # deliver the last queued signals
+  assert not loader.pending(node)
+
+
+def test_latest_wins(vispy_app):
+  loader = SliceLoader(max_workers=1)
+  node = _Node()
+  loader.request(node, 0)
+  assert node.started.wait(5)
+  for pos in range(1, 1000):
+    loader.request(node, pos)
+  node.release.set()
+  _wait(vispy_app, loader, node)
+  assert node.reads == [0, 999]
+  assert node.updates == [(0, [0]), (999, [999])]
+  assert loader.requested == 1000 and loader.read == 2
+  loader.shutdown(wait=True)
+
+
+def test_failed_read_goes_on_with_newer_request(vispy_app):
+  loader = SliceLoader(max_workers=1)
+  failures = []
+  loader.failed.connect(lambda node, pos, err: failures.append((pos, err)))
+  node = _Node(fail=[5])
+  loader.request(node, 5)
+  assert node.started.wait(5)
+  loader.request(node, 6) # while 5 is being read
+  node.release.set()
+  _wait(vispy_app, loader, node)
+  assert node.reads == [5, 6]
+  assert node.updates == [(6, [6])]
+  assert [pos for pos, _ in failures] == [5]
+  assert isinstance(failures[0][1], IOError)
+  # A failed read does not block the next requests.
+  loader.request(node, 7)
+  _wait(vispy_app, loader, node)
+  assert node.updates[-1] == (7, [7])
+  loader.shutdown(wait=True)
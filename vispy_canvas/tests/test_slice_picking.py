@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from vispy_canvas.axis_aligned_image import AxisAlignedImage
+from vispy_canvas.slice_picking import pick_visual, pickable_nodes
+from vispy_canvas.xyz_axis import XYZAxis
+
+
+@pytest.fixture
+def view(vispy_app):
+  """ A view looking at the center of two x slices of a (20, 16, 12)
+  volume, at x=5 and x=15 (view.slices).
+  """
+  from vispy import scene
+  canvas = scene.SceneCanvas(size=(400, 300))
+  view = canvas.central_widget.add_view()
+  view.camera = scene.cameras.TurntableCamera(
+    fov=45, elevation=10, center=(10, 8, 6), scale_factor=40)
+  vol = np.zeros((20, 16, 12), np.float32)
+  view.unfreeze()
+  view.slices = [AxisAlignedImage([vol], axis='x', pos=pos, limit=(0, 19),
+                                  clims=[(0, 1)]) for pos in (5, 15)]
+  for image in view.slices:
+    image.parent = view.scene
+  yield view
+  canvas.close()
+
+
+def _center(view):
+  """ The canvas position of the center of the volume. """
+  point = view.scene.node_transform(view.canvas.scene).map((10, 8, 6))
+  return point[:2] / point[3]
+
+
+def test_nearest_slice_is_picked(view, monkeypatch):
+  canvas = view.canvas
+  low, high = view.slices
+  def render(pos):
+    raise AssertionError('picked by rendering')
+  monkeypatch.setattr(canvas, 'visual_at', render)
+  # The camera is not a candidate: the picking stays on the CPU.
+  assert set(pickable_nodes(canvas.scene)) == {low, high}
+  for azimuth, nearest in ((90, high), (-90, low)):
+    view.camera.azimuth = azimuth
+    pos = _center(view)
+    assert low.intersect(pos) is not None
+    assert high.intersect(pos) is not None
+    assert pick_visual(canvas, pos) is nearest
+  # Off the slices.
+  assert low.intersect((2, 2)) is None
+  assert pick_visual(canvas, (2, 2)) is None
+
+
+def test_hidden_slice_is_not_picked(view):
+  low, high = view.slices
+  view.camera.azimuth = 90
+  high.visible = False
+  assert pick_visual(view.canvas, _center(view)) is low
+
+
+def test_axis_legend_is_over_the_slices(view):
+  view.camera.azimuth = 90
+  pos = _center(view)
+  axis = XYZAxis(loc=tuple(pos), size=20, parent=view.canvas.scene)
+  assert axis.intersect(pos) == -np.inf
+  assert pick_visual(view.canvas, pos) is axis
+  assert axis.intersect(pos + 30) is None
+  assert pick_visual(view.canvas, pos + 30) is not axis
+
+
+def test_other_visuals_fall_back_to_visual_at(view, monkeypatch):
+  from vispy import scene
+  line = scene.visuals.Line(np.zeros((2, 3)), parent=view.scene)
+  line.interactive = True
+  monkeypatch.setattr(view.canvas, 'visual_at', lambda pos: line)
+  assert pick_visual(view.canvas, _center(view)) is line
@@ -0,0 +1,49 @@
+import numpy as np
+
+from vispy_canvas.slice_cache import SliceCache
+from vispy_canvas.slice_prefetch import SlicePrefetcher
+from vispy_canvas.volume_source import ArraySource, SliceFunc
+
+
+class _Image(object):
+  """ The attributes of AxisAlignedImage used by the prefetcher. """
+  def __init__(self, funcs, limit=None):
+    self.image_funcs = funcs
+    self.limit = limit
+    self.pos = 0
+
+
+def _wait(prefetcher):
+  """ Wait for the submitted loads: shutdown() would cancel them. The pool
+  has one thread, so they are done when a task queued after them runs.
+  """
+  prefetcher._executor.submit(lambda: None).result()
+  prefetcher.shutdown()
+
+
+def test_prefetch_ahead_of_motion(volume):
+  source = ArraySource(volume((40, 8, 6)))
+  cache = SliceCache()
+  func = SliceFunc(source, 'x', cache=cache)
+  image = _Image([func], limit=(0, 39))
+  prefetcher = SlicePrefetcher(n_ahead=3, max_workers=1)
+  for pos in (10, 12, 14):
+    image.pos = pos
+    prefetcher.update(image)
+  _wait(prefetcher)
+  for pos in (16, 18, 20):
+    assert func.cached(pos)
+    assert np.array_equal(func(pos), source.get_slice('x', pos, orient=False))
+  assert not func.cached(8)
+
+
+def test_no_prefetch_past_limit():
+  cache = SliceCache()
+  func = SliceFunc(ArraySource(np.zeros((10, 4, 4))), 'x', cache=cache)
+  image = _Image([func], limit=(0, 9))
+  prefetcher = SlicePrefetcher(n_ahead=4, max_workers=1)
+  for pos in (7, 8):
+    image.pos = pos
+    prefetcher.update(image)
+  _wait(prefetcher)
+  assert func.cached(9) and len(cache) == 1
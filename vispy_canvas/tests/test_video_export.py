@@ -0,0 +1,61 @@
+import queue
+import threading
+
+import pytest
+
+from vispy_canvas.video_export import _read_ahead, camera_path
+
+
+def test_camera_path_interpolates():
+  keyframes = [dict(azimuth=0., elevation=10., center=(0, 0, 0), fov=45.),
+               dict(azimuth=360., elevation=30., center=(2, 4, 6), fov=45.)]
+  states = camera_path(keyframes, 5)
+  assert len(states) == 5
+  assert [s['azimuth'] for s in states] == [0., 90., 180., 270., 360.]
+  assert states[2]['elevation'] == 20.
+  assert states[2]['center'] == (1., 2., 3.)
+  # The keyframes are not modified.
+  assert keyframes[0]['azimuth'] == 0.
+
+
+def test_camera_path_holds_other_entries():
+  keyframes = [dict(azimuth=0., distance=None, name='a'),
+               dict(azimuth=10., distance=5., name='b')]
+  states = camera_path(keyframes, 3)
+  assert [s['name'] for s in states] == ['a', 'a', 'b']
+  assert states[1]['distance'] is None
+
+
+def test_camera_path_several_keyframes():
+  keyframes = [dict(azimuth=a) for a in (0., 10., 30.)]
+  states = camera_path(keyframes, 5)
+  assert [s['azimuth'] for s in states] == [0., 5., 10., 20., 30.]
+
+
+def test_camera_path_single_keyframe():
+  states = camera_path([dict(azimuth=7.)], 3)
+  assert states == [dict(azimuth=7.)] * 3
+  assert states[0] is not states[1]
+  with pytest.raises(ValueError):
+    camera_path([], 3)
+
+
+class _Node(object):
+  def __init__(self, limit):
+    self.limit = limit
+    self.reads = []
+
+  def read_images(self, pos):
+    self.reads.append(pos)
+    return [pos]
+
+
+@pytest.mark.parametrize('limit, expected', [
+  ((0, 9), [0, 0, 5, 9, 9]), (None, [-3, 0, 5, 9, 12])])
+def test_read_ahead_clamps_to_the_limit(limit, expected):
+  node = _Node(limit)
+  out = queue.Queue()
+  _read_ahead(node, [-3, 0, 5, 9, 12], out, threading.Event())
+  items = [out.get_nowait() for _ in range(out.qsize())]
+  assert node.reads == expected
+  assert items == [(pos, [pos]) for pos in expected]
@@ -0,0 +1,52 @@
+import pytest
+
+from vispy_canvas.viewbox_labeled_grid import GridLines, _nice_step
+
+
+@pytest.mark.parametrize('x, step', [
+  (1, 1.), (1.5, 2.), (2, 2.), (2.1, 5.), (5, 5.), (7, 10.), (10, 10.),
+  (0.03, 0.05), (0.1, 0.1), (123, 200.), (4999, 5000.), (5001, 10000.)])
+def test_nice_step(x, step):
+  assert _nice_step(x) == pytest.approx(step)
+
+
+def test_nice_step_rounding():
+  # Not pushed to the next step by the float error of x.
+  assert _nice_step(0.1 + 0.2 - 0.1) == pytest.approx(0.2)
+  assert _nice_step(3 * 0.1 / 3 * 10) == pytest.approx(1.)
+
+
+def test_ticks_follow_the_camera(vispy_app):
+  from vispy import scene
+  canvas = scene.SceneCanvas(size=(400, 300))
+  try:
+    canvas.central_widget.add_grid()
+    view = canvas.central_widget.add_view()
+    grid = GridLines((200, 100, 300))
+    for label in grid.draw_labels(parent=view):
+      view.add(label)
+    camera = scene.cameras.TurntableCamera(parent=view.scene, fov=0)
+    view.camera = camera
+    camera.set_range()
+
+    def expected():
+      return [grid._tick_spacing(axis, label)
+              for axis, label in enumerate(grid.axis_labels)]
+    start = list(grid.label_spacing)
+    assert start == expected()
+    # No draw in between: the camera and resize events update the ticks.
+    camera.scale_factor /= 4
+    assert grid.label_spacing == expected()
+    assert grid.label_spacing[0] < start[0]
+    camera.azimuth += 90
+    assert grid.label_spacing == expected()
+    zoomed = list(grid.label_spacing)
+    view.size = (1600, 1200)
+    assert grid.label_spacing == expected()
+    assert grid.label_spacing[0] < zoomed[0]
+    # A new camera of the view is followed.
+    view.camera = scene.cameras.TurntableCamera(fov=0)
+    assert grid._camera is view.camera
+    assert grid.label_spacing == expected()
+  finally:
+    canvas.close()
@@ -0,0 +1,67 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from vispy_canvas.volume_bricks import BrickSource, BrickVolume, write_bricks
+from vispy_canvas.volume_source import ArraySource
+
+
+@pytest.fixture
+def vol(volume):
+  vol = volume((50, 45, 40))
+  vol[:, :16] = 0 # dead traces: constant bricks
+  vol[:16, 16:32, :16] = np.linspace(0, 1, 16) # compressible bricks
+  return vol
+
+
+@pytest.mark.parametrize('codec', ['gzip', 'none'])
+def test_round_trip(tmp_path, codec, vol):
+  filename = str(tmp_path / 'vol.bvol')
+  write_bricks(vol, filename, brick=16, codec=codec, max_memory=64 << 10)
+  data = BrickVolume(filename)
+  assert data.shape == vol.shape and data.chunks == (16, 16, 16)
+  assert data.kinds['constant'] == 4 * 3
+  assert (data.kinds['deflate'] > 0) == (codec == 'gzip')
+  assert np.array_equal(np.asarray(data), vol)
+  assert np.array_equal(data[3:40:4, -1, ...], vol[3:40:4, -1, ...])
+  assert np.array_equal(pickle.loads(pickle.dumps(data))[7], vol[7])
+  with pytest.raises(IndexError):
+    data[50]
+
+
+def test_source_matches_array(tmp_path, vol):
+  filename = str(tmp_path / 'vol.bvol')
+  write_bricks(vol, filename, brick=16)
+  # A cache smaller than a slice: the bricks are evicted while reading.
+  source = BrickSource.open(filename, cache_bytes=3 * 16**3 * 4)
+  source = source.flipped('z')
+  reference = ArraySource(vol).flipped('z')
+  assert source.min_max() == reference.min_max()
+  for axis in 'xyz':
+    for pos in (0, 15, 16, 39):
+      assert np.array_equal(source.get_slice(axis, pos),
+                            reference.get_slice(axis, pos))
+    for positions in ([5, 3, 4], [0, 38]):
+      assert np.array_equal(source.get_slices(axis, positions),
+                            reference.get_slices(axis, positions))
+    assert np.array_equal(source.get_region(axis, 7, (3, 30), (5, 33), 3),
+                          reference.get_region(axis, 7, (3, 30), (5, 33), 3))
+
+
+def test_not_a_brick_file(tmp_path):
+  filename = str(tmp_path / 'vol.npy')
+  np.save(filename, np.zeros((4, 4, 4)))
+  with pytest.raises(ValueError):
+    BrickVolume(filename)
+
+
+def test_auto_clim_uses_the_header(tmp_path, monkeypatch, vol):
+  from vispy_canvas import volume_stats
+  filename = str(tmp_path / 'vol.bvol')
+  write_bricks(vol, filename, brick=16)
+  def scan(*args, **kwargs):
+    raise AssertionError('the volume was scanned')
+  monkeypatch.setattr(volume_stats, 'compute_stats', scan)
+  clim = volume_stats.auto_clim(BrickSource.open(filename))
+  assert clim == (vol.min(), vol.max())
@@ -0,0 +1,55 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('h5py')
+pytest.importorskip('zarr')
+
+from vispy_canvas.volume_convert import convert_volume, open_volume
+
+
+@pytest.mark.parametrize('name, codec', [
+  ('vol.h5', 'gzip'), ('vol.h5', 'lzf'), ('vol.h5', 'none'),
+  ('vol.zarr', 'gzip'), ('vol.zip', 'gzip'), ('vol.zarr', 'none')])
+def test_round_trip(tmp_path, name, codec, volume):
+  vol = volume((40, 35, 30))
+  filename = str(tmp_path / 'vol.npy')
+  np.save(filename, vol)
+  output = str(tmp_path / name)
+  # A few blocks, and chunks cut by the borders of the volume.
+  report = convert_volume(open_volume(filename), output, chunk=16,
+                          codec=codec, n_workers=3, max_memory=64 << 10)
+  converted = open_volume(output, dataset='seismic')
+  assert converted.chunks == (16, 16, 16)
+  assert np.array_equal(np.asarray(converted[:]), vol)
+  with open(output + '.layout.json') as f:
+    assert json.load(f) == json.loads(json.dumps(report))
+
+
+@pytest.mark.parametrize('name, codec', [
+  ('vol.h5', 'gzip'), ('vol.h5', 'none'), ('vol.zarr', 'gzip'),
+  ('vol.bvol', 'gzip')])
+def test_blocks_split_along_z(tmp_path, name, codec, volume):
+  vol = volume((40, 35, 30))
+  output = str(tmp_path / name)
+  # One chunk per block, under a row of chunks along z.
+  convert_volume(vol, output, chunk=16, codec=codec, n_workers=2,
+                 max_memory=16 ** 3 * 4)
+  converted = open_volume(output, dataset='seismic')
+  assert np.array_equal(np.asarray(converted[:]), vol)
+
+
+def test_max_memory_under_a_chunk(tmp_path):
+  with pytest.raises(ValueError):
+    convert_volume(np.zeros((40, 35, 30), np.float32),
+                   str(tmp_path / 'vol.h5'), chunk=16,
+                   max_memory=16 ** 3 * 4 - 1)
+
+
+def test_unknown_codec(tmp_path):
+  with pytest.raises(ValueError):
+    convert_volume(np.zeros((4, 4, 4)), str(tmp_path / 'vol.h5'),
+                   codec='lz4')
+  assert not os.path.exists(str(tmp_path / 'vol.h5'))
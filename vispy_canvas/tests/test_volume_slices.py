@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+
+from vispy_canvas.volume_slices import build_pyramid
+
+
+def test_pyramid_levels_are_views(volume):
+  vol = volume((40, 33, 20))
+  levels = build_pyramid(vol, n_levels=3)
+  assert [level.shape for level in levels] == \
+    [(20, 17, 10), (10, 9, 5), (5, 5, 3)]
+  for k, level in enumerate(levels, 1):
+    assert np.shares_memory(level, vol)
+    assert np.array_equal(level, vol[::2**k, ::2**k, ::2**k])
+
+
+def test_pyramid_stops_at_min_size():
+  vol = np.zeros((1024, 300, 130), np.uint8)
+  # 130 // 2 = 65 >= 64, 130 // 4 = 32 < 64.
+  assert len(build_pyramid(vol)) == 1
+  assert len(build_pyramid(vol, min_size=8)) == 4
+  assert build_pyramid(vol, min_size=200) == []
+
+
+def test_pyramid_needs_an_array():
+  with pytest.raises(ValueError):
+    build_pyramid([[[0.]]])
+
+
+def test_pilot_forwards_the_texture_options(volume):
+  from vispy_canvas.volume_slices_hdf5_pilot import volume_slices
+  slices = volume_slices(volume((20, 16, 12)), x_pos=3, clims=(-2, 2),
+                         texture_mode='uint8', tile_size=8)
+  assert slices[0]._texture_dtype == np.uint8
+  assert slices[0].tiles is not None
@@ -0,0 +1,72 @@
+import numpy as np
+
+from vispy_canvas.slice_cache import SliceCache
+from vispy_canvas.volume_source import ArraySource, SliceFunc, fetch_images
+
+
+class _CountingSource(ArraySource):
+  """ An ArraySource counting its slice and region reads. """
+  def __init__(self, data, **kwargs):
+    super().__init__(data, **kwargs)
+    self.reads = []
+
+  def _read_slice(self, i, pos):
+    self.reads.append(pos)
+    return super()._read_slice(i, pos)
+
+  def _read_region(self, index):
+    self.reads.append(index)
+    return super()._read_region(index)
+
+
+def test_fetch_images_reads_each_volume_once(volume):
+  amplitude = _CountingSource(volume((20, 16, 12)))
+  attribute = _CountingSource(volume((20, 16, 12), seed=1))
+  funcs = [SliceFunc(amplitude, 'x'),
+           SliceFunc(amplitude, 'x', preproc_f=np.abs),
+           SliceFunc(attribute, 'x'),
+           lambda pos: np.full((16, 12), pos)]
+  images = fetch_images(funcs, 5)
+  assert amplitude.reads == [5] and attribute.reads == [5]
+  assert np.array_equal(images[0], amplitude.data[5])
+  assert np.array_equal(images[1], np.abs(amplitude.data[5]))
+  assert np.array_equal(images[2], attribute.data[5])
+  assert np.array_equal(images[3], np.full((16, 12), 5))
+
+
+def test_fetch_images_groups_by_read(volume):
+  vol = volume((20, 16, 12))
+  source = _CountingSource(vol)
+  # Another view of the same array along another axis, or reversed, is
+  # another read.
+  funcs = [SliceFunc(source, 'x'), SliceFunc(source, 'y'),
+           SliceFunc(source.flipped('x'), 'x'), SliceFunc(source, 'x')]
+  images = fetch_images(funcs, 3)
+  assert sorted(source.reads) == [3, 3, 16]
+  assert np.array_equal(images[0], vol[3])
+  assert np.array_equal(images[1], vol[:, 3])
+  assert np.array_equal(images[2], vol[16])
+  assert images[3] is images[0]
+
+
+def test_fetch_images_skips_cached(volume):
+  source = _CountingSource(volume((20, 16, 12)))
+  cache = SliceCache()
+  funcs = [SliceFunc(source, 'z', cache=cache),
+           SliceFunc(source, 'z', preproc_f=np.abs, cache=cache)]
+  first = fetch_images(funcs, 7)
+  second = fetch_images(funcs, 7)
+  assert source.reads == [7]
+  assert all(a is b for a, b in zip(first, second))
+
+
+def test_fetch_images_region(volume):
+  vol = volume((20, 16, 12))
+  source = _CountingSource(vol)
+  cache = SliceCache()
+  funcs = [SliceFunc(source, 'y', cache=cache),
+           SliceFunc(source, 'y', preproc_f=np.abs, cache=cache)]
+  images = fetch_images(funcs, 4, region=((2, 18), (1, 11), 3))
+  assert len(source.reads) == 1 and len(cache) == 0
+  assert np.array_equal(images[0], vol[2:18:3, 4, 1:11:3])
+  assert np.array_equal(images[1], np.abs(vol[2:18:3, 4, 1:11:3]))
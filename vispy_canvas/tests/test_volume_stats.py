@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+import pytest
+
+from vispy_canvas.volume_stats import compute_stats, has_sidecar, \
+  load_sidecar, save_sidecar, sidecar_path, _file_spec, _sidecar_key
+from vispy_canvas.volume_source import as_source
+
+
+@pytest.fixture
+def vol(volume):
+  vol = volume((30, 20, 10))
+  vol[3, 4, 5] = np.nan # not counted
+  return vol
+
+
+def _check(stats, vol):
+  finite = vol[np.isfinite(vol)].astype(np.float64)
+  assert stats.count == finite.size
+  assert stats.min == finite.min() and stats.max == finite.max()
+  assert stats.mean == pytest.approx(finite.mean())
+  assert stats.std == pytest.approx(finite.std())
+  # The sample holds every value: the percentiles are exact.
+  assert stats.percentile(99.) == pytest.approx(np.percentile(finite, 99.))
+
+
+def test_in_memory_matches_numpy(vol):
+  _check(compute_stats(vol, slab_size=7, n_workers=3), vol)
+
+
+def test_memmap_workers_and_sidecar(tmp_path, vol):
+  filename = str(tmp_path / 'vol.npy')
+  np.save(filename, vol)
+  mm = np.load(filename, mmap_mode='r')
+  assert not has_sidecar(mm)
+  stats = compute_stats(mm, slab_size=8, n_workers=2)
+  _check(stats, vol)
+  assert has_sidecar(mm)
+  key = _sidecar_key(_file_spec(as_source(mm)))
+  assert load_sidecar(key).to_dict() == stats.to_dict()
+  # A rewritten file invalidates the sidecar.
+  np.save(filename, vol * 2)
+  os.utime(filename, ns=(0, 0))
+  assert not has_sidecar(np.load(filename, mmap_mode='r'))
+
+
+def test_sidecar_directory(tmp_path, stats_dir, vol):
+  filename = str(tmp_path / 'data' / 'vol.npy')
+  os.makedirs(os.path.dirname(filename))
+  np.save(filename, vol)
+  mm = np.load(filename, mmap_mode='r')
+  compute_stats(mm, n_workers=1)
+  # Nothing next to the data, the default is STATS_DIR.
+  assert os.listdir(os.path.dirname(filename)) == ['vol.npy']
+  assert len(os.listdir(stats_dir)) == 1
+  assert has_sidecar(mm)
+  # Another directory, STATS_DIR is only the fallback of the loads.
+  other = str(tmp_path / 'other')
+  assert has_sidecar(mm, other) and not os.path.exists(other)
+  os.remove(os.path.join(stats_dir, os.listdir(stats_dir)[0]))
+  compute_stats(mm, n_workers=1, sidecar=other)
+  assert has_sidecar(mm, other) and len(os.listdir(other)) == 1
+  assert not has_sidecar(mm)
+  compute_stats(mm, n_workers=1, sidecar=False)
+  assert not os.listdir(stats_dir)
+
+
+def test_sidecar_unwritable(tmp_path, stats_dir, monkeypatch, vol):
+  from vispy_canvas import volume_stats
+  filename = str(tmp_path / 'vol.npy')
+  np.save(filename, vol)
+  mm = np.load(filename, mmap_mode='r')
+  key = _sidecar_key(_file_spec(as_source(mm)))
+  readonly = str(tmp_path / 'readonly')
+  def deny(path, mode='r', *args, **kwargs):
+    if 'w' in mode:
+      raise PermissionError(path)
+    return open(path, mode, *args, **kwargs)
+  monkeypatch.setattr(volume_stats, 'open', deny, raising=False)
+  # Nowhere to write: computed, not saved.
+  assert save_sidecar(key, compute_stats(mm, sidecar=False)) is None
+  _check(compute_stats(mm, n_workers=1, sidecar=readonly), vol)
+  assert not has_sidecar(mm, readonly)
+  monkeypatch.setattr(volume_stats, 'open', open)
+  # The read-only directory falls back to STATS_DIR.
+  readonly_path = sidecar_path(key, readonly)
+  def deny_readonly(path, mode='r', *args, **kwargs):
+    if path == readonly_path and 'w' in mode:
+      raise PermissionError(path)
+    return open(path, mode, *args, **kwargs)
+  monkeypatch.setattr(volume_stats, 'open', deny_readonly)
+  compute_stats(mm, n_workers=1, sidecar=readonly)
+  assert not os.path.exists(readonly_path)
+  assert has_sidecar(mm) and has_sidecar(mm, readonly)
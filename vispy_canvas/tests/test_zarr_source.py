@@ -0,0 +1,69 @@
+import warnings
+
+import numpy as np
+import pytest
+
+zarr = pytest.importorskip('zarr')
+
+from vispy_canvas.volume_source import ArraySource, ZarrSource, as_source
+
+
+def _write(store, vol, fill_value, path=None):
+  array = zarr.open_array(store, mode='w', path=path, shape=vol.shape,
+                          chunks=(16, 16, 16), dtype=vol.dtype,
+                          fill_value=fill_value)
+  array[:] = vol
+  # A chunk of the fill value is not stored, and read as the fill value.
+  array[:16, :16, :16] = fill_value
+
+
+@pytest.fixture(scope='module', params=['zarr', 'zip', 'n5'])
+def store(request, tmp_path_factory, volume):
+  vol = volume((70, 53, 45), seed=1)
+  directory = tmp_path_factory.mktemp('zarr')
+  kind = request.param
+  # N5 only supports a fill value of 0.
+  fill_value = 0. if kind == 'n5' else 7.
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore') # zarr warns that N5 is experimental
+    if kind == 'zip':
+      filename, path = str(directory / 'vol.zip'), 'seismic'
+      zip_store = zarr.ZipStore(filename, mode='w')
+      _write(zip_store, vol, fill_value, path)
+      zip_store.close()
+    else:
+      filename, path = str(directory / ('vol.' + kind)), None
+      _write(filename, vol, fill_value)
+  vol[:16, :16, :16] = fill_value
+  return filename, path, vol
+
+
+@pytest.mark.parametrize('cache_bytes', ['auto', None])
+def test_matches_array(store, cache_bytes):
+  filename, path, vol = store
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    source = ZarrSource.open(filename, path=path, cache_bytes=cache_bytes)
+  assert source.concurrent
+  reference = ArraySource(vol)
+  for axis in range(3):
+    for pos in (0, 15, 16, 30, vol.shape[axis] - 1):
+      assert np.array_equal(source.get_slice(axis, pos),
+                            reference.get_slice(axis, pos))
+    for positions in ([3, 5, 4, 9], [0, 40]):
+      assert np.array_equal(source.get_slices(axis, positions),
+                            reference.get_slices(axis, positions))
+    flipped, reference_flipped = source.flipped('z'), reference.flipped('z')
+    assert np.array_equal(
+      flipped.get_region(axis, 7, (3, 40), (5, 44), 3),
+      reference_flipped.get_region(axis, 7, (3, 40), (5, 44), 3))
+
+
+def test_as_source(store):
+  filename, path, _ = store
+  if path is not None:
+    pytest.skip('the array of a zip store is opened by ZarrSource.open')
+  with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    array = zarr.open(filename, mode='r')
+  assert isinstance(as_source(array), ZarrSource)
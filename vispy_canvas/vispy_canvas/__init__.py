@@ -5,22 +5,81 @@
 # Distributed under the MIT License. See LICENSE for more info.
 # -----------------------------------------------------------------------------
 
-from .seismic_canvas import SeismicCanvas
-from .axis_aligned_image import AxisAlignedImage
-from .volume_slices import volume_slices
-from .xyz_axis import XYZAxis
-from .canvas_controller import CanvasControls
-
-try:
-  # Check Python module dependencies.
-  import matplotlib.pyplot
-  # Only import the MPL generated colorbar if MPL is available.
-  from .colorbar_MPL import Colorbar
-except ImportError:
+import importlib
+import importlib.util
+import sys
+import types
+
+# The public names and their modules. They are imported on first access
+# (PEP 562), so e.g. a batch script using only the volume sources does not
+# pay for vispy.scene, and none pays for the canvas it does not open.
+_exports = {
+  'SeismicCanvas': '.seismic_canvas',
+  'AxisAlignedImage': '.axis_aligned_image',
+  'volume_slices': '.volume_slices',
+  'SliceCache': '.slice_cache',
+  'SlicePrefetcher': '.slice_prefetch',
+  'SliceTiles': '.slice_tiles',
+  'VolumeSource': '.volume_source',
+  'ArraySource': '.volume_source',
+  'MemmapSource': '.volume_source',
+  'HDF5Source': '.volume_source',
+  'ZarrSource': '.volume_source',
+  'DirectChunkHDF5Source': '.hdf5_direct',
+  'BrickSource': '.volume_bricks',
+  'write_bricks': '.volume_bricks',
+  'VolumeStats': '.volume_stats',
+  'compute_stats': '.volume_stats',
+  'XYZAxis': '.xyz_axis',
+  'CanvasControls': '.canvas_controller',
+  'ImageWriter': '.image_writer',
+  'render_snapshots': '.batch_render',
+  'export_video': '.video_export',
+  'camera_path': '.video_export',
+  'Colorbar': None, # see _colorbar_module
+}
+
+__all__ = list(_exports)
+
+
+def _colorbar_module():
+  # Only use the MPL generated colorbar if MPL is available. Matplotlib itself
+  # is imported on the first colorbar rendering, not at package import.
+  if importlib.util.find_spec('matplotlib') is not None:
+    return '.colorbar_MPL'
   from warnings import warn
-  warn("Module matplotlib/tkinter missing, using vispy stock colorbar")
+  warn("Module matplotlib missing, using vispy stock colorbar")
   # Use vispy stock colorbar if MPL is not available.
-  from .colorbar import Colorbar
+  return '.colorbar'
+
+
+def __getattr__(name):
+  if name not in _exports:
+    raise AttributeError(
+      "module {!r} has no attribute {!r}".format(__name__, name))
+  module = _exports[name] or _colorbar_module()
+  value = getattr(importlib.import_module(module, __name__), name)
+  globals()[name] = value # the next accesses skip __getattr__
+  return value
+
+
+def __dir__():
+  return sorted(set(globals()) | set(__all__))
+
+
+class _Package(types.ModuleType):
+  """ The package module. An export named as its submodule (volume_slices)
+  would be shadowed by the submodule, which the import system binds as a
+  package attribute once it is loaded: bind the export instead.
+  """
+  def __setattr__(self, name, value):
+    if isinstance(value, types.ModuleType) and _exports.get(name) == \
+       '.' + name and value.__name__ == __name__ + '.' + name:
+      value = getattr(value, name)
+    types.ModuleType.__setattr__(self, name, value)
+
+
+sys.modules[__name__].__class__ = _Package
 
 
 __version__ = '0.1.0'
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+""" Command line tools: python -m vispy_canvas <command> ...
+
+convert: convert a .npy, raw memmap, HDF5, Zarr or bricked volume to a
+  chunked, compressed HDF5 dataset, Zarr array or bricked .bvol file, and
+  report its slice layout.
+"""
+import argparse
+import sys
+
+
+def convert(args):
+  from .volume_convert import convert_volume, format_report, open_volume
+  vol = open_volume(args.input, dataset=args.dataset, dtype=args.dtype,
+                    shape=args.shape)
+  report = convert_volume(vol, args.output, dataset=args.output_dataset,
+                          chunk=args.chunk, codec=args.codec,
+                          level=args.level, n_workers=args.workers,
+                          max_memory=args.max_memory << 20)
+  print(format_report(report))
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(prog='vispy_canvas',
+                                   description=__doc__.splitlines()[0])
+  commands = parser.add_subparsers(dest='command', required=True)
+
+  p = commands.add_parser('convert', help='convert a volume to chunked '
+                          'HDF5 (.h5), Zarr (.zarr, .zip) or bricks (.bvol)')
+  p.add_argument('input', help='.npy, raw file, file.h5:dataset, .zarr or '
+                 '.bvol')
+  p.add_argument('output', help='.h5/.hdf5 file, .zarr directory, .zip or '
+                 '.bvol file')
+  p.add_argument('--dataset', help='input HDF5 dataset / Zarr path')
+  p.add_argument('--output-dataset', default='seismic',
+                 help='output dataset name (default: seismic)')
+  p.add_argument('--dtype', help='dtype of a raw input, e.g. float32')
+  p.add_argument('--shape', type=int, nargs=3, help='shape of a raw input')
+  p.add_argument('--chunk', type=int, default=64,
+                 help='cubic chunk size (default: 64)')
+  p.add_argument('--codec', default='gzip',
+                 choices=('gzip', 'lzf', 'blosc', 'none'))
+  p.add_argument('--level', type=int, default=4, help='compression level')
+  p.add_argument('--workers', type=int, help='compression threads')
+  p.add_argument('--max-memory', type=int, default=256,
+                 help='MB of input read at once (default: 256)')
+  p.set_defaults(func=convert)
+
+  args = parser.parse_args(argv)
+  args.func(args)
+
+
+if __name__ == '__main__':
+  sys.exit(main())
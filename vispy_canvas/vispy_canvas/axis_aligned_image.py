@@ -6,8 +6,19 @@
 # -----------------------------------------------------------------------------
 
 import numpy as np
-from vispy import scene
-from vispy.visuals.transforms import MatrixTransform, STTransform
+from vispy import app, scene
+from vispy.util import transforms
+from vispy.visuals.transforms import MatrixTransform
+
+from .slice_tiles import MAX_TEXTURE_SIZE, SliceTiles
+from .volume_source import as_image_func, fetch_images
+
+
+# Texture modes of AxisAlignedImage: the dtype the slices are uploaded with.
+TEXTURE_DTYPES = {'float32': np.float32, 'uint16': np.uint16,
+                  'uint8': np.uint8}
+# The dragged positions are applied at most once per interval (seconds).
+DRAG_INTERVAL = 1 / 60.
 
 
 class AxisAlignedImage(scene.visuals.Image):
@@ -16,30 +27,89 @@ class AxisAlignedImage(scene.visuals.Image):
   user gives corresponding inputs.
 
   Parameters:
-
+  image_funcs: a list of image functions 'f(pos, get_shape=False)' returning
+    the slice image at pos (or its shape), or of volumes (VolumeSource,
+    np.ndarray, h5py dataset ...) that this image slices by itself. The first
+    one is the primary image, the others are overlaid on it.
+  preproc_funcs, cache, image_flip: used to slice the volumes given in
+    image_funcs, see volume_source.SliceFunc.
+  prefetcher: a SlicePrefetcher that reads ahead the slices along the moving
+    direction of this image, or None.
+  lod_funcs: a list of coarse levels of detail, each level being a list of
+    image functions or volumes (same order as image_funcs) decimated by
+    2**level, see volume_slices(pyramid=...). While the image
+    is moving, the finest level with at most lod_pixels pixels is displayed;
+    the full-resolution slice is swapped in once the image stays still for
+    lod_delay seconds.
+
+  The slice images are uploaded as they are stored: the i-j to x-y transpose
+  and the reversed axes (e.g. of the seismic coordinate system, see the
+  flips attribute of SliceFunc) are done by the transform of this visual.
+  The images are copied into texture buffers owned by this visual (one per
+  layer, tile and image shape) in the dtype of the texture mode, and the
+  clim is applied on the GPU: moving a slice costs one copy per layer (and
+  the quantization, in the integer modes) and no allocation.
+
+  texture_mode: 'float32' uploads the slices as they are; 'uint16' or
+    'uint8' quantize them on the CPU against their clim, and upload 2 or 4
+    times fewer bytes. The values outside the clim are clipped, which does
+    not change the colors: the colormap is saturated there anyway.
+  tile_size: split the slices into a grid of tiles of this size, loaded on
+    demand at the resolution of the screen, see slice_tiles.SliceTiles.
+    None tiles only the slices larger than MAX_TEXTURE_SIZE, with tiles of
+    2048 samples. Tiling needs volumes in image_funcs, and replaces the
+    levels of detail by a decimated overview of the slice.
   """
   def __init__(self, image_funcs, axis='z', pos=0, limit=None,
                seismic_coord_system=True,
                cmaps=['grays'], clims=None,
-               interpolation='spline36', method='auto'):
+               interpolation='spline36', method='auto',
+               preproc_funcs=None, cache=None, image_flip=(False, False),
+               prefetcher=None,
+               lod_funcs=None, lod_delay=0.3, lod_pixels=1024*1024,
+               texture_mode='float32', tile_size=None):
 
     assert clims is not None, 'clim must be specified explicitly.'
+    if texture_mode not in TEXTURE_DTYPES:
+      raise ValueError('Invalid texture_mode={}, must be one of {}.'
+                       .format(texture_mode, list(TEXTURE_DTYPES)))
+    # The textures have the dtype of the mode and are scaled by the clim on
+    # the GPU; without a texture_format, vispy would scale every image into
+    # a new array on the CPU. Quantized modes upload normalized integers:
+    # the images are displayed with the clim (0, max integer), and
+    # quantized against their own clim. The texture gets a single-channel
+    # placeholder, or vispy would pick an RGBA format for it.
+    texture_dtype = TEXTURE_DTYPES[texture_mode]
+    texture_format = texture_dtype
+    if texture_dtype == np.float32:
+      texture_clims = clims
+    else:
+      q_max = np.iinfo(texture_dtype).max
+      texture_clims = [(0, q_max)] * len(clims)
+    placeholder = np.zeros((1, 1), dtype=texture_dtype)
 
     # Create an Image obj and unfreeze it so we can add more
     # attributes inside.
     # First image (from image_funcs[0])
-    scene.visuals.Image.__init__(self, parent=None, # no image func yet
-      cmap=cmaps[0], clim=clims[0],
-      interpolation=interpolation, method=method)
+    scene.visuals.Image.__init__(self, placeholder,
+      parent=None, # no image func yet
+      cmap=cmaps[0], clim=texture_clims[0],
+      interpolation=interpolation, method=method,
+      texture_format=texture_format)
     self.unfreeze()
     self.interactive = True
 
     # Other images ...
     self.overlaid_images = [self]
+    # The Image keyword arguments of each layer, to create tiles alike.
+    self._layer_kwargs = [dict(cmap=cmap, clim=clim,
+      interpolation=interpolation, method=method,
+      texture_format=texture_format) for cmap, clim in zip(cmaps,
+                                                           texture_clims)]
+    self._placeholder = placeholder
     for i_img in range(1, len(image_funcs)):
-      overlaid_image = scene.visuals.Image(parent=self,
-        cmap=cmaps[i_img], clim=clims[i_img],
-        interpolation=interpolation, method=method)
+      overlaid_image = scene.visuals.Image(placeholder, parent=self,
+        **self._layer_kwargs[i_img])
       self.overlaid_images.append(overlaid_image)
 
     # Set GL state. Must check depth test, otherwise weird in 3D.
@@ -57,17 +127,42 @@ class AxisAlignedImage(scene.visuals.Image):
     self.seismic_coord_system = seismic_coord_system
 
     # Get the image_func that returns either image or image shape.
-    self.image_funcs = image_funcs # a list of functions!
+    if preproc_funcs is None:
+      preproc_funcs = [None] * len(image_funcs)
+    self.image_funcs = [as_image_func(func, self.axis, preproc_f, cache,
+                                      flip=image_flip)
+                        for func, preproc_f in zip(image_funcs, preproc_funcs)]
     shape = self.image_funcs[0](self.pos, get_shape=True)
+    self.image_shape = shape # full-resolution shape, whatever level shown
+    # The (rows, columns) of the images are displayed reversed if flips is
+    # True, the overlaid images are reoriented to match the primary one.
+    self.flips = getattr(self.image_funcs[0], 'flips', (False, False))
+    # Reusable texture buffers {(i_img, tile, shape): array} for set_data.
+    self.texture_mode = texture_mode
+    self.clims = [tuple(clim) for clim in clims] # in data units
+    self._texture_dtype = texture_dtype
+    self._buffers = {}
+    self._scratch = {} # float32 {shape: array} to quantize the images
+    # Texture-to-plane matrix: maps the local coordinates of the texture to
+    # the image plane, in full-resolution (i, j) units. Set on every update.
+    self._plane_matrix = np.eye(4)
+
+    # Levels of detail: lod_funcs[k-1] provides the slices decimated by 2**k.
+    self.lod_funcs = [[as_image_func(func, self.axis, preproc_f, cache,
+                                     level=level, flip=image_flip)
+                       for func, preproc_f in zip(funcs, preproc_funcs)]
+                      for level, funcs in enumerate(lod_funcs or [], 1)]
+    self.lod_delay = lod_delay
+    self.lod_pixels = lod_pixels
+    self.level = 0 # the level currently displayed
+    self._lod_timer = None # created on first use, when an app is running
 
     # The selection highlight (a Plane visual with transparent color).
     # The plane is initialized before any rotation, on '+z' direction.
     self.highlight = scene.visuals.Plane(parent=self,
       width=shape[0], height=shape[1], direction='+z',
       color=(1, 1, 0, 0.1)) # transparent yellow color
-    # Move the plane to align with the image.
-    self.highlight.transform = STTransform(
-      translate=(shape[0]/2, shape[1]/2, 0))
+    # The plane is aligned with the image in _update_location.
     # This is to make sure we can see highlight plane through the images.
     self.highlight.set_gl_state('additive', depth_test=True)
     self.highlight.visible = False # only show when selected
@@ -76,11 +171,26 @@ class AxisAlignedImage(scene.visuals.Image):
     # drag this image by anchor point moving in the normal direction.
     self.anchor = None # None by default
     self.offset = 0
+    # The dragged position waiting for the drag timer, and the counters of
+    # the drag updates (see update_stats).
+    self._pending_pos = None
+    self._drag_timer = None # created on first drag, see _drag_to
+    self.applied_updates = 0
+    self.skipped_updates = 0
+    self.merged_updates = 0
+
+    # Read ahead the next slices while moving, see slice_prefetch.py.
+    self.prefetcher = prefetcher
+
+    # Tiles of the slices too large for one texture, see slice_tiles.py.
+    self.tiles = None
+    if tile_size is not None or max(shape[:2]) > MAX_TEXTURE_SIZE:
+      self.tiles = SliceTiles(self, tile_size=tile_size or 2048)
 
     # Apply SRT transform according to the axis attribute.
     self.transform = MatrixTransform()
     # Move the image plane to the corresponding location.
-    self._update_location()
+    self._update_location(coarse=False)
 
     self.freeze()
 
@@ -117,7 +227,35 @@ class AxisAlignedImage(scene.visuals.Image):
     # Eq 2: anchor[2] = 0 <- intersects with the plane
     # The following equation can be derived by Eq 1 and Eq 2.
     distance = (0. - click_pos[2]) / view_vector[2]
-    self.anchor = click_pos[:2] + distance * view_vector[:2] # only need vec2
+    anchor = click_pos[:2] + distance * view_vector[:2] # only need vec2
+    # Keep the anchor in image plane units, the local coordinates depend on
+    # the texture shown (level of detail, flips).
+    self.anchor = np.dot([*anchor, 0, 1], self._plane_matrix)[:2]
+
+  def intersect(self, pos):
+    """ Intersect the view ray under the canvas position pos with this image
+    (CPU ray-plane picking, see slice_picking.pick_visual). Return the depth
+    of the hit point in canvas coordinates, smaller is nearer, or None if
+    the ray misses the image.
+    """
+    # Get the screen-to-local transform to get camera coordinates.
+    tr = self.canvas.scene.node_transform(self)
+    # Two points of the view ray in the local world, the image is at z=0.
+    near = tr.map([*pos[:2], 0, 1])
+    far = tr.map([*pos[:2], 1, 1])
+    near, far = near[:3] / near[3], far[:3] / far[3]
+    if far[2] == near[2]:
+      return None # the ray is parallel to the image plane
+    hit = near + (far - near) * (0. - near[2]) / (far[2] - near[2])
+    # Is the hit point on the image? Test in image plane units.
+    plane = np.dot([hit[0], hit[1], 0, 1], self._plane_matrix)[:2]
+    if not (0 <= plane[0] <= self.image_shape[0]
+            and 0 <= plane[1] <= self.image_shape[1]):
+      return None
+    depth = tr.imap([hit[0], hit[1], 0, 1])
+    if depth[3] <= 0:
+      return None # behind the camera
+    return depth[2] / depth[3]
 
   def drag_visual_node(self, mouse_move_event):
     """ Drag this visual node while holding left click in the selection mode
@@ -132,14 +270,16 @@ class AxisAlignedImage(scene.visuals.Image):
     # Unlike in 'set_anchor', we now convert most coordinates to the screen
     # coordinate system, because it's more intuitive for user to do operations
     # in 2D and get 2D feedbacks, e.g. mouse leading the anchor point.
-    anchor = [*self.anchor, self.pos, 1] # 2D -> 3D
+    anchor_2d = np.dot([*self.anchor, 0, 1],
+      np.linalg.inv(self._plane_matrix))[:2] # local coordinates of texture
+    anchor = [*anchor_2d, self.pos, 1] # 2D -> 3D
     anchor_screen = tr.imap(anchor) # screen coordinates of the anchor point
     anchor_screen /= anchor_screen[3] # rescale to cancel out 'w' term
     anchor_screen = anchor_screen[:2] # only need vec2
 
     # Compute the normal vector, starting from the anchor point and
     # perpendicular to the image plane.
-    normal = [*self.anchor, self.pos+1, 1] # +[0,0,1,0] from anchor
+    normal = [*anchor_2d, self.pos+1, 1] # +[0,0,1,0] from anchor
     normal_screen = tr.imap(normal) # screen coordinates of anchor + [0,0,1,0]
     normal_screen /= normal_screen[3] # rescale to cancel out 'w' term
     normal_screen = normal_screen[:2] # only need vec2
@@ -184,15 +324,81 @@ class AxisAlignedImage(scene.visuals.Image):
     if self.limit is not None:
       if self.pos + offset < self.limit[0]: offset = self.limit[0] - self.pos
       if self.pos + offset > self.limit[1]: offset = self.limit[1] - self.pos
-    self.offset = offset
-    # Note: must reverse normal direction from +y direction to -y!
-    if self.axis == 'y': offset = -offset
+    pos = int(np.round(self.pos + offset))
+    self.offset = 0
+    self._drag_to(pos)
 
+  def _drag_to(self, pos):
+    """ Move to the dragged position pos. Only a new rounded position moves
+    the image, and at most once per DRAG_INTERVAL: the positions dragged to
+    meanwhile are merged, the newest one is applied by the drag timer.
+    """
+    target = self.pos if self._pending_pos is None else self._pending_pos
+    if pos == target:
+      self.skipped_updates += 1
+      return
+    if self._drag_timer is not None and self._drag_timer.running:
+      if self._pending_pos is not None:
+        self.merged_updates += 1
+      self._pending_pos = pos
+      return
+    self.offset = pos - self.pos
     self._update_location()
-
-  def _update_location(self, pos = None):
+    self._start_drag_timer()
+
+  def _start_drag_timer(self):
+    if self._drag_timer is None:
+      self._drag_timer = app.Timer(interval=DRAG_INTERVAL, iterations=1,
+                                   connect=self._on_drag_timer)
+    self._drag_timer.start()
+
+  def _on_drag_timer(self, event):
+    """ Apply the newest position dragged to since the last move, if any. """
+    pos, self._pending_pos = self._pending_pos, None
+    if pos is not None and pos != self.pos: # not dragged back
+      self.offset = pos - self.pos
+      self._update_location()
+      self.update()
+      self._start_drag_timer()
+
+  def update_stats(self):
+    """ Return the counters of the drag updates: the updates applied, the
+    ones skipped because the rounded position did not change, and the ones
+    merged into a later move (see _drag_to). Each skipped or merged update
+    avoided a fetch and a texture upload per layer.
+    """
+    avoided = (self.skipped_updates + self.merged_updates) \
+      * len(self.overlaid_images)
+    return {'applied': self.applied_updates,
+            'skipped': self.skipped_updates,
+            'merged': self.merged_updates,
+            'fetches_avoided': avoided, 'uploads_avoided': avoided}
+
+  def read_images(self, pos, level=0):
+    """ Read the images of all the layers at pos, at the given level of
+    detail (the overview for a tiled slice). The visual is not touched, so
+    this can run on a worker thread, see slice_loader.SliceLoader.
+    """
+    if self.tiles is not None:
+      whole = ((0, self.image_shape[0]), (0, self.image_shape[1]),
+               self.tiles.overview_step)
+      return fetch_images(self.image_funcs, pos, region=whole)
+    image_funcs = self.image_funcs if level == 0 \
+      else self.lod_funcs[level-1]
+    # All the layers at once: one read per volume, concurrently.
+    return fetch_images(image_funcs, pos)
+
+  def _update_location(self, pos = None, coarse=None, images=None):
     """ Update the image plane to the dragged location and redraw this image.
+    A coarse level of detail is displayed if coarse is True, or if coarse is
+    None and levels of detail are available; the full resolution is then
+    restored after lod_delay seconds without any update.
+
+    images: the full-resolution images read by read_images(pos) beforehand,
+      e.g. on a worker thread. By default the images are read here.
     """
+    if pos is not None:
+      self._pending_pos = None # an explicit move wins over a dragged one
     if pos is None:
         self.pos += self.offset
         # must round to nearest integer location
@@ -204,8 +410,41 @@ class AxisAlignedImage(scene.visuals.Image):
       if self.pos > self.limit[1]:
           self.pos = self.limit[1]
 
+    # Pick the level of detail to display.
+    if coarse is None:
+      coarse = len(self.lod_funcs) > 0
+    coarse = coarse and images is None # the images given are full-resolution
+    self.level = self._coarse_level() if coarse and self.tiles is None else 0
+
+    # Update image on the slice based on current position. The images are
+    # given in i-j storage order, the transform below displays them in x-y.
+    if images is None:
+      images = self.read_images(self.pos, self.level)
+    if self.tiles is not None:
+      # A tiled slice shows its overview, the tiles follow on next draw.
+      scale = self.tiles.overview_step
+      self.tiles.reset()
+    else:
+      scale = 2**self.level
+    # First image, the primary one:
+    data = self._to_buffer(0, images[0], self.flips)
+    self.set_data(data)
+    # Other images, overlaid on the primary image:
+    for i_img in range(1, len(images)):
+      flips = getattr(self.image_funcs[i_img], 'flips', (False, False))
+      self.overlaid_images[i_img].set_data(
+        self._to_buffer(i_img, images[i_img], flips))
+
     # Update the transformation in order to move to new location.
     self.transform.reset()
+    # 0. Map the texture to the image plane: transpose i-j to x-y, reverse
+    # the flipped axes and scale a coarse level up to the full-resolution
+    # size. The highlight plane (child node) compensates for it.
+    self._plane_matrix = self._texture_matrix(scale)
+    self.transform.matrix = self._plane_matrix
+    self.highlight.transform = MatrixTransform(np.dot(
+      transforms.translate((self.image_shape[0]/2, self.image_shape[1]/2, 0)),
+      np.linalg.inv(self._plane_matrix)))
     if self.axis == 'z':
       # 1. No rotation to do for z axis (y-x) slice. Only translate.
       self.transform.translate((0, 0, self.pos))
@@ -219,19 +458,108 @@ class AxisAlignedImage(scene.visuals.Image):
       self.transform.rotate(90, (0, 0, 1))
       self.transform.translate((self.pos, 0, 0))
 
-    # Update image on the slice based on current position. The numpy array
-    # is transposed due to a conversion from i-j to x-y axis system.
-    # First image, the primary one:
-    self.set_data(self.image_funcs[0](self.pos).T)
-    # Other images, overlaid on the primary image:
-    for i_img in range(1, len(self.image_funcs)):
-      self.overlaid_images[i_img].set_data(
-        self.image_funcs[i_img](self.pos).T)
-
     # Reset attributes after dragging completes.
     self.offset = 0
+    self.applied_updates += 1
     self._bounds_changed() # update the bounds with new self.pos
 
+    # Let the prefetcher learn the motion and read the next slices ahead.
+    if self.prefetcher is not None:
+      self.prefetcher.update(self)
+
+    # Restore the full resolution once the image stops moving.
+    if self.level > 0:
+      if self._lod_timer is None:
+        self._lod_timer = app.Timer(interval=self.lod_delay, iterations=1,
+                                    connect=self._on_lod_timer)
+      self._lod_timer.stop()
+      self._lod_timer.start()
+
+  def draw(self):
+    # Load the tiles that came into view, before drawing the children.
+    if self.tiles is not None and self.tiles.update():
+      self.update() # more tiles to load on the next frame
+    scene.visuals.Image.draw(self)
+
+  def _new_layer_image(self, i_img):
+    """ Create an Image visual configured as the layer i_img (cmap, clim
+    ...), drawn with that layer: the tiles of the primary image are drawn
+    before the overlaid images.
+    """
+    parent = self.overlaid_images[i_img]
+    image = scene.visuals.Image(self._placeholder, parent=parent,
+                                **self._layer_kwargs[i_img])
+    image.set_gl_state(depth_test=True, depth_func='lequal',
+      blend_func=('src_alpha', 'one_minus_src_alpha'))
+    if i_img == 0:
+      image.order = -1
+    return image
+
+  def _to_buffer(self, i_img, image, flips, tile=None):
+    """ Copy an image into the texture buffer of the image i_img (or of its
+    tile), reversing the rows/columns whose flips differ from the primary
+    image's, and quantizing it against its clim in the uint8/uint16 texture
+    modes.
+    """
+    image = np.asarray(image)
+    if tuple(flips) != tuple(self.flips):
+      image = image[slice(None, None, -1 if flips[0] != self.flips[0] else 1),
+                    slice(None, None, -1 if flips[1] != self.flips[1] else 1)]
+    key = (i_img, tile, image.shape)
+    buf = self._buffers.get(key)
+    if buf is None: # one buffer per image and level of detail
+      buf = self._buffers[key] = np.empty(image.shape,
+                                          dtype=self._texture_dtype)
+    if self._texture_dtype == np.float32:
+      np.copyto(buf, image, casting='unsafe')
+      return buf
+
+    # Quantize: round((image - cmin) / (cmax - cmin) * q_max), clipped.
+    scratch = self._scratch.get(image.shape)
+    if scratch is None:
+      scratch = self._scratch[image.shape] = np.empty(image.shape,
+                                                      dtype=np.float32)
+    cmin, cmax = self.clims[i_img]
+    q_max = np.iinfo(self._texture_dtype).max
+    np.subtract(image, cmin, out=scratch, dtype=np.float32, casting='unsafe')
+    scratch *= q_max / (cmax - cmin) if cmax != cmin else 0
+    np.fmax(scratch, 0, out=scratch) # NaN becomes 0 too
+    np.fmin(scratch, q_max, out=scratch)
+    np.rint(scratch, out=scratch)
+    np.copyto(buf, scratch, casting='unsafe')
+    return buf
+
+  def _texture_matrix(self, scale):
+    """ Return the matrix that maps the texture of an image decimated by
+    scale (columns along local x, rows along local y) to the image plane, in
+    full-resolution units (i along x, j along y).
+    """
+    matrix = np.eye(4)
+    # Row vectors: x' = y * (+/-scale), y' = x * (+/-scale).
+    matrix[:2, :2] = [[0, -scale if self.flips[1] else scale],
+                      [-scale if self.flips[0] else scale, 0]]
+    matrix[3, :2] = [self.image_shape[0] if self.flips[0] else 0,
+                     self.image_shape[1] if self.flips[1] else 0]
+    return matrix
+
+  def _coarse_level(self):
+    """ Return the finest level of detail with at most lod_pixels pixels,
+    0 (the full resolution) if the slice is small enough already.
+    """
+    n_pixels = self.image_shape[0] * self.image_shape[1]
+    for level in range(len(self.lod_funcs) + 1):
+      if n_pixels / 4**level <= self.lod_pixels:
+        return level
+    return len(self.lod_funcs)
+
+  def _on_lod_timer(self, event):
+    """ The image has been still for lod_delay seconds: display the full
+    resolution slice at the current position.
+    """
+    if self.level > 0:
+      self._update_location(self.pos, coarse=False)
+      self.update()
+
   def _compute_bounds(self, axis_3d, view):
     """ Overwrite the original 2D bounds of the Image class. This will correct 
     the automatic range setting for the camera in the scene canvas. In the
@@ -245,16 +573,18 @@ class AxisAlignedImage(scene.visuals.Image):
     The function returns a tuple (low_bounds, high_bounds) that represents
     the spatial limits of self obj in the 3D scene.
     """
-    # Note: self.size[0] is slow dim size, self.size[1] is fast dim size.
+    # Note: image_shape[0] is slow dim size, image_shape[1] is fast dim size.
+    # The full-resolution shape is used, self.size follows the level shown.
+    size = self.image_shape
     if self.axis == 'z':
-      if   axis_3d==0: return (0, self.size[0])
-      elif axis_3d==1: return (0, self.size[1])
+      if   axis_3d==0: return (0, size[0])
+      elif axis_3d==1: return (0, size[1])
       elif axis_3d==2: return (self.pos, self.pos)
     elif self.axis == 'y':
-      if   axis_3d==0: return (0, self.size[0])
+      if   axis_3d==0: return (0, size[0])
       elif axis_3d==1: return (self.pos, self.pos)
-      elif axis_3d==2: return (0, self.size[1])
+      elif axis_3d==2: return (0, size[1])
     elif self.axis == 'x':
       if   axis_3d==0: return (self.pos, self.pos)
-      elif axis_3d==1: return (0, self.size[0])
-      elif axis_3d==2: return (0, self.size[1])
+      elif axis_3d==1: return (0, size[0])
+      elif axis_3d==2: return (0, size[1])
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .volume_source import as_source
+from .volume_stats import _file_spec, _open_spec, auto_clim
+
+
+def every_nth(shape, step, axes=('x', 'y')):
+  """ Return the slice positions [(axis, pos), ...] every step samples along
+  the given axes (x: inlines, y: crosslines by default), for shape (nx, ny,
+  nz).
+  """
+  positions = []
+  for axis in axes:
+    n = shape['xyz'.index(axis)]
+    positions += [(axis, pos) for pos in range(0, n, step)]
+  return positions
+
+
+def render_snapshots(vol, positions, camera_states=None, out_dir='.',
+                     filename='{axis}{pos:05d}_{camera}.png',
+                     size=(800, 720), n_workers=None, backend='osmesa',
+                     canvas_kwargs=None, **slice_kwargs):
+  """ Render snapshots of slices of a volume offscreen, e.g. the QC images
+  of every Nth inline and crossline of a survey, without opening a window.
+
+  Every position is rendered with every camera state. The snapshots are
+  split into one chunk per worker process; each worker opens its own
+  offscreen GL context (the app backend, OSMesa software rendering by
+  default), builds a SeismicCanvas once and moves its slice from snapshot to
+  snapshot. The PNG files are written by a background thread of each worker
+  (see ImageWriter), so the rendering never waits for the encoding.
+
+  Parameters:
+  vol: the volume, anything volume_slices accepts. Volumes backed by a file
+    (np.memmap, h5py dataset, Zarr array) are reopened by each worker;
+    in-memory arrays are copied to each worker.
+  positions: list of (axis, pos), axis in 'x', 'y', 'z'; see every_nth.
+  camera_states: list of camera states (dicts from camera.get_state()).
+    None renders the default view of SeismicCanvas.
+  filename: format of the file names in out_dir, with the fields axis, pos
+    and camera (the index in camera_states).
+  n_workers: int, number of worker processes, the CPU count by default.
+  backend: str, the vispy app backend of the workers, e.g. 'osmesa' or 'egl'.
+  canvas_kwargs: dict, extra parameters of SeismicCanvas.
+  slice_kwargs: extra parameters of volume_slices (cmaps, clims, ...).
+
+  Returns the list of the files written.
+  """
+  source = as_source(vol)
+  data = _file_spec(source)
+  if data is None:
+    data = np.asarray(source.data)
+  # The same clim in every worker, and the statistics computed only once.
+  clims = slice_kwargs.get('clims')
+  if clims is None or isinstance(clims, str):
+    slice_kwargs['clims'] = auto_clim(source, clims)
+  camera_states = camera_states if camera_states is not None else [None]
+
+  jobs = []
+  for axis, pos in positions:
+    for camera, state in enumerate(camera_states):
+      name = filename.format(axis=axis, pos=pos, camera=camera)
+      jobs.append((axis, int(pos), state, os.path.join(out_dir, name)))
+  if not jobs:
+    return []
+
+  n_workers = min(n_workers or os.cpu_count() or 1, len(jobs))
+  # Contiguous chunks: a worker moves its slice by small steps.
+  chunks = [list(chunk) for chunk in np.array_split(
+    np.arange(len(jobs)), n_workers)]
+  # Spawned workers: no GL or GUI state is inherited from this process.
+  context = multiprocessing.get_context('spawn')
+  with ProcessPoolExecutor(max_workers=n_workers,
+                           mp_context=context) as executor:
+    futures = [executor.submit(_render_chunk, data,
+                               [jobs[i] for i in chunk], size, backend,
+                               canvas_kwargs or {}, slice_kwargs)
+               for chunk in chunks]
+    for future in futures:
+      future.result() # raise the errors of the workers
+  return [job[-1] for job in jobs]
+
+
+def _render_chunk(data, jobs, size, backend, canvas_kwargs, slice_kwargs):
+  """ Render jobs [(axis, pos, camera_state, filename), ...] in a worker. """
+  from vispy import app
+  app.use_app(backend)
+  from .image_writer import ImageWriter
+  from .seismic_canvas import SeismicCanvas
+  from .volume_slices import volume_slices
+
+  if isinstance(data, tuple): # a spec, reopen the file
+    data = _open_spec(data)
+  # One slice node per axis, created at the first position of its axis.
+  nodes = {}
+  for axis, pos, _, _ in jobs:
+    if axis not in nodes:
+      nodes[axis], = volume_slices(data, **{axis + '_pos': pos},
+                                   **slice_kwargs)
+  canvas = SeismicCanvas(size=size, visual_nodes=list(nodes.values()),
+                         **canvas_kwargs)
+  camera = canvas.view[0].camera
+  default_state = camera.get_state()
+
+  with ImageWriter() as writer:
+    for axis, pos, state, filename in jobs:
+      for node_axis, node in nodes.items():
+        node.visible = node_axis == axis
+      node = nodes[axis]
+      if axis in ('y', 'z'):
+        pos = node.limit[1] - pos # reverted in seismic coordinate system
+      node._update_location(pos, coarse=False)
+      camera.set_state(state if state is not None else default_state)
+      writer.write(filename, canvas.render(alpha=False))
+  canvas.close()
+  return len(jobs)
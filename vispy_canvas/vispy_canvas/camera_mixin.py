@@ -1,58 +1,144 @@
-from vispy import scene
+import time
+import weakref
+
+from vispy import app, scene
 import numpy as np
-from PyQt5 import QtCore
+
+
+class AnimationClock:
+    """ A timer shared by the animated objects of a canvas (e.g. the cameras
+    of a SeismicCanvas grid). It only runs while some object is animated: an
+    object is added by start(obj), its animate(dt) is called on every tick
+    with the elapsed time in seconds, and it is removed when animate returns
+    False. The timer stops when nothing is left.
+
+    Parameters:
+    interval: float, the tick interval in seconds.
+    """
+    def __init__(self, interval=1/60.):
+        self.interval = interval
+        self._timer = None # created on first use, it needs an app backend
+        self._animated = []
+        self._last_tick = None
+
+    @property
+    def running(self):
+        return bool(self._animated)
+
+    def start(self, obj):
+        """ Animate obj from the next tick, start the timer if needed. """
+        if obj not in self._animated:
+            self._animated.append(obj)
+        if self._timer is None:
+            self._timer = app.Timer(interval=self.interval, connect=self._tick)
+        if not self._timer.running:
+            self._last_tick = time.perf_counter()
+            self._timer.start()
+
+    def stop(self, obj):
+        """ Stop animating obj, and the timer if it was the last one. """
+        if obj in self._animated:
+            self._animated.remove(obj)
+        if not self._animated and self._timer is not None:
+            self._timer.stop()
+
+    def _tick(self, event=None):
+        now = time.perf_counter()
+        # The real elapsed time: a slow frame animates further, not slower.
+        dt, self._last_tick = now - self._last_tick, now
+        for obj in list(self._animated):
+            if not obj.animate(dt):
+                self.stop(obj)
+
+
+_clocks = weakref.WeakKeyDictionary()
+_default_clock = AnimationClock()
+
+
+def get_animation_clock(canvas=None):
+    """ The AnimationClock shared by all the cameras of canvas. """
+    if canvas is None:
+        return _default_clock
+    if canvas not in _clocks:
+        _clocks[canvas] = AnimationClock()
+    return _clocks[canvas]
+
 
 class InertiaTurntableCamera(scene.cameras.TurntableCamera):
-    def __init__(self, inertia_factor=0.95, velocity_scale=0.1, *args, **kwargs):
+    """ A TurntableCamera that keeps rotating after a fling, slowing down
+    until it stops. The rotation speed of the drag is measured in degrees per
+    second; after the mouse release, the shared AnimationClock of the canvas
+    rotates the camera, and the speed decays by inertia_factor every 1/60 s
+    (whatever the actual frame rate). Nothing runs while the camera is idle.
+
+    Parameters:
+    inertia_factor: float, the speed decay per 1/60 second.
+    velocity_scale: float, the speed of the fling relative to the drag.
+    min_speed: float, the speed (degrees/s) under which the camera stops.
+    """
+    # A release later than this after the last move is not a fling.
+    fling_timeout = 0.1
+
+    def __init__(self, inertia_factor=0.95, velocity_scale=1.0,
+                 min_speed=1.0, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.inertia_factor = inertia_factor
         self.velocity_scale = velocity_scale
-        self.last_mouse_pos = None
-        self.mouse_vel = np.array([0.0, 0.0])
-        self.inertia_active = False
-        self.timer = QtCore.QTimer()
-        self.timer.timeout.connect(lambda: self.apply_inertia())
-        self.timer.start(16)  # ~60 FPS refresh rate
-
-
-    def on_mouse_move(self, event):
-        if event.is_dragging:
-            if self.last_mouse_pos is not None:
-                delta = (event.pos - self.last_mouse_pos) * self.velocity_scale
-                self.mouse_vel = delta
-                #print(f"Mouse velocity: {self.mouse_vel}")
-            self.last_mouse_pos = event.pos
-        else:
-            self.last_mouse_pos = None
-            if np.linalg.norm(self.mouse_vel) > 0:
-                self.inertia_active = True
-
-    def apply_inertia(self, _=None):
-        #if self.inertia_active:
-        #self.inertia_active = True
-        #print(f"Inertia active? {self.inertia_active}")
-        #print(f"Before decay: {self.mouse_vel}")
-        self.mouse_vel *= self.inertia_factor  # Apply slow decay
-        #print(f"After decay: {self.mouse_vel}")
-        
-        if np.linalg.norm(self.mouse_vel) < 0.00001:
-            self.mouse_vel = np.array([0.0, 0.0])
-            self.inertia_active = False
-
-            self._simulate_camera_movement(self.mouse_vel)
-
-    def _simulate_camera_movement(self, delta):
-        # Calculate delta based on the current mouse position
-        #print(f"Simulated delta: {delta}")
-
-        # Adjust azimuth and elevation based on delta
-        self.azimuth += delta[0] * 0.2  # Adjust this multiplier for sensitivity
-        self.elevation += delta[1] * 0.2  # Adjust this multiplier for sensitivity
-
-        # Apply the new state to the camera
-        self.set_state({'azimuth': self.azimuth, 'elevation': self.elevation})
-        print(f"Updated azimuth: {self.azimuth}, elevation: {self.elevation}")
-        
-
-        # Update last mouse position
-        self.last_mouse_pos = self.last_mouse_pos + delta if self.last_mouse_pos is not None else np.array([0.0, 0.0])
+        self.min_speed = min_speed
+        self.velocity = np.zeros(2) # azimuth, elevation in degrees/s
+        self._last_move = None # (time, azimuth, elevation) of the drag
+
+    @property
+    def inertia_active(self):
+        return self in self._clock()._animated
+
+    def _clock(self):
+        viewbox = self._viewbox
+        return get_animation_clock(viewbox.canvas if viewbox else None)
+
+    def viewbox_mouse_event(self, event):
+        if event.handled or not self.interactive:
+            return
+        if event.type == 'mouse_press':
+            self.stop_inertia()
+            self._last_move = None
+        super().viewbox_mouse_event(event)
+
+        if event.type == 'mouse_move' and event.press_event is not None:
+            now = time.perf_counter()
+            if self._last_move is not None:
+                t, azimuth, elevation = self._last_move
+                dt = now - t
+                if dt > 0:
+                    # Smoothed over the last moves, the events are noisy.
+                    speed = np.array([self.azimuth - azimuth,
+                                      self.elevation - elevation]) / dt
+                    self.velocity = 0.5 * self.velocity + 0.5 * speed
+            self._last_move = (now, self.azimuth, self.elevation)
+        elif event.type == 'mouse_release':
+            fling = (self._last_move is not None and
+                     time.perf_counter() - self._last_move[0] <
+                     self.fling_timeout)
+            self._last_move = None
+            self.velocity *= self.velocity_scale
+            if fling and np.hypot(*self.velocity) > self.min_speed:
+                self._clock().start(self)
+            else:
+                self.velocity[:] = 0
+
+    def animate(self, dt):
+        """ Rotate by the current speed for dt seconds and decay the speed.
+        Return False when the camera has stopped.
+        """
+        self.azimuth += self.velocity[0] * dt
+        self.elevation += self.velocity[1] * dt
+        self.velocity *= self.inertia_factor ** (dt * 60)
+        if np.hypot(*self.velocity) < self.min_speed:
+            self.velocity[:] = 0
+            return False
+        return True
+
+    def stop_inertia(self):
+        """ Stop the rotation started by a fling. """
+        self.velocity[:] = 0
+        self._clock().stop(self)
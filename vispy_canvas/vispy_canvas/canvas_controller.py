@@ -1,12 +1,18 @@
 
-from vispy import io
+import os
+
+import numpy as np
 from vispy.util import keys
-from vispy.gloo.util import _screenshot
 
 from .xyz_axis import XYZAxis
 from .axis_aligned_image import AxisAlignedImage
+from .image_writer import get_shared_writer
+from .slice_picking import pick_visual
 
 class CanvasControls:
+    # Resolution factor of the screenshot saved with <S> (<Shift>+<s>).
+    hires_scale = 4
+
     def on_mouse_press(self, event):
         # Hold <Ctrl> to enter drag mode or press <d> to toggle.
         if keys.CONTROL in event.modifiers or self.drag_mode:
@@ -14,7 +20,7 @@ class CanvasControls:
             # is masking all the visuals. See details at:
             # https://github.com/vispy/vispy/issues/1336
             self.view.interactive = False
-            hover_on = self.visual_at(event.pos)
+            hover_on = pick_visual(self, event.pos)
 
             if event.button == 1 and self.selected is None:
                 # If no previous selection, make a new selection if cilck on a valid
@@ -44,7 +50,7 @@ class CanvasControls:
             # is masking all the visuals. See details at:
             # https://github.com/vispy/vispy/issues/1336
             self.view.interactive = False
-            hover_on = self.visual_at(event.pos)
+            hover_on = pick_visual(self, event.pos)
 
             if event.button == 1:
                 if  self.selected is not None:
@@ -82,10 +88,11 @@ class CanvasControls:
             for child in self.view.children:
                 if type(child) == XYZAxis:
                     child._update_axis()
-        # Press <s> to save a screenshot.
-        if event.text == 's':
-            screenshot = _screenshot()
-            io.write_png(self.title + '.png', screenshot)
+        # Press <s> to save a screenshot, <S> for a high-resolution one.
+        if event.text in ('s', 'S'):
+            scale = self.hires_scale if event.text == 'S' else 1
+            self.screenshot(os.path.join(getattr(self, 'pngDir', './'),
+                                         self.title + '.png'), scale=scale)
 
         # Press <d> to toggle drag mode.
         if event.text == 'd':
@@ -138,4 +145,28 @@ class CanvasControls:
         if self.selected is not None:
             self.selected.highlight.visible = False
             self.selected.anchor = None
-            self.selected = None
\ No newline at end of file
+            self.selected = None
+
+    def screenshot(self, filename=None, scale=1, tile_size=2048, alpha=True):
+        """ Render the canvas offscreen at scale times its size and return the
+        image array (h, w, 4), or (h, w, 3) if alpha is False.
+
+        The view is rendered in tiles of at most tile_size pixels, each tile a
+        region of the canvas rendered into its own framebuffer, and stitched
+        into one preallocated array; so the size is not limited by the window
+        or the maximum framebuffer size. If filename is given, the PNG is
+        encoded and written on a background thread (see ImageWriter), and
+        this returns without waiting for it.
+        """
+        width, height = (int(round(n * scale)) for n in self.size)
+        image = np.empty((height, width, 4 if alpha else 3), dtype=np.uint8)
+        for y0 in range(0, height, tile_size):
+            for x0 in range(0, width, tile_size):
+                w = min(tile_size, width - x0)
+                h = min(tile_size, height - y0)
+                region = (x0 / scale, y0 / scale, w / scale, h / scale)
+                image[y0:y0+h, x0:x0+w] = self.render(
+                    region=region, size=(w, h), alpha=alpha)
+        if filename is not None:
+            get_shared_writer().write(filename, image)
+        return image
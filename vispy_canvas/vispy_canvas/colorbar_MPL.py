@@ -1,133 +1,206 @@
-# -*- coding: utf-8 -*-
-# -----------------------------------------------------------------------------
-# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
-# All rights reserved.
-# Distributed under the MIT License. See LICENSE for more info.
-# ------------------------------------------------------------------------------
-
-import io
-import numpy as np
-import matplotlib as mpl
-import matplotlib.pyplot as plt
-plt.style.use('seaborn-notebook')
-from matplotlib.colors import LinearSegmentedColormap
-from mpl_toolkits.axes_grid1 import make_axes_locatable
-from vispy import scene
-from vispy.color import get_colormap
-from vispy.util.dpi import get_dpi
-from vispy.visuals.transforms import MatrixTransform
-
-
-class Colorbar(scene.visuals.Image):
-  """ A colorbar visual fixed to the right side of the canvas. This is
-  based on the rendering from Matplotlib, then display this rendered
-  image as a scene.visuals.Image visual node on the canvas.
-
-  Parameters:
-
-  """
-  def __init__(self, size=(500, 10), cmap='grays', clim=None,
-               label_str="Colorbar", label_color='black',
-               label_size=12, tick_size=10,
-               border_width=1.0, border_color='black',
-               visible=True, parent=None):
-
-    assert clim is not None, 'clim must be specified explicitly.'
-
-    # Create a scene.visuals.Image (without parent by default).
-    scene.visuals.Image.__init__(self, parent=None,
-      interpolation='nearest', method='auto')
-    self.unfreeze()
-    self.visible = visible
-    self.canvas_size = None # will be set when parent is linked
-
-    # Record the important drawing parameters.
-    self.pos = (0, 0)
-    self.bar_size = size # tuple
-    self.cmap = get_colormap(cmap) # vispy Colormap
-    self.clim = clim # tuple
-
-    # Record the styling parameters.
-    self.label_str = label_str
-    self.label_color = label_color
-    self.label_size = label_size
-    self.tick_size = tick_size
-    self.border_width = border_width
-    self.border_color = border_color
-
-    # Draw colorbar using Matplotlib.
-    self.set_data(self._draw_colorbar())
-
-    # Give a Matrix transform to self in order to move around canvas.
-    self.transform = MatrixTransform()
-
-    self.freeze()
-
-  def on_resize(self, event):
-    """ When window is resized, only need to move the position in vertical
-    direction, because the coordinate is relative to the secondary ViewBox
-    that stays on the right side of the canvas.
-    """
-    pos = np.array(self.pos).astype(np.single)
-    pos[1] *= event.size[1] / self.canvas_size[1]
-    self.pos = tuple(pos)
-
-    # Move the colorbar to specified position (with half-size padding, because
-    # Image visual uses a different anchor (top-left corner) rather than the
-    # center-left corner used by ColorBar visual.).
-    self.transform.reset()
-    self.transform.translate((self.pos[0]/2.618, # make the gap smaller :)
-                              self.pos[1] - self.size[1]/2.))
-
-    # Update the canvas size.
-    self.canvas_size = event.size
-
-  def _draw_colorbar(self):
-    """ Draw a Matplotlib colorbar, save this figure without any boundary to a
-    rendering buffer, and return this buffer as a numpy array.
-    """
-    dpi = get_dpi()
-    # Compute the Matplotlib figsize: note the order of width, height.
-    # The width is doubled because we will only keep the colorbar portion
-    # before we export this image to buffer!
-    figsize = (self.bar_size[1]/dpi * 2, self.bar_size[0]/dpi)
-
-    # Convert cmap and clim to Matplotlib format.
-    rgba = self.cmap.colors.rgba
-    # Blend to white to avoid this Matplotlib rendering issue:
-    # https://github.com/matplotlib/matplotlib/issues/1188
-    for i in range(3):
-      rgba[:, i] = (1 - rgba[:, -1]) + rgba[:, -1]*rgba[:, i]
-    rgba[:, -1] = 1.
-    if len(rgba) < 2: # in special case of 'grays' cmap!
-      rgba = np.array([[0,0,0, 1.], [1,1,1, 1.]])
-    cmap = LinearSegmentedColormap.from_list('vispy_cmap', rgba)
-    norm = mpl.colors.Normalize(vmin=self.clim[0], vmax=self.clim[1])
-    sm = plt.cm.ScalarMappable(cmap=cmap, norm=norm)
-
-    # Put the colorbar at proper location on the Matplotlib fig.
-    fig = plt.figure(figsize=figsize, dpi=dpi)
-    ax = plt.Axes(fig, [0, 0, 1, 1])
-    ax.set_axis_off()
-    fig.add_axes(ax)
-    divider = make_axes_locatable(ax)
-    cax = divider.append_axes('right', size='100%', pad=0.)
-    cb = fig.colorbar(sm, cax=cax)
-    ax.remove()
-
-    # Apply styling to the colorbar.
-    cb.set_label(self.label_str,
-      color=self.label_color, fontsize=self.label_size)
-    plt.setp(plt.getp(cb.ax.axes, 'yticklabels'),
-      color=self.label_color, fontsize=self.tick_size)
-    cb.ax.yaxis.set_tick_params(color=self.label_color)
-    cb.outline.set_linewidth(self.border_width)
-    cb.outline.set_edgecolor(self.border_color)
-
-    # Export the rendering to a numpy array in the buffer.
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png',
-      bbox_inches='tight', pad_inches=0, dpi=dpi, transparent=True)
-    buf.seek(0)
-
-    return plt.imread(buf)
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# ------------------------------------------------------------------------------
+
+import hashlib
+import io
+import json
+import os
+import numpy as np
+from vispy import scene
+from vispy.color import Color, get_colormap
+from vispy.util.dpi import get_dpi
+from vispy.visuals.transforms import MatrixTransform
+
+
+class Colorbar(scene.visuals.Image):
+  """ A colorbar visual fixed to the right side of the canvas. This is
+  based on the rendering from Matplotlib, then display this rendered
+  image as a scene.visuals.Image visual node on the canvas.
+
+  Parameters:
+
+  """
+  def __init__(self, size=(500, 10), cmap='grays', clim=None,
+               label_str="Colorbar", label_color='black',
+               label_size=12, tick_size=10,
+               border_width=1.0, border_color='black',
+               visible=True, parent=None):
+
+    assert clim is not None, 'clim must be specified explicitly.'
+
+    # Create a scene.visuals.Image (without parent by default).
+    scene.visuals.Image.__init__(self, parent=None,
+      interpolation='nearest', method='auto')
+    self.unfreeze()
+    self.visible = visible
+    self.canvas_size = None # will be set when parent is linked
+
+    # Record the important drawing parameters.
+    self.pos = (0, 0)
+    self.bar_size = size # tuple
+    self.cmap = get_colormap(cmap) # vispy Colormap
+    self.clim = clim # tuple
+
+    # Record the styling parameters.
+    self.label_str = label_str
+    self.label_color = label_color
+    self.label_size = label_size
+    self.tick_size = tick_size
+    self.border_width = border_width
+    self.border_color = border_color
+
+    # Draw colorbar using Matplotlib, or reuse a previous rendering.
+    self.set_data(get_colorbar_image(self._style()))
+
+    # Give a Matrix transform to self in order to move around canvas.
+    self.transform = MatrixTransform()
+
+    self.freeze()
+
+  def on_resize(self, event):
+    """ When window is resized, only need to move the position in vertical
+    direction, because the coordinate is relative to the secondary ViewBox
+    that stays on the right side of the canvas.
+    """
+    pos = np.array(self.pos).astype(np.single)
+    pos[1] *= event.size[1] / self.canvas_size[1]
+    self.pos = tuple(pos)
+
+    # Move the colorbar to specified position (with half-size padding, because
+    # Image visual uses a different anchor (top-left corner) rather than the
+    # center-left corner used by ColorBar visual.).
+    self.transform.reset()
+    self.transform.translate((self.pos[0]/2.618, # make the gap smaller :)
+                              self.pos[1] - self.size[1]/2.))
+
+    # Update the canvas size.
+    self.canvas_size = event.size
+
+  def _style(self):
+    """ All the parameters the rendering depends on, the key of the cache. """
+    return {'rgba': self.cmap.colors.rgba.round(6).tolist(),
+            'clim': [float(c) for c in self.clim],
+            'size': [int(s) for s in self.bar_size],
+            'dpi': float(get_dpi()),
+            'label_str': self.label_str,
+            'label_color': _rgba(self.label_color),
+            'label_size': self.label_size,
+            'tick_size': self.tick_size,
+            'border_width': self.border_width,
+            'border_color': _rgba(self.border_color),
+            'version': _RENDER_VERSION}
+
+
+def _rgba(color):
+  """ A color (name, hex string or tuple) as a JSON-safe [r, g, b, a] list,
+  which Matplotlib accepts as is. Normalized by vispy: Matplotlib is not
+  imported on a cache hit.
+  """
+  return [round(float(c), 6) for c in Color(color).rgba]
+
+
+# Bump when _draw_colorbar changes, to invalidate the files of the disk cache.
+_RENDER_VERSION = 1
+_colorbar_images = {} # in-memory cache, key -> RGBA image
+
+
+def colorbar_cache_path(key):
+  """ The file caching a rendered colorbar: ~/.cache/vispy_canvas/colorbars. """
+  return os.path.join(os.path.expanduser('~'), '.cache', 'vispy_canvas',
+                      'colorbars', key + '.npy')
+
+
+def get_colorbar_image(style):
+  """ Return the RGBA image of the colorbar described by style (see
+  Colorbar._style). The images are cached in memory and on disk, so
+  Matplotlib is only imported and run for a colorbar never rendered before.
+  """
+  key = hashlib.sha1(json.dumps(style, sort_keys=True).encode()).hexdigest()
+  image = _colorbar_images.get(key)
+  if image is not None:
+    return image
+  path = colorbar_cache_path(key)
+  try:
+    image = np.load(path)
+  except (OSError, ValueError):
+    image = _draw_colorbar(style)
+    try:
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+      with open(tmp_path, 'wb') as f:
+        np.save(f, image)
+      os.replace(tmp_path, path) # atomic, for concurrent processes
+    except OSError:
+      pass # colorbars are only cached, never required
+  _colorbar_images[key] = image
+  return image
+
+
+def _draw_colorbar(style):
+  """ Draw a Matplotlib colorbar, save this figure without any boundary to a
+  rendering buffer, and return this buffer as a numpy array.
+  """
+  # Imported here: Matplotlib is slow to import and only needed on cache miss.
+  # The Agg figure avoids pyplot, its GUI backend and its global state.
+  from matplotlib import artist, cm, image, style as mpl_style
+  from matplotlib.backends.backend_agg import FigureCanvasAgg
+  from matplotlib.colors import LinearSegmentedColormap, Normalize
+  from matplotlib.figure import Figure
+  from mpl_toolkits.axes_grid1 import make_axes_locatable
+
+  dpi = style['dpi']
+  bar_size = style['size']
+  # Compute the Matplotlib figsize: note the order of width, height.
+  # The width is doubled because we will only keep the colorbar portion
+  # before we export this image to buffer!
+  figsize = (bar_size[1]/dpi * 2, bar_size[0]/dpi)
+
+  # Convert cmap and clim to Matplotlib format.
+  rgba = np.array(style['rgba'])
+  # Blend to white to avoid this Matplotlib rendering issue:
+  # https://github.com/matplotlib/matplotlib/issues/1188
+  for i in range(3):
+    rgba[:, i] = (1 - rgba[:, -1]) + rgba[:, -1]*rgba[:, i]
+  rgba[:, -1] = 1.
+  if len(rgba) < 2: # in special case of 'grays' cmap!
+    rgba = np.array([[0,0,0, 1.], [1,1,1, 1.]])
+  cmap = LinearSegmentedColormap.from_list('vispy_cmap', rgba)
+  norm = Normalize(vmin=style['clim'][0], vmax=style['clim'][1])
+  sm = cm.ScalarMappable(cmap=cmap, norm=norm)
+
+  # The style sheet is scoped to this figure ('seaborn-notebook' was renamed
+  # in Matplotlib 3.6).
+  sheet = 'seaborn-notebook'
+  if sheet not in mpl_style.available:
+    sheet = 'seaborn-v0_8-notebook'
+  with mpl_style.context(sheet):
+    # Put the colorbar at proper location on the Matplotlib fig.
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_axis_off()
+    divider = make_axes_locatable(ax)
+    cax = divider.append_axes('right', size='100%', pad=0.)
+    cb = fig.colorbar(sm, cax=cax)
+    ax.remove()
+
+    # Apply styling to the colorbar.
+    cb.set_label(style['label_str'],
+      color=style['label_color'], fontsize=style['label_size'])
+    artist.setp(cb.ax.get_yticklabels(),
+      color=style['label_color'], fontsize=style['tick_size'])
+    cb.ax.yaxis.set_tick_params(color=style['label_color'])
+    cb.outline.set_linewidth(style['border_width'])
+    cb.outline.set_edgecolor(style['border_color'])
+
+    # Export the rendering to a numpy array in the buffer.
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png',
+      bbox_inches='tight', pad_inches=0, dpi=dpi, transparent=True)
+  buf.seek(0)
+
+  return image.imread(buf)
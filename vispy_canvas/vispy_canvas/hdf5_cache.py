@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import numpy as np
+
+
+# The HDF5 chunk cache of a dataset, when the layout is not looked at.
+DEFAULT_CACHE = {'nbytes': 1 << 20, 'nslots': 521, 'w0': 0.75}
+
+
+def next_prime(n):
+  """ The smallest prime number greater than or equal to n. """
+  n = max(int(n), 2)
+  while True:
+    if all(n % d for d in range(2, int(n**0.5) + 1)):
+      return n
+    n += 1
+
+
+def chunk_cache_config(shape, chunks, itemsize, axes=(0, 1, 2),
+                       max_bytes=1 << 30, w0=0.75):
+  """ Compute the HDF5 chunk cache of a chunked dataset that holds at least
+  the chunks of one full slice along each of the given axes; so moving a
+  slice to the next position within the same chunks hits the cache, instead
+  of reading and decompressing all these chunks again.
+
+  The number of hash slots is a prime about 100 times the number of chunks
+  the cache holds, as advised by the HDF5 documentation, so the chunks of
+  a slice do not collide in the hash table.
+
+  Parameters:
+  axes: the axes that will be sliced.
+  max_bytes: int, the upper bound of the cache size; a slice larger than
+    that does not fit and is reported so.
+
+  Returns a dict with the cache parameters nbytes, nslots and w0, and the
+  report of the choice: slice_chunks and slice_bytes {axis: ...}, the chunks
+  and bytes of a slice along each axis, and fits {axis: bool}.
+  """
+  n_chunks = [int(np.ceil(n / c)) for n, c in zip(shape, chunks)]
+  chunk_bytes = int(np.prod(chunks)) * itemsize
+  slice_chunks, slice_bytes = {}, {}
+  for axis in axes:
+    others = [k for k in range(3) if k != axis]
+    slice_chunks[axis] = n_chunks[others[0]] * n_chunks[others[1]]
+    slice_bytes[axis] = slice_chunks[axis] * chunk_bytes
+  needed = max(slice_bytes.values()) if slice_bytes else chunk_bytes
+  nbytes = int(min(max(needed, chunk_bytes), max_bytes))
+  # HDF5 does not cache a chunk larger than the cache.
+  nbytes = max(nbytes, chunk_bytes)
+  nslots = next_prime(100 * max(nbytes // chunk_bytes, 1))
+  return {'nbytes': nbytes, 'nslots': nslots, 'w0': w0,
+          'chunks': tuple(chunks), 'chunk_bytes': chunk_bytes,
+          'slice_chunks': slice_chunks, 'slice_bytes': slice_bytes,
+          'fits': {axis: b <= nbytes for axis, b in slice_bytes.items()}}
+
+
+def format_cache_config(name, config):
+  """ One line describing the chunk cache chosen for dataset name. """
+  slices = ', '.join(
+    '{}: {} chunks{}'.format('xyz'[axis], config['slice_chunks'][axis],
+                             '' if config['fits'][axis] else ' (too large)')
+    for axis in sorted(config['slice_chunks']))
+  return ('{}: chunks {} of {:.2f} MB, chunk cache {:.1f} MB with {} slots '
+          '(slice {})'.format(name, config['chunks'],
+                              config['chunk_bytes'] / 2**20,
+                              config['nbytes'] / 2**20, config['nslots'],
+                              slices))
+
+
+def open_hdf5_dataset(h5file, name, chunk_cache='auto', axes=(0, 1, 2),
+                      max_bytes=1 << 30, verbose=False):
+  """ Open the dataset name of an open h5py File with its own chunk cache,
+  sized from its chunk layout by chunk_cache_config.
+
+  Parameters:
+  chunk_cache: 'auto'; None to keep the cache of the file; or a dict with
+    the nbytes, nslots and w0 of the cache.
+  verbose: print the choice (see format_cache_config).
+
+  Returns (dataset, config), config is None if the cache of the file is
+  kept (chunk_cache None, or a contiguous dataset). The cache is ignored if
+  the dataset is already open elsewhere, HDF5 then shares the open one.
+  """
+  import h5py
+  dset = h5file[name]
+  if chunk_cache is None or dset.chunks is None:
+    return dset, None
+  shape, chunks, itemsize = dset.shape, dset.chunks, dset.dtype.itemsize
+  path = dset.name
+  # HDF5 shares the open datasets: an open one would keep its own cache.
+  del dset
+  if chunk_cache == 'auto':
+    config = chunk_cache_config(shape, chunks, itemsize, axes=axes,
+                                max_bytes=max_bytes)
+  else:
+    config = dict(DEFAULT_CACHE, **chunk_cache)
+  dapl = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+  dapl.set_chunk_cache(config['nslots'], config['nbytes'], config['w0'])
+  dset = h5py.Dataset(h5py.h5d.open(h5file.id, path.encode(), dapl))
+  if verbose and 'slice_chunks' in config:
+    print(format_cache_config(name, config))
+  return dset, config
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import functools
+import zlib
+
+import numpy as np
+
+from .volume_source import ChunkedSource, HDF5Source, read_chunk_box
+
+
+# HDF5 filter identifiers (h5py.h5z), decoded here without HDF5.
+FILTER_DEFLATE = 1
+FILTER_SHUFFLE = 2
+FILTER_FLETCHER32 = 3
+FILTER_LZF = 32000
+
+
+def _lzf_decompress():
+  """ The LZF decompressor of the python-lzf package, or None. """
+  try:
+    import lzf
+  except ImportError:
+    return None
+  return lzf.decompress
+
+
+class DirectChunkHDF5Source(ChunkedSource, HDF5Source):
+  """ A VolumeSource of a chunked h5py dataset that decompresses the chunks
+  in parallel. h5py serializes all the HDF5 calls behind a global lock, so
+  a hyperslab read decompresses its chunks on one core. Here the raw bytes
+  of the chunks a slice intersects are read with read_direct_chunk (only
+  I/O under the lock), then decoded on a thread pool (zlib and lzf release
+  the GIL) and copied into a preallocated buffer.
+
+  The deflate, shuffle, fletcher32 and lzf (with python-lzf) filters are
+  decoded; a dataset with other filters (or not chunked) is read through
+  HDF5 as by HDF5Source, see the direct attribute. The HDF5 chunk cache is
+  bypassed: use a slice cache for the repeated reads.
+  """
+  def __init__(self, data, reverse=(False, False, False), h5file=None,
+               chunk_cache=None):
+    HDF5Source.__init__(self, data, reverse=reverse, h5file=h5file,
+                        chunk_cache=chunk_cache)
+    self.chunks = data.chunks
+    self.filters = self._filters()
+    self.direct = self.filters is not None
+
+  def _filters(self):
+    """ The filter pipeline [(id, ...)] in write order, or None if a filter
+    cannot be decoded here.
+    """
+    if self.data.chunks is None:
+      return None
+    dcpl = self.data.id.get_create_plist()
+    filters = [dcpl.get_filter(k)[0] for k in range(dcpl.get_nfilters())]
+    known = {FILTER_DEFLATE, FILTER_SHUFFLE, FILTER_FLETCHER32}
+    if _lzf_decompress() is not None:
+      known.add(FILTER_LZF)
+    if not set(filters) <= known:
+      return None
+    return filters
+
+  def _reads_boxes(self):
+    return self.direct
+
+  def _read_box(self, box, steps=(1, 1, 1)):
+    """ Read the box [(start, stop)] * 3 of the dataset: the raw chunks are
+    read sequentially and decoded in parallel, see read_chunk_box. A
+    strided read (e.g. an overview) skips the chunks without a kept sample.
+    """
+    return read_chunk_box(box, self.chunks, self.dtype, self._read_chunk,
+                          steps)
+
+  def _read_chunk(self, coords, src):
+    offset = tuple(n * c for n, c in zip(coords, self.chunks))
+    try:
+      mask, raw = self.data.id.read_direct_chunk(offset)
+    except (KeyError, RuntimeError, ValueError): # not allocated
+      fill = self.data.fillvalue
+      return fill if fill is not None else 0
+    return functools.partial(self._decode_chunk, mask, raw)
+
+  def _decode_chunk(self, mask, raw):
+    return np.frombuffer(self._decode(raw, mask),
+                         dtype=self.dtype).reshape(self.chunks)
+
+  def _decode(self, buf, mask):
+    """ Undo the filter pipeline on the raw bytes of a chunk. """
+    n_bytes = int(np.prod(self.chunks)) * self.dtype.itemsize
+    for k in reversed(range(len(self.filters))):
+      if mask & (1 << k):
+        continue # this filter was skipped for the chunk
+      f = self.filters[k]
+      if f == FILTER_DEFLATE:
+        buf = zlib.decompress(buf)
+      elif f == FILTER_LZF:
+        buf = _lzf_decompress()(buf, n_bytes)
+      elif f == FILTER_FLETCHER32:
+        buf = buf[:-4] # the checksum is not verified
+      elif f == FILTER_SHUFFLE:
+        itemsize = self.dtype.itemsize
+        buf = np.frombuffer(buf, dtype=np.uint8).reshape(
+          itemsize, -1).T.tobytes()
+    return buf
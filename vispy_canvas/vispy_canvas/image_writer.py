@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import atexit
+import os
+import queue
+import threading
+
+from vispy import io
+
+
+class ImageWriter(object):
+  """ Write images to PNG files on a background thread, so the rendering
+  does not wait for the PNG encoding.
+
+  write(filename, image) only queues the image. The queue is bounded: when
+  max_pending images are waiting, write blocks until one is written, so the
+  memory stays flat if the encoding is slower than the rendering. close()
+  waits for the queued images. An error of the writing thread is raised by
+  the next write or close; the images still queued until then are dropped.
+
+  Parameters:
+  max_pending: int, the maximum number of images waiting to be written.
+  """
+  def __init__(self, max_pending=8):
+    self.written = 0
+    self._queue = queue.Queue(maxsize=max_pending)
+    self._error = None
+    self._thread = threading.Thread(target=self._run, name='image-writer',
+                                    daemon=True)
+    self._thread.start()
+
+  def write(self, filename, image):
+    """ Queue image (an (h, w, 3|4) uint8 array) to be saved as filename.
+    Raise the error of a previous write, if any, once.
+    """
+    error, self._error = self._error, None
+    if error is not None:
+      raise error
+    self._queue.put((filename, image))
+
+  def close(self):
+    """ Write the queued images and stop the thread. """
+    self._queue.put(None)
+    self._thread.join()
+    if self._error is not None:
+      raise self._error
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.close()
+
+  def _run(self):
+    while True:
+      item = self._queue.get()
+      if item is None:
+        return
+      if self._error is not None:
+        continue # drain the queue, the error is raised by write/close
+      filename, image = item
+      try:
+        directory = os.path.dirname(filename)
+        if directory:
+          os.makedirs(directory, exist_ok=True)
+        io.write_png(filename, image)
+        self.written += 1
+      except Exception as error:
+        self._error = error
+
+
+_shared_writer = None
+
+def get_shared_writer():
+  """ The ImageWriter shared by the screenshots of all canvases, its queued
+  images are written before the interpreter exits.
+  """
+  global _shared_writer
+  if _shared_writer is None:
+    _shared_writer = ImageWriter()
+    atexit.register(_shared_writer.close)
+  return _shared_writer
@@ -13,10 +13,16 @@
 from typing import Dict, List, Tuple, Union
 from vispy import scene
 
-import cigvis
 from .xyz_axis import XYZAxis
 from .colorbar import Colorbar
 from .canvas_controller import CanvasControls
+from .camera_mixin import InertiaTurntableCamera
+
+
+def _is_axis_reversed():
+    # cigvis is imported on first use: it is heavy and it imports this package.
+    import cigvis
+    return cigvis.is_axis_reversed()
 
 
 class SeismicCanvas(scene.SceneCanvas, CanvasControls):
@@ -59,6 +65,9 @@ class SeismicCanvas(scene.SceneCanvas, CanvasControls):
         axis scale, default is (1, 1, 1)
     auto_range : bool
         default is True
+    inertia : bool
+        whether the cameras keep rotating after a fling, driven by one
+        animation clock shared by all the cameras of the canvas
     
     savedir : str
         the dir to save sreenshot when press <s>
@@ -84,6 +93,7 @@ class SeismicCanvas(scene.SceneCanvas, CanvasControls):
         zoom_factor: float = 1.0,
         axis_scales: Tuple = (1.0, 1.0, 1.0),
         auto_range: bool = True,
+        inertia: bool = False,
 
         # for save
         savedir: str = './',
@@ -115,9 +125,10 @@ class SeismicCanvas(scene.SceneCanvas, CanvasControls):
             zoom_factor = 1
         self.zoom_factor = zoom_factor
         self.share = share
+        self.inertia = inertia
 
         axis_scales = list(axis_scales)
-        for i, r in enumerate(cigvis.is_axis_reversed()):
+        for i, r in enumerate(_is_axis_reversed()):
             axis_scales[i] *= (1 - 2 * r)
         self.axis_scales = axis_scales
 
@@ -153,7 +164,7 @@ class SeismicCanvas(scene.SceneCanvas, CanvasControls):
 
     def update_axis_scales(self, axis_scales):
         axis_scales = list(axis_scales)
-        for i, r in enumerate(cigvis.is_axis_reversed()):
+        for i, r in enumerate(_is_axis_reversed()):
             axis_scales[i] *= (1 - 2 * r)
         self.axis_scales = axis_scales
 
@@ -264,7 +275,9 @@ class SeismicCanvas(scene.SceneCanvas, CanvasControls):
         """
         # set azimuth=0 and elevation=0, for convenient lighting
         # change them in self._attach_light() function
-        view.camera = scene.cameras.TurntableCamera(
+        camera_class = (InertiaTurntableCamera if self.inertia else
+                        scene.cameras.TurntableCamera)
+        view.camera = camera_class(
             # self.camera = scene.cameras.ArcballCamera(
             scale_factor=self.scale_factor,
             center=self.center,
@@ -82,7 +82,8 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls):
                                     y_pos=self.ypos, 
                                     z_pos=self.zpos, 
                                     cmaps='gray',
-                                    clims = [-1000, 1000]
+                                    clims = [-1000, 1000],
+                                    lazy=True
                                     )
         
         # Add the slices to the scene
@@ -96,15 +97,12 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls):
         self.view.add(edges)
 
         # Draw axis labels
-        label_x_list, label_y_list, label_z_list, label_name_x, label_name_y, label_name_z = self.grid.draw_labels(parent=self.view)
+        label_x, label_y, label_z, label_name_x, label_name_y, label_name_z = self.grid.draw_labels(parent=self.view)
 
         # Add labels to the view
-        for label_x in label_x_list: 
-            self.view.add(label_x)
-        for label_y in label_y_list:
-            self.view.add(label_y)
-        for label_z in label_z_list:
-            self.view.add(label_z)
+        self.view.add(label_x)
+        self.view.add(label_y)
+        self.view.add(label_z)
         self.view.add(label_name_x)
         self.view.add(label_name_y)
         self.view.add(label_name_z)
@@ -3,6 +3,7 @@ from PyQt5 import QtWidgets, QtCore
 from vispy import scene
 from vispy_canvas import volume_slices_hdf5_pilot, XYZAxis, CanvasControls, AxisAlignedImage
 from vispy_canvas.viewbox_labeled_grid import GridLines
+from vispy_canvas.hdf5_cache import open_hdf5_dataset
 from typing import Union, Tuple, List, Dict
 import h5py
 
@@ -83,7 +84,10 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls, GridLines):
                                     y_pos=self.ypos, 
                                     z_pos=self.zpos, 
                                     cmaps='gray',
-                                    clims = [-1000, 1000]
+                                    clims = [-1000, 1000],
+                                    # Read ahead while dragging, strided
+                                    # chunk reads are slow on this file.
+                                    prefetch=4
                                     )
         
 
@@ -114,15 +118,12 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls, GridLines):
         self.view.add(edges)
 
         # Draw axis labels
-        label_x_list, label_y_list, label_z_list, label_name_x, label_name_y, label_name_z = self.grid.draw_labels(parent=self.view)
+        label_x, label_y, label_z, label_name_x, label_name_y, label_name_z = self.grid.draw_labels(parent=self.view)
 
         # Add labels to the view
-        for label_x in label_x_list: 
-            self.view.add(label_x)
-        for label_y in label_y_list:
-            self.view.add(label_y)
-        for label_z in label_z_list:
-            self.view.add(label_z)
+        self.view.add(label_x)
+        self.view.add(label_y)
+        self.view.add(label_z)
         self.view.add(label_name_x)
         self.view.add(label_name_y)
         self.view.add(label_name_z)
@@ -150,18 +151,12 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls, GridLines):
         self.freeze()
 
     def load_data(self, filepath, dtype=np.float32):
-        # Configure cache options for reading
-        rdcc_nbytes = 1024 * 1024 * 64  # 64 MB cache size
-        rdcc_nslots = 521  # Number of chunk slots in the cache
-        rdcc_w0 = 0.75  # Eviction policy
         # Open the HDF5 file and read the chunked dataset
-        self.hdf5_file = h5py.File(filepath, 
-                                   'r+', 
-                                   rdcc_nbytes=rdcc_nbytes, 
-                                   rdcc_nslots=rdcc_nslots, 
-                                   rdcc_w0=rdcc_w0)
-        # Access the dataset
-        self.vol = self.hdf5_file['74ea1350-14c0-4bcc-a5d1-02fa49095951']  # Adjust the path to match your dataset
+        self.hdf5_file = h5py.File(filepath, 'r+')
+        # Access the dataset, with a chunk cache sized from its chunk layout
+        self.vol, _ = open_hdf5_dataset(self.hdf5_file,
+                                        '74ea1350-14c0-4bcc-a5d1-02fa49095951',  # Adjust the path to match your dataset
+                                        verbose=True)
 
             
     def set_position(self, pos, axis):
@@ -97,15 +97,12 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls, GridLines):
         self.view.add(edges)
 
         # Draw axis labels
-        label_x_list, label_y_list, label_z_list, label_name_x, label_name_y, label_name_z = self.grid.draw_labels(parent=self.view)
+        label_x, label_y, label_z, label_name_x, label_name_y, label_name_z = self.grid.draw_labels(parent=self.view)
 
         # Add labels to the view
-        for label_x in label_x_list: 
-            self.view.add(label_x)
-        for label_y in label_y_list:
-            self.view.add(label_y)
-        for label_z in label_z_list:
-            self.view.add(label_z)
+        self.view.add(label_x)
+        self.view.add(label_y)
+        self.view.add(label_z)
         self.view.add(label_name_x)
         self.view.add(label_name_y)
         self.view.add(label_name_z)
@@ -113,13 +110,6 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls, GridLines):
         # Set up a 3D camera with inertia
         self.camera = InertiaTurntableCamera(fov=45, elevation=30, azimuth=30)
 
-        self.view.camera = self.camera
-        # Connect events
-        self.events.mouse_move.connect(self.camera.on_mouse_move)
-        self.events.mouse_press.connect(self.camera.on_mouse_move)
-        self.events.mouse_release.connect(self.camera.on_mouse_move)
-        self.events.mouse_release.connect(self.camera.apply_inertia)
-
         self.view.camera = self.camera
 
         # Automatically set the range of the canvas, display, and wrap up.
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SliceCache(object):
+  """ A byte-bounded LRU cache of 2D slice images, shared by all the image
+  functions created by volume_slices. The entries are keyed by
+  (volume id, axis, position, preproc function), so moving a slice back and
+  forth never touches the memmap/HDF5 storage again for a revisited position.
+
+  Parameters:
+  max_bytes: int, the total size (in bytes) of the cached images. The least
+    recently used images are evicted when this budget is exceeded.
+  """
+  def __init__(self, max_bytes=256*1024*1024):
+    self.max_bytes = int(max_bytes)
+    self.nbytes = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self._entries = OrderedDict()
+    self._lock = threading.RLock()
+    # Volumes registered by volume_id(), in order to purge their entries
+    # once the volume object is garbage collected (and its id is reused).
+    self._volumes = {}
+
+  def volume_id(self, vol):
+    """ Return a key that identifies the volume object in the cache. The
+    entries of this volume are discarded when the volume is released. A
+    volume that cannot be weak-referenced is held by the cache instead,
+    until forget(vol) or clear() is called.
+    """
+    key = id(vol)
+    with self._lock:
+      if key not in self._volumes:
+        try:
+          self._volumes[key] = weakref.finalize(vol, self.discard_volume, key)
+        except TypeError:
+          # Not weak-referenceable, hold the volume so the id stays valid.
+          self._volumes[key] = vol
+    return key
+
+  def get(self, key, default=None):
+    """ Return the cached image of key, and mark it as the most recently
+    used one. Return default if not cached.
+    """
+    with self._lock:
+      image = self._entries.get(key)
+      if image is None:
+        self.misses += 1
+        return default
+      self._entries.move_to_end(key)
+      self.hits += 1
+      return image
+
+  def put(self, key, image):
+    """ Insert an image into the cache, evicting the least recently used
+    images if the byte budget is exceeded. The stored image is a read-only,
+    contiguous copy so it no longer refers to the storage of the volume.
+    Return the stored image.
+    """
+    image = np.array(image, order='C', copy=True)
+    image.setflags(write=False)
+    if image.nbytes > self.max_bytes:
+      return image # too large to be cached at all
+    with self._lock:
+      old = self._entries.pop(key, None)
+      if old is not None:
+        self.nbytes -= old.nbytes
+      self._entries[key] = image
+      self.nbytes += image.nbytes
+      while self.nbytes > self.max_bytes:
+        _, evicted = self._entries.popitem(last=False)
+        self.nbytes -= evicted.nbytes
+        self.evictions += 1
+    return image
+
+  def __contains__(self, key):
+    with self._lock:
+      return key in self._entries
+
+  def __len__(self):
+    return len(self._entries)
+
+  def forget(self, vol):
+    """ Remove the entries of the volume and release it, if it was held. """
+    vol_id = id(vol)
+    with self._lock:
+      finalizer = self._volumes.get(vol_id)
+      if isinstance(finalizer, weakref.finalize):
+        finalizer.detach()
+    self.discard_volume(vol_id)
+
+  def discard_volume(self, vol_id):
+    """ Remove all entries that belong to the volume with vol_id. """
+    with self._lock:
+      for key in [k for k in self._entries if k[0] == vol_id]:
+        self.nbytes -= self._entries.pop(key).nbytes
+      self._volumes.pop(vol_id, None)
+
+  def clear(self):
+    """ Remove all entries, release the held volumes (see volume_id) and
+    reset the counters.
+    """
+    with self._lock:
+      self._entries.clear()
+      self._volumes = {key: finalizer for key, finalizer in
+                       self._volumes.items()
+                       if isinstance(finalizer, weakref.finalize)}
+      self.nbytes = 0
+      self.hits = self.misses = self.evictions = 0
+
+  @property
+  def stats(self):
+    """ A dict of the cache counters, useful to tune max_bytes. """
+    with self._lock:
+      n_access = self.hits + self.misses
+      return {'hits': self.hits, 'misses': self.misses,
+              'evictions': self.evictions, 'entries': len(self._entries),
+              'nbytes': self.nbytes, 'max_bytes': self.max_bytes,
+              'hit_rate': self.hits / n_access if n_access else 0.}
+
+  def __repr__(self):
+    return ('<SliceCache {entries} entries, {nbytes}/{max_bytes} bytes, '
+            '{hits} hits, {misses} misses, {evictions} evictions>'
+            .format(**self.stats))
+
+
+# The cache shared by all volume_slices calls with cache=True.
+_shared_cache = None
+
+def get_shared_cache():
+  """ Return the process-wide SliceCache, create it on first use. """
+  global _shared_cache
+  if _shared_cache is None:
+    _shared_cache = SliceCache()
+  return _shared_cache
+
+
+def make_cache(cache):
+  """ Convert the cache policy accepted by volume_slices to a SliceCache.
+
+  Parameters:
+  cache: None/False (no caching), True (the shared cache), int (a new
+    private cache with this byte budget), or a SliceCache instance.
+  """
+  if cache is None or cache is False:
+    return None
+  if cache is True:
+    return get_shared_cache()
+  if isinstance(cache, SliceCache):
+    return cache
+  if isinstance(cache, (int, float)):
+    return SliceCache(max_bytes=cache)
+  raise ValueError('Wrong type of cache={}'.format(cache))
+
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt5 import QtCore
+from vispy.util import logger
+
+
+class SliceLoader(QtCore.QObject):
+  """ Move AxisAlignedImage nodes to new positions without blocking the Qt
+  GUI thread, e.g. from the valueChanged signal of a slider.
+
+  request(node, pos) only records the wanted position. A worker thread reads
+  the images of the node (fetch and preprocessing, see
+  AxisAlignedImage.read_images), and the loaded signal hands them over to
+  the GUI thread, where the node is updated. Latest wins: while a node is
+  being read, the newer requests replace each other, so only the newest
+  position is read next. Dragging a slider across 1000 inlines never builds
+  up a backlog of reads. A read that raises is logged, and the failed
+  signal hands (node, pos, exception) to the GUI thread; the node keeps its
+  current images.
+
+  Parameters:
+  max_workers: int, number of reading threads; the nodes are read in
+    parallel, each node by one thread at a time.
+  """
+  # Emitted from a worker thread with (node, pos, images); Qt queues it to
+  # the thread of the loader, i.e. the GUI thread.
+  loaded = QtCore.pyqtSignal(object, int, object)
+  failed = QtCore.pyqtSignal(object, int, object)
+
+  def __init__(self, max_workers=3, parent=None):
+    QtCore.QObject.__init__(self, parent)
+    self.requested = 0
+    self.read = 0
+    self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='slice-loader')
+    self._lock = threading.Lock()
+    self._wanted = {} # node -> newest requested pos, not read yet
+    self._running = set() # nodes being read by a worker
+    self.loaded.connect(self._on_loaded)
+
+  def request(self, node, pos):
+    """ Ask for node to be moved to pos, as soon as its images are read. """
+    pos = int(pos)
+    if node.limit is not None:
+      pos = min(max(pos, node.limit[0]), node.limit[1])
+    with self._lock:
+      self.requested += 1
+      self._wanted[node] = pos
+      if node in self._running:
+        return # the running worker picks it up when it is done
+      self._running.add(node)
+    self._executor.submit(self._work, node)
+
+  def _work(self, node):
+    while True:
+      with self._lock:
+        if node not in self._wanted:
+          self._running.discard(node)
+          return
+        pos = self._wanted.pop(node)
+      try:
+        images = node.read_images(pos)
+      except Exception as err:
+        # Nobody waits on the future of the worker: report the error here,
+        # then go on with the position requested meanwhile, if any.
+        logger.exception('Reading the slice %r at %s failed.', node, pos)
+        self.failed.emit(node, pos, err)
+        continue
+      except BaseException:
+        with self._lock:
+          self._running.discard(node)
+        raise
+      with self._lock:
+        self.read += 1
+      self.loaded.emit(node, pos, images)
+
+  def _on_loaded(self, node, pos, images):
+    # In the GUI thread. The positions of a node arrive in request order,
+    # an intermediate one is shown until the newest one is read.
+    node._update_location(pos, images=images)
+    node.update()
+
+  def pending(self, node):
+    """ Whether node has a requested position not read yet. """
+    with self._lock:
+      return node in self._running or node in self._wanted
+
+  def shutdown(self, wait=False):
+    """ Drop the pending requests and stop the reading threads. """
+    with self._lock:
+      self._wanted.clear()
+    self._executor.shutdown(wait=wait)
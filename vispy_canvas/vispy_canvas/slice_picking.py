@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+from vispy.scene.visuals import VisualNode
+from vispy.scene.widgets import Widget
+
+
+def pickable_nodes(root):
+  """ Return the visible interactive visuals under root, the candidates of
+  SceneCanvas.visual_at. The other nodes (e.g. the cameras, interactive too)
+  are not drawn, and the widgets (e.g. ViewBox) are only walked through:
+  neither is picked.
+  """
+  nodes = []
+  stack = [root]
+  while stack:
+    node = stack.pop()
+    if not node.visible:
+      continue
+    if getattr(node, 'interactive', False) and \
+       isinstance(node, VisualNode) and not isinstance(node, Widget):
+      nodes.append(node)
+    stack.extend(node.children)
+  return nodes
+
+
+def pick_visual(canvas, pos):
+  """ Return the interactive visual node under the canvas position pos, or
+  None; a drop-in replacement of canvas.visual_at(pos).
+
+  The nodes with an intersect(pos) method (AxisAlignedImage, XYZAxis) are
+  picked analytically on the CPU: the nearest hit of the view ray wins,
+  without rendering anything. If any other interactive visual is in the
+  scene (e.g. an arbitrary mesh), this falls back to the GPU picking of
+  visual_at, which renders a picking framebuffer and reads it back.
+  """
+  nodes = pickable_nodes(canvas.scene)
+  if not all(hasattr(node, 'intersect') for node in nodes):
+    return canvas.visual_at(pos)
+  hits = []
+  for node in nodes:
+    depth = node.intersect(pos)
+    if depth is not None:
+      hits.append((depth, node))
+  if not hits:
+    return None
+  return min(hits, key=lambda hit: hit[0])[1]
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class _MotionState(object):
+  """ The motion history of one AxisAlignedImage. """
+  def __init__(self, pos):
+    self.pos = pos
+    self.direction = 0
+    self.speed = 1. # smoothed number of slices moved per update
+    self.pending = {} # pos -> Future
+
+
+class SlicePrefetcher(object):
+  """ Read ahead the slices of AxisAlignedImage nodes into the slice cache.
+  The prefetcher learns the moving direction and speed of every image it is
+  notified about (see AxisAlignedImage._update_location), then loads the next
+  n_ahead slices along that direction on a background thread pool. Pending
+  loads are cancelled when the direction changes, or when the image has
+  already passed them.
+
+  Only image functions created with a slice cache are prefetched, because the
+  prefetched images are handed over through the cache.
+
+  Parameters:
+  n_ahead: int, number of slices to read ahead of the moving image.
+  max_workers: int, number of background reading threads.
+  smoothing: float in (0, 1], weight of the latest step in the speed
+    estimation. The stride between prefetched slices follows the speed.
+  """
+  def __init__(self, n_ahead=4, max_workers=2, smoothing=0.5):
+    self.n_ahead = int(n_ahead)
+    self.smoothing = smoothing
+    self.submitted = 0
+    self.cancelled = 0
+    self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='slice-prefetch')
+    self._states = weakref.WeakKeyDictionary()
+    self._lock = threading.RLock()
+
+  def update(self, image):
+    """ Notify that image has moved to image.pos, and schedule the reading
+    of the slices ahead of it.
+    """
+    funcs = [f for f in image.image_funcs
+             if getattr(f, 'cache', None) is not None]
+    if not funcs or self.n_ahead <= 0:
+      return
+    pos = int(image.pos)
+    with self._lock:
+      state = self._states.get(image)
+      if state is None:
+        self._states[image] = _MotionState(pos)
+        return
+      step = pos - state.pos
+      state.pos = pos
+      if step == 0:
+        return
+      direction = int(np.sign(step))
+      if direction != state.direction:
+        # The user turned around, everything in flight is out of date.
+        self._cancel(state, lambda p: True)
+        state.direction = direction
+        state.speed = abs(step)
+      else:
+        state.speed += self.smoothing * (abs(step) - state.speed)
+        # Drop the loads that the image has already passed.
+        self._cancel(state, lambda p: (p - pos) * direction <= 0)
+
+      stride = max(1, int(np.round(state.speed)))
+      low, high = image.limit if image.limit is not None else (-np.inf, np.inf)
+      positions = []
+      for k in range(1, self.n_ahead + 1):
+        p = pos + direction * stride * k
+        if p < low or p > high:
+          break
+        if p in state.pending:
+          continue
+        if all(f.cached(p) for f in funcs):
+          continue
+        positions.append(p)
+      if not positions:
+        return
+      # One task for all the new positions, so that the image functions can
+      # read them with a single batched call.
+      future = self._executor.submit(self._load, funcs, positions, state)
+      for p in positions:
+        state.pending[p] = future
+      future.add_done_callback(
+        lambda f, state=state: self._done(state, f))
+      self.submitted += len(positions)
+
+  def _cancel(self, state, predicate):
+    futures = set()
+    for p in [p for p in state.pending if predicate(p)]:
+      futures.add(state.pending.pop(p))
+      self.cancelled += 1
+    # A task can be cancelled once none of its positions is wanted anymore.
+    wanted = set(state.pending.values())
+    for future in futures - wanted:
+      future.cancel()
+
+  def _load(self, funcs, positions, state):
+    for func in funcs:
+      # Skip the positions that became out of date while running.
+      with self._lock:
+        positions = [p for p in positions if p in state.pending]
+      if not positions:
+        return
+      if hasattr(func, 'load'):
+        func.load(positions)
+      else:
+        for p in positions:
+          func(p)
+
+  def _done(self, state, future):
+    with self._lock:
+      for p in [p for p, f in state.pending.items() if f is future]:
+        del state.pending[p]
+
+  def shutdown(self, wait=False):
+    """ Cancel all pending loads and stop the reading threads. """
+    with self._lock:
+      for state in list(self._states.values()):
+        self._cancel(state, lambda p: True)
+    self._executor.shutdown(wait=wait)
+
+
+def make_prefetcher(prefetch):
+  """ Convert the prefetch policy accepted by volume_slices to a
+  SlicePrefetcher.
+
+  Parameters:
+  prefetch: None/False (no prefetching), int (a new SlicePrefetcher reading
+    this many slices ahead), or a SlicePrefetcher instance.
+  """
+  if prefetch is None or prefetch is False:
+    return None
+  if isinstance(prefetch, SlicePrefetcher):
+    return prefetch
+  if prefetch is True:
+    return SlicePrefetcher()
+  if isinstance(prefetch, int):
+    return SlicePrefetcher(n_ahead=prefetch)
+  raise ValueError('Wrong type of prefetch={}'.format(prefetch))
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import numpy as np
+from vispy.visuals.transforms import STTransform
+
+from .volume_source import fetch_images
+
+
+# Largest texture expected to work on every GPU; slices above are tiled.
+MAX_TEXTURE_SIZE = 8192
+
+
+def floor_pow2(x):
+  """ The largest power of 2 less than or equal to x (at least 1). """
+  return 1 << max(int(np.floor(np.log2(max(x, 1)))), 0)
+
+
+class _Tile(object):
+  """ One tile of the grid: its region in storage order and its images. """
+  def __init__(self, rows, cols, images):
+    self.rows = rows
+    self.cols = cols
+    self.images = images # one Image visual per layer
+    self.pos = None # position of the data loaded, None if empty
+    self.step = None
+
+
+class SliceTiles(object):
+  """ Display a slice of an AxisAlignedImage that is too large for a single
+  texture as a grid of tiles. The AxisAlignedImage itself shows an overview
+  of the whole slice, decimated by overview_step; each tile is a child Image
+  visual showing its region of the slice at a finer resolution.
+
+  The tiles are updated on every draw (see AxisAlignedImage.draw): only the
+  tiles intersecting the view are loaded, at the resolution the screen needs,
+  and a tile is hidden when the overview is already fine enough for it. The
+  tile data is read from the volume source on demand, at most
+  loads_per_frame tiles per draw so a large update does not freeze the UI.
+
+  Parameters:
+  image: the AxisAlignedImage, its image functions must provide region().
+  tile_size: int, the size of the tiles in full-resolution samples.
+  overview_size: int, the maximum texture size of the overview.
+  loads_per_frame: int, the maximum number of tiles loaded per draw.
+  """
+  def __init__(self, image, tile_size=2048, overview_size=2048,
+               loads_per_frame=2):
+    self.image = image
+    self.tile_size = int(tile_size)
+    self.loads_per_frame = int(loads_per_frame)
+    for func in image.image_funcs:
+      if not hasattr(func, 'region'):
+        raise ValueError('Tiled slices need volumes, not image functions.')
+      if tuple(func.flips) != tuple(image.flips):
+        raise ValueError('Tiled overlays must have the same orientation.')
+    n_rows, n_cols = image.image_shape[:2]
+    # The smallest power of 2 that fits the slice into overview_size.
+    self.overview_step = 1 << max(int(np.ceil(
+      np.log2(max(n_rows, n_cols) / overview_size))), 0)
+    self.loaded = 0 # number of tile loads, for statistics
+
+    self.tiles = []
+    for r0 in range(0, n_rows, self.tile_size):
+      for c0 in range(0, n_cols, self.tile_size):
+        rows = (r0, min(r0 + self.tile_size, n_rows))
+        cols = (c0, min(c0 + self.tile_size, n_cols))
+        images = [image._new_layer_image(i_img)
+                  for i_img in range(len(image.overlaid_images))]
+        for img in images:
+          img.visible = False
+        self.tiles.append(_Tile(rows, cols, images))
+
+  def reset(self):
+    """ Hide the tiles, e.g. when the image has moved to a new position. """
+    for tile in self.tiles:
+      tile.pos = None
+      for img in tile.images:
+        img.visible = False
+
+  def update(self):
+    """ Load and show the tiles in view at the resolution they need, hide
+    the others. Return True if some tiles still have to be loaded.
+    """
+    image = self.image
+    canvas = image.canvas
+    if canvas is None:
+      return False
+    # Screen-to-local transform, as in AxisAlignedImage.set_anchor.
+    tr = canvas.scene.node_transform(image)
+    width, height = canvas.size
+    scale = self.overview_step # local units of the overview texture
+    todo = []
+    for tile in self.tiles:
+      step = self._needed_step(tr, tile, scale, width, height)
+      if step is None or step >= self.overview_step:
+        # Out of view, or the overview is already fine enough.
+        for img in tile.images:
+          img.visible = False
+      elif tile.pos == image.pos and tile.step <= step:
+        for img in tile.images:
+          img.visible = True
+      else:
+        todo.append((step, tile))
+
+    # The coarsest first: they cover more of the screen per byte read.
+    todo.sort(key=lambda item: -item[0])
+    for step, tile in todo[:self.loads_per_frame]:
+      self._load(tile, step)
+    return len(todo) > self.loads_per_frame
+
+  def _needed_step(self, tr, tile, scale, width, height):
+    """ Return the decimation step the tile needs on the screen, or None if
+    it is out of view.
+    """
+    (r0, r1), (c0, c1) = tile.rows, tile.cols
+    # Local x follows the columns and y the rows, in overview units.
+    corners = np.array([[c0, r0, 0, 1], [c1, r0, 0, 1],
+                        [c0, r1, 0, 1], [c1, r1, 0, 1]], dtype=float)
+    corners[:, :2] /= scale
+    screen = tr.imap(corners)
+    if np.any(screen[:, 3] <= 0):
+      return 1 # crosses the camera plane, be conservative
+    screen = screen[:, :2] / screen[:, 3:4]
+    low, high = screen.min(axis=0), screen.max(axis=0)
+    if high[0] < 0 or high[1] < 0 or low[0] > width or low[1] > height:
+      return None
+    # Screen pixels covered by the tile edges along the columns and rows.
+    n_pixels = max(np.linalg.norm(screen[1] - screen[0]),
+                   np.linalg.norm(screen[2] - screen[0]), 1)
+    return floor_pow2(max(r1 - r0, c1 - c0) / n_pixels)
+
+  def _load(self, tile, step):
+    """ Read the region of tile at step for every layer and show it. """
+    image = self.image
+    r0, c0 = tile.rows[0], tile.cols[0]
+    regions = fetch_images(image.image_funcs, image.pos,
+                           region=(tile.rows, tile.cols, step))
+    for i_img, img in enumerate(tile.images):
+      img.set_data(image._to_buffer(i_img, regions[i_img], image.flips,
+                                    tile=id(tile)))
+      # Place the tile in the local units of the overview texture.
+      img.transform = STTransform(
+        scale=(step / self.overview_step, step / self.overview_step, 1),
+        translate=(c0 / self.overview_step, r0 / self.overview_step, 0))
+      img.visible = True
+    tile.pos, tile.step = image.pos, step
+    self.loaded += 1
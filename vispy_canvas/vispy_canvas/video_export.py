@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import queue
+import subprocess
+import threading
+
+import numpy as np
+from vispy.util import logger
+
+from .image_writer import ImageWriter
+
+
+# Camera state entries interpolated between keyframes, the others are held.
+INTERPOLATED = ('azimuth', 'elevation', 'roll', 'fov', 'scale_factor',
+                'distance', 'center')
+
+
+def camera_path(keyframes, n_frames):
+  """ Return n_frames camera states going through the keyframes (states
+  from camera.get_state()) at regular intervals, linearly interpolated.
+  The azimuth is not wrapped: a keyframe at 360 after 0 is a full turn.
+  """
+  if len(keyframes) == 0:
+    raise ValueError('camera_path needs at least one keyframe.')
+  if len(keyframes) < 2 or n_frames < 2:
+    return [dict(keyframes[0]) for _ in range(n_frames)]
+  times = np.linspace(0, len(keyframes) - 1, n_frames)
+  states = []
+  for t in times:
+    i = min(int(t), len(keyframes) - 2)
+    a, b, w = keyframes[i], keyframes[i + 1], t - i
+    # The held entries switch at the keyframe, the last frame is the last
+    # keyframe.
+    state = dict(a if w < 1 else b)
+    for key in INTERPOLATED:
+      if a.get(key) is not None and b.get(key) is not None:
+        value = (1 - w) * np.asarray(a[key], float) + \
+          w * np.asarray(b[key], float)
+        state[key] = tuple(value.tolist()) if value.ndim else float(value)
+    states.append(state)
+  return states
+
+
+class FFmpegWriter(object):
+  """ Encode frames into a video through a local ffmpeg process, fed with
+  raw RGB frames on its stdin by a background thread. The queue of frames
+  is bounded by max_pending, as in ImageWriter.
+
+  Parameters:
+  filename: the video file, its extension selects the container.
+  size: (width, height) of the frames; even, for the yuv420p encoding.
+  fps: frame rate of the video.
+  codec: the ffmpeg video codec, and extra_args more output options.
+  """
+  def __init__(self, filename, size, fps=30, codec='libx264',
+               extra_args=('-pix_fmt', 'yuv420p', '-crf', '18'),
+               ffmpeg='ffmpeg', max_pending=8):
+    self.size = tuple(size)
+    self.written = 0
+    command = [ffmpeg, '-y', '-loglevel', 'error',
+               '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+               '-s', '{}x{}'.format(*self.size), '-r', str(fps), '-i', '-',
+               '-an', '-vcodec', codec] + list(extra_args) + [filename]
+    self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    self._queue = queue.Queue(maxsize=max_pending)
+    self._error = None
+    self._thread = threading.Thread(target=self._run, name='ffmpeg-writer',
+                                    daemon=True)
+    self._thread.start()
+
+  def write(self, image):
+    """ Queue an (h, w, 3) uint8 frame. """
+    error, self._error = self._error, None
+    if error is not None:
+      raise error
+    self._queue.put(image)
+
+  def close(self):
+    """ Encode the queued frames and wait for ffmpeg to finish the file. """
+    self._queue.put(None)
+    self._thread.join()
+    self._process.stdin.close()
+    code = self._process.wait()
+    if self._error is not None:
+      raise self._error
+    if code != 0:
+      raise RuntimeError('ffmpeg exited with code {}'.format(code))
+
+  def _run(self):
+    while True:
+      image = self._queue.get()
+      if image is None:
+        return
+      if self._error is not None:
+        continue # drain the queue, the error is raised by write/close
+      try:
+        self._process.stdin.write(np.ascontiguousarray(image).tobytes())
+        self.written += 1
+      except Exception as error:
+        self._error = error
+
+
+def _read_ahead(node, positions, out, stop):
+  """ Read the images of node at positions into the bounded queue out, so
+  the slices are read and preprocessed while the previous ones render.
+  The positions are clamped to node.limit, as node._update_location does,
+  so the images match the position they are shown at. Return early once
+  the event stop is set.
+  """
+  def put(item):
+    while not stop.is_set():
+      try:
+        out.put(item, timeout=0.1)
+        return True
+      except queue.Full:
+        pass
+    return False
+
+  try:
+    for pos in positions:
+      if node.limit is not None:
+        pos = min(max(pos, node.limit[0]), node.limit[1])
+      if not put((pos, node.read_images(pos))):
+        return
+  except BaseException as error:
+    put(error)
+
+
+def _stop_reader(reader, slices, stop):
+  """ Stop the sweep reader thread, which may wait on the full queue. """
+  stop.set()
+  while reader.is_alive():
+    try:
+      while True:
+        slices.get_nowait()
+    except queue.Empty:
+      pass
+    reader.join(0.1)
+
+
+def export_video(canvas, filename, camera_states=None, sweep=None, fps=30,
+                 scale=1, camera=None, max_pending=8, **writer_kwargs):
+  """ Render a camera fly-through and/or a slice sweep of a SeismicCanvas,
+  frame by frame, into a video or a sequence of images. It only uses
+  offscreen rendering, so it runs headless (e.g. with the OSMesa backend).
+
+  The frames stream through a bounded pipeline: a thread reads and
+  preprocesses the next slices of the sweep, the calling thread (the one
+  owning the GL context) renders, and a thread encodes. Each stage holds at
+  most max_pending frames, so the memory stays flat however many frames.
+
+  Parameters:
+  canvas: the SeismicCanvas (or any canvas with CanvasControls).
+  filename: a video file (encoded by ffmpeg, see FFmpegWriter), or an image
+    file pattern with a frame number field, e.g. 'frames/{:05d}.png'.
+  camera_states: list of camera states, one per frame; see camera_path to
+    interpolate them from keyframes.
+  sweep: (node, positions), an AxisAlignedImage and its position at each
+    frame, in the units of node.pos, e.g. (node, range(*node.limit)).
+  scale: the frames are rendered at scale times the canvas size.
+  camera: the camera to move, the camera of the first view by default.
+  writer_kwargs: extra parameters of FFmpegWriter (codec, ffmpeg, ...).
+
+  Returns the number of frames written.
+  """
+  if camera_states is None and sweep is None:
+    raise ValueError('Give camera_states, a sweep, or both.')
+  if sweep is not None:
+    node, positions = sweep[0], list(sweep[1])
+  n_frames = len(camera_states) if camera_states is not None \
+    else len(positions)
+  if sweep is not None and len(positions) != n_frames:
+    raise ValueError('camera_states and the sweep positions must have the '
+                     'same length.')
+  if camera is None:
+    camera = canvas.view[0].camera
+
+  width, height = (int(round(n * scale)) for n in canvas.size)
+  sequence = '{' in filename
+  if sequence:
+    writer = ImageWriter(max_pending=max_pending)
+  else:
+    # Even frame size for the yuv420p video, the last row/column is cut.
+    width, height = width // 2 * 2, height // 2 * 2
+    writer = FFmpegWriter(filename, (width, height), fps=fps,
+                          max_pending=max_pending, **writer_kwargs)
+
+  if sweep is not None:
+    slices = queue.Queue(maxsize=max_pending)
+    stop = threading.Event()
+    reader = threading.Thread(target=_read_ahead, name='sweep-reader',
+                              args=(node, positions, slices, stop),
+                              daemon=True)
+    reader.start()
+  completed = False
+  try:
+    for i in range(n_frames):
+      if sweep is not None:
+        item = slices.get()
+        if isinstance(item, BaseException):
+          raise item
+        pos, images = item
+        node._update_location(pos, images=images)
+      if camera_states is not None:
+        camera.set_state(camera_states[i])
+      frame = canvas.screenshot(scale=scale, alpha=False)
+      if sequence:
+        writer.write(filename.format(i), frame)
+      else:
+        writer.write(frame[:height, :width])
+    completed = True
+  finally:
+    if sweep is not None:
+      _stop_reader(reader, slices, stop)
+    if completed:
+      writer.close()
+    else:
+      # The error being raised is the one reported.
+      try:
+        writer.close()
+      except Exception:
+        logger.exception('Closing the writer of %s failed.', filename)
+  return n_frames
@@ -14,6 +14,15 @@ class GridLines():
         # Initialize scene parent to add visuals
         self.parent = parent
 
+        # The tick labels state, set up by draw_labels
+        self.min_pixels = 60
+        self.axis_colors = ('red', 'green', 'blue')
+        self.label_spacing = [None, None, None]
+        self.axis_labels = []
+        self._view = None
+        self._camera = None
+        self._camera_transform = None
+
         # Define the 8 corners of the cube
         self.cube_vertices = np.array([
             [0, 0, 0],  # Origin
@@ -70,42 +79,125 @@ class GridLines():
 
         return self.box
 
-    def draw_labels(self, parent=None):
-
-        # Store labels in lists for each axis
-        label_x_list = []
-        label_y_list = []
-        label_z_list = []
+    def draw_labels(self, parent=None, min_pixels=60):
+        """ Draw the tick labels and the names of the three axes. The tick
+        labels of an axis are batched into one Text visual, so the label cost
+        is three draw calls whatever the size of the volume. The tick spacing
+        follows the camera (see update_labels): the ticks are about
+        min_pixels apart on the screen.
+        """
+        self.min_pixels = min_pixels
+        self.label_spacing = [None, None, None]
+        self.axis_labels = []
+        for axis, spacing in enumerate((self.spacingx, self.spacingy, self.spacingz)):
+            label = scene.visuals.Text('0', pos=np.zeros((1, 3)), color=self.axis_colors[axis], font_size=500000, anchor_x='center', anchor_y='center', parent=parent, depth_test=True)
+            label.order = 1  # Set render order
+            self.axis_labels.append(label)
+            # Until the label is in a view, the default spacing.
+            self._set_ticks(axis, _nice_step(spacing))
+            label.events.canvas_change.connect(self._attach_view)
+        self._attach_view()  # the labels given a parent may already be in a view
+        label_x, label_y, label_z = self.axis_labels
 
-        # X axis labels (from 0 to axis_length)
-        for i in range(0, int(self.axis_length[0] // self.spacingx) + 1, self.spacingx):
-            label_pos = np.array([i * self.spacingx, 0, 0])
-            label_x = scene.visuals.Text(f'{i * self.spacingx:.1f}', pos=label_pos, color='red', font_size=500000, anchor_x='center', anchor_y='center', depth_test=True)
-            label_x.order = 1  # Set render order
-            label_x_list.append(label_x)
-        
         label_name_x = scene.visuals.Text('Crossline', pos=np.array([self.axis_length[0] / 2, -0.5, 0]), color='red', font_size=1000000, anchor_x='center', anchor_y='center', depth_test=True)
         label_name_x.order = 1  # Set render order
 
-        # Y axis labels (from 0 to axis_length)
-        for i in range(0, int(self.axis_length[1] // self.spacingy) + 1, self.spacingy):
-            label_pos = np.array([0, i * self.spacingy, 0])
-            label_y = scene.visuals.Text(f'{i * self.spacingy:.1f}', pos=label_pos, color='green', font_size=500000, anchor_x='center', anchor_y='center', parent=parent, depth_test=True)
-            label_y.order = 1
-            label_y_list.append(label_y)
-
         label_name_y = scene.visuals.Text('Inline', pos=np.array([0, self.axis_length[1] / 2, -0.5]), color='green', font_size=1000000, anchor_x='center', anchor_y='center', parent=parent, depth_test=True)
         label_name_y.order = 1
 
-        # Z axis labels (from axis_length to 0)
-        for i in range(int(self.axis_length[2] // self.spacingz), -1, -1):
-            label_pos = np.array([0, 0, i * self.spacingz])
-            label_z = scene.visuals.Text(f'{i * self.spacingz:.1f}', pos=label_pos, color='blue', font_size=500000, anchor_x='center', anchor_y='center', parent=parent, depth_test=True)
-            label_z.order = 1
-            label_z_list.append(label_z)
-
         label_name_z = scene.visuals.Text('Time', pos=np.array([0, -0.5, self.axis_length[2] / 2]), color='blue', font_size=1000000, anchor_x='center', anchor_y='center', parent=parent, depth_test=True)
         label_name_z.order = 1
 
-        # Return the lists of labels along with axis names
-        return label_x_list, label_y_list, label_z_list, label_name_x, label_name_y, label_name_z
+        # Return the tick labels of each axis along with axis names
+        return label_x, label_y, label_z, label_name_x, label_name_y, label_name_z
+
+    def _attach_view(self, event=None):
+        """ Follow the view the labels are in: its resizes, and its camera
+        (see _attach_camera), which is replaced through the scene transform.
+        """
+        view = _parent_view(self.axis_labels[0])
+        if view is self._view:
+            return
+        if self._view is not None:
+            self._view.events.resize.disconnect(self.update_labels)
+            self._view.scene.events.transform_change.disconnect(self._attach_camera)
+        if view is not None:
+            # Last, after the camera has updated the transforms.
+            view.events.resize.connect(self.update_labels, position='last')
+            view.scene.events.transform_change.connect(self._attach_camera, position='last')
+        self._view = view
+        self._attach_camera()
+
+    def _attach_camera(self, event=None):
+        """ Update the tick spacing on each change of the camera of the view.
+        The camera changes its transform in place on zoom and rotation, which
+        emits the changed event of the transform but no node event, and
+        replaces it (its transform_change event) only occasionally.
+        """
+        camera = self._view.camera if self._view is not None else None
+        transform = camera.transform if camera is not None else None
+        if camera is not self._camera:
+            if self._camera is not None:
+                self._camera.events.transform_change.disconnect(self._attach_camera)
+            if camera is not None:
+                camera.events.transform_change.connect(self._attach_camera, position='last')
+            self._camera = camera
+        if transform is not self._camera_transform:
+            if self._camera_transform is not None:
+                self._camera_transform.changed.disconnect(self.update_labels)
+            if transform is not None:
+                transform.changed.connect(self.update_labels, position='last')
+            self._camera_transform = transform
+        self.update_labels()
+
+    def update_labels(self, event=None):
+        """ Adapt the tick spacing of each axis to its length on the screen.
+        The labels are only rebuilt when the spacing changes.
+        """
+        for axis, label in enumerate(self.axis_labels):
+            spacing = self._tick_spacing(axis, label)
+            if spacing is not None and spacing != self.label_spacing[axis]:
+                self._set_ticks(axis, spacing)
+
+    def _tick_spacing(self, axis, label):
+        """ Return the tick spacing of axis, a 1, 2 or 5 times a power of 10
+        samples, or None to keep the current one: the label is not on a canvas
+        yet, or the axis crosses the camera plane.
+        """
+        if label.canvas is None:
+            return None
+        length = self.axis_length[axis]
+        ends = np.zeros((2, 4))
+        ends[:, 3] = 1
+        ends[1, axis] = length
+        screen = label.get_transform('visual', 'canvas').map(ends)
+        if not np.all(screen[:, 3] > 0):
+            return None
+        screen = screen[:, :2] / screen[:, 3:4]
+        n_pixels = max(np.linalg.norm(screen[1] - screen[0]), 1e-6)
+        return _nice_step(max(length * self.min_pixels / n_pixels, 1))
+
+    def _set_ticks(self, axis, spacing):
+        """ Put the tick labels of axis every spacing samples. """
+        ticks = np.arange(0, self.axis_length[axis] + 1, spacing)
+        pos = np.zeros((len(ticks), 3))
+        pos[:, axis] = ticks
+        label = self.axis_labels[axis]
+        label.text = [f'{tick:.1f}' for tick in ticks]
+        label.pos = pos
+        self.label_spacing[axis] = spacing
+
+
+def _parent_view(node):
+    """ The ViewBox node is in, or None. """
+    while node is not None and not isinstance(node, scene.widgets.ViewBox):
+        node = node.parent
+    return node
+
+
+def _nice_step(x):
+    """ The smallest 1, 2 or 5 times a power of 10 greater than or equal to x. """
+    power = 10 ** np.floor(np.log10(x))
+    for mult in (1, 2, 5, 10):
+        if mult * power >= x * (1 - 1e-9):
+            return float(mult * power)
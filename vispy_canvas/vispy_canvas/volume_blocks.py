@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+""" The blocks of a volume conversion (see volume_convert.convert_volume
+and volume_bricks.convert_bricks): the volume is read in chunk-aligned
+blocks of bounded size, one block ahead of the one being written, and each
+block is cut into its chunks.
+"""
+
+
+def iter_blocks(shape, chunks, itemsize, max_memory):
+  """ Yield the chunk-aligned blocks ((x0, x1), (y0, y1), (z0, z1)) of the
+  conversion: one chunk thick along x, as many chunk rows along y as
+  max_memory allows and the whole z extent, so a C-ordered input is read in
+  long runs. When a single chunk row is over max_memory, the row is split
+  along z instead; a single chunk over max_memory raises ValueError.
+  """
+  chunk_bytes = chunks[0] * chunks[1] * chunks[2] * itemsize
+  if chunk_bytes > max_memory:
+    raise ValueError('max_memory ({} bytes) is smaller than a chunk ({} '
+                     'bytes).'.format(max_memory, chunk_bytes))
+  row_bytes = chunks[0] * chunks[1] * shape[2] * itemsize
+  rows = int(max_memory // row_bytes)
+  depth = shape[2] if rows else chunks[2] * int(max_memory // chunk_bytes)
+  rows = max(1, rows)
+  for x0 in range(0, shape[0], chunks[0]):
+    for y0 in range(0, shape[1], chunks[1] * rows):
+      for z0 in range(0, shape[2], depth):
+        yield ((x0, min(x0 + chunks[0], shape[0])),
+               (y0, min(y0 + chunks[1] * rows, shape[1])),
+               (z0, min(z0 + depth, shape[2])))
+
+
+def block_index(block):
+  """ The index of block in the volume. """
+  return tuple(slice(start, stop) for start, stop in block)
+
+
+def block_chunks(block, data, chunks):
+  """ Yield (offset, chunk) of the chunks in data, read at block, offsets in
+  the volume.
+  """
+  x0, y0, z0 = (start for start, _ in block)
+  for j in range(0, data.shape[1], chunks[1]):
+    for k in range(0, data.shape[2], chunks[2]):
+      yield (x0, y0 + j, z0 + k), data[:, j:j+chunks[1], k:k+chunks[2]]
+
+
+def read_ahead(blocks, read, reader):
+  """ Yield (block, data) of the blocks, data = read(block), the next block
+  being read on the reader executor meanwhile.
+  """
+  future = reader.submit(read, blocks[0]) if blocks else None
+  for i, block in enumerate(blocks):
+    data = future.result()
+    if i + 1 < len(blocks):
+      future = reader.submit(read, blocks[i + 1])
+    yield block, data
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+""" A bricked volume file (.bvol): the volume is cut into fixed-size cubic
+bricks, each stored contiguously, so a slice of any direction reads about
+the same number of bytes; a C-ordered volume is contiguous along x but a
+z-slice touches every page of the file.
+
+Layout of the file:
+  MAGIC, then a JSON header padded to HEADER_BYTES: shape, dtype, brick,
+    codec, min/max and index_offset;
+  the payloads of the bricks;
+  the index at index_offset: a C-ordered array over the brick grid of
+    INDEX_DTYPE (offset, nbytes, kind) records.
+
+A brick is stored RAW, DEFLATE (zlib, when it is smaller than raw) or
+CONSTANT: a brick with a single value, e.g. the zeros of dead traces or of
+the padding around the survey, is stored as that one sample.
+"""
+
+import json
+import mmap
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from .hdf5_cache import chunk_cache_config
+from .volume_blocks import block_chunks, read_ahead
+from .volume_source import ChunkedSource, VolumeSource, index_box, \
+  read_chunk_box
+
+
+MAGIC = b'VCBRICK1'
+HEADER_BYTES = 4096
+RAW, DEFLATE, CONSTANT = 0, 1, 2
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('nbytes', '<u8'), ('kind', 'u1')])
+
+
+def _encode_brick(brick, codec, level):
+  """ Return (kind, payload) of a brick. zlib releases the GIL. """
+  flat = np.ascontiguousarray(brick).reshape(-1)
+  if (flat == flat[0]).all():
+    return CONSTANT, flat[:1].tobytes()
+  raw = flat.tobytes()
+  if codec == 'gzip':
+    compressed = zlib.compress(raw, level)
+    if len(compressed) < len(raw):
+      return DEFLATE, compressed
+  return RAW, raw
+
+
+def _finite_range(data):
+  """ The (min, max) of the finite values of data, or None. """
+  if data.dtype.kind == 'f':
+    data = data[np.isfinite(data)]
+  if data.size == 0:
+    return None
+  return data.min().item(), data.max().item()
+
+
+def convert_bricks(blocks, read, reader, pool, output, dataset, shape,
+                   dtype, chunks, codec, level):
+  """ Write a .bvol file, see volume_convert.convert_volume: the bricks of
+  each block are encoded on the pool and appended in block order.
+  """
+  if codec not in ('gzip', 'none'):
+    raise ValueError('A bricked volume is stored with gzip or none.')
+  grid = tuple(int(np.ceil(n / c)) for n, c in zip(shape, chunks))
+  index = np.zeros(grid, dtype=INDEX_DTYPE)
+  vmin, vmax = np.inf, -np.inf
+  with open(output, 'wb') as f:
+    f.write(b'\0' * HEADER_BYTES)
+    offset = HEADER_BYTES
+    for block, data in read_ahead(blocks, read, reader):
+      offsets, parts = zip(*block_chunks(block, data, chunks))
+      encoded = pool.map(_encode_brick, parts, [codec] * len(parts),
+                         [level] * len(parts))
+      for origin, (kind, payload) in zip(offsets, encoded):
+        ijk = tuple(o // c for o, c in zip(origin, chunks))
+        index[ijk] = (offset, len(payload), kind)
+        f.write(payload)
+        offset += len(payload)
+      block_range = _finite_range(data)
+      if block_range is not None:
+        vmin, vmax = min(vmin, block_range[0]), max(vmax, block_range[1])
+    f.write(index.tobytes())
+    header = {'shape': list(shape), 'dtype': np.dtype(dtype).str,
+              'brick': list(chunks), 'codec': codec, 'index_offset': offset,
+              'min': vmin if np.isfinite(vmin) else None,
+              'max': vmax if np.isfinite(vmax) else None}
+    text = json.dumps(header).encode()
+    if len(MAGIC) + len(text) > HEADER_BYTES:
+      raise ValueError('The header of {} is too large.'.format(output))
+    f.seek(0)
+    f.write(MAGIC + text)
+  return offset + index.nbytes
+
+
+def write_bricks(vol, filename, brick=64, codec='gzip', level=4, **kwargs):
+  """ Write a volume to a bricked .bvol file with cubic bricks of size brick,
+  see volume_convert.convert_volume for the other parameters.
+  """
+  from .volume_convert import convert_volume
+  return convert_volume(vol, filename, chunk=brick, codec=codec, level=level,
+                        **kwargs)
+
+
+class BrickVolume(object):
+  """ A read-only array-like view of a .bvol file: shape, dtype, chunks (the
+  brick shape) and numpy basic indexing (integers and slices). Only the
+  bricks intersecting the request are read. A contiguous part of a raw
+  brick (e.g. for an x-slice) is copied from a memory map of the file;
+  otherwise the whole brick is read with one pread, and inflated if it is
+  compressed, on a thread pool: as many reads are in flight as there are
+  threads. The bricks read whole are kept in an LRU cache.
+
+  Parameters:
+  cache_bytes: the size of the brick cache; 'auto' holds the bricks of a
+    full slice along every axis (see hdf5_cache.chunk_cache_config).
+  """
+  ndim = 3
+
+  def __init__(self, filename, cache_bytes='auto'):
+    self.filename = filename
+    self._file = open(filename, 'rb')
+    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+    if self._mmap[:len(MAGIC)] != MAGIC:
+      raise ValueError('{} is not a bricked volume file.'.format(filename))
+    text = bytes(self._mmap[len(MAGIC):HEADER_BYTES]).rstrip(b'\0')
+    self.header = json.loads(text.decode())
+    self.shape = tuple(self.header['shape'])
+    self.dtype = np.dtype(self.header['dtype'])
+    self.chunks = tuple(self.header['brick'])
+    grid = tuple(int(np.ceil(n / c)) for n, c in zip(self.shape, self.chunks))
+    self.index = np.frombuffer(self._mmap, dtype=INDEX_DTYPE,
+                               count=int(np.prod(grid)),
+                               offset=self.header['index_offset'])
+    self.index = self.index.reshape(grid)
+    if cache_bytes == 'auto':
+      cache_bytes = chunk_cache_config(self.shape, self.chunks,
+                                       self.dtype.itemsize)['nbytes']
+    self.cache_bytes = int(cache_bytes)
+    self._cache = OrderedDict()
+    self._cache_nbytes = 0
+    self._lock = threading.Lock()
+
+  @property
+  def size(self):
+    return int(np.prod(self.shape))
+
+  @property
+  def kinds(self):
+    """ The number of RAW, DEFLATE and CONSTANT bricks. """
+    counts = np.bincount(self.index['kind'].ravel(), minlength=3)
+    return {'raw': int(counts[RAW]), 'deflate': int(counts[DEFLATE]),
+            'constant': int(counts[CONSTANT])}
+
+  def __len__(self):
+    return self.shape[0]
+
+  def __array__(self, dtype=None):
+    data = self[:, :, :]
+    return data if dtype is None else data.astype(dtype)
+
+  def __getitem__(self, index):
+    """ Basic indexing: read the bounding box, then apply the steps. """
+    if not isinstance(index, tuple):
+      index = (index,)
+    if any(item is Ellipsis for item in index):
+      k = index.index(Ellipsis)
+      index = index[:k] + (slice(None),) * (4 - len(index)) + index[k+1:]
+    index = index + (slice(None),) * (3 - len(index))
+    box, steps, sub = index_box(index, self.shape)
+    return self.read_box(box, steps)[sub]
+
+  def read_box(self, box, steps=(1, 1, 1)):
+    """ Read the box [(start, stop)] * 3 of the volume, keeping one sample
+    out of steps[k] along dimension k, see read_chunk_box.
+    """
+    return read_chunk_box(box, self.chunks, self.dtype, self._read_brick,
+                          steps)
+
+  def _read_brick(self, ijk, src):
+    offset, nbytes, kind = self.index[ijk].tolist()
+    if kind == CONSTANT:
+      return np.frombuffer(self._mmap, dtype=self.dtype, count=1,
+                           offset=offset)[0]
+    origin = [n * c for n, c in zip(ijk, self.chunks)]
+    brick_shape = tuple(min(c, n - o) for c, n, o in
+                        zip(self.chunks, self.shape, origin))
+    if kind == RAW and src[1:] == (slice(0, brick_shape[1], 1),
+                                   slice(0, brick_shape[2], 1)):
+      # A contiguous part of the brick: only its pages are read.
+      return np.frombuffer(self._mmap, dtype=self.dtype,
+                           count=int(np.prod(brick_shape)),
+                           offset=offset).reshape(brick_shape)
+    # A strided part touches every page: read the whole brick at once, on
+    # the chunk thread pool.
+    return lambda: self._load_brick(ijk).reshape(brick_shape)
+
+  def _load_brick(self, ijk):
+    """ Read brick ijk with a single pread (which, as zlib, releases the
+    GIL) and decompress it, through the brick cache.
+    """
+    with self._lock:
+      brick = self._cache.get(ijk)
+      if brick is not None:
+        self._cache.move_to_end(ijk)
+        return brick
+    offset, nbytes, kind = self.index[ijk].tolist()
+    buf = os.pread(self._file.fileno(), nbytes, offset)
+    if kind == DEFLATE:
+      buf = zlib.decompress(buf)
+    brick = np.frombuffer(buf, dtype=self.dtype)
+    if brick.nbytes <= self.cache_bytes:
+      with self._lock:
+        if ijk not in self._cache:
+          self._cache[ijk] = brick
+          self._cache_nbytes += brick.nbytes
+        while self._cache_nbytes > self.cache_bytes:
+          _, evicted = self._cache.popitem(last=False)
+          self._cache_nbytes -= evicted.nbytes
+    return brick
+
+  def __reduce__(self):
+    # Reopened by file name, e.g. in a worker process.
+    return (BrickVolume, (self.filename, self.cache_bytes))
+
+  def __repr__(self):
+    return '<BrickVolume {} shape={} dtype={} brick={}>'.format(
+      self.filename, self.shape, self.dtype, self.chunks)
+
+
+class BrickSource(ChunkedSource):
+  """ A VolumeSource of a bricked .bvol file, open it with
+  BrickSource.open(path). See BrickVolume and write_bricks.
+  """
+  @classmethod
+  def open(cls, filename, cache_bytes='auto', **kwargs):
+    return cls(BrickVolume(filename, cache_bytes=cache_bytes), **kwargs)
+
+  def stored_min_max(self):
+    vmin, vmax = self.data.header['min'], self.data.header['max']
+    return None if vmin is None else (vmin, vmax)
+
+  def min_max(self):
+    return self.stored_min_max() or VolumeSource.min_max(self)
+
+  def iter_slabs(self, slab_size=None):
+    if slab_size is None:
+      slab_size = self.data.chunks[0]
+    return VolumeSource.iter_slabs(self, slab_size)
+
+  def _read_box(self, box, steps=(1, 1, 1)):
+    return self.data.read_box(box, steps)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .volume_blocks import block_chunks, block_index, iter_blocks, \
+  read_ahead
+from .volume_bricks import convert_bricks
+
+CODECS = ('gzip', 'lzf', 'blosc', 'none')
+# The slice names of the report, for shape (nx, ny, nz).
+SLICE_NAMES = ('inline (x)', 'crossline (y)', 'time (z)')
+
+
+def open_volume(path, dataset=None, dtype=None, shape=None):
+  """ Open a volume read-only without loading it: a .npy file (memory-mapped),
+  an HDF5 dataset ('file.h5:dataset' or the dataset argument), a Zarr array
+  (a .zarr directory or .zip store), a bricked .bvol file (see
+  volume_bricks), or a raw binary file (memory-mapped, dtype and shape are
+  then required).
+  """
+  if ':' in path and not os.path.exists(path):
+    path, dataset = path.rsplit(':', 1)
+  ext = os.path.splitext(path.rstrip(os.sep))[1].lower()
+  if ext == '.npy':
+    return np.load(path, mmap_mode='r')
+  if ext in ('.h5', '.hdf5', '.hdf'):
+    import h5py
+    if dataset is None:
+      raise ValueError('Give the HDF5 dataset name, as file.h5:dataset.')
+    return h5py.File(path, 'r')[dataset]
+  if ext in ('.zarr', '.zip', '.n5'):
+    from .volume_source import ZarrSource
+    # Converted block by block, each chunk is read once: no chunk cache.
+    return ZarrSource.open(path, path=dataset, cache_bytes=None).data
+  if ext == '.bvol':
+    from .volume_bricks import BrickVolume
+    return BrickVolume(path)
+  if dtype is None or shape is None:
+    raise ValueError('The dtype and shape of a raw volume are required.')
+  return np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+
+
+def cubic_chunks(shape, chunk=64):
+  """ Slice-balanced chunks: the same size along the three axes, so a slice
+  of any direction touches about the same number of chunks.
+  """
+  return tuple(min(int(chunk), int(n)) for n in shape)
+
+
+def layout_report(shape, chunks, itemsize, stored_bytes=None):
+  """ Return a dict describing how the chunk layout serves each slice
+  direction: the number of chunks a slice touches, the bytes decompressed
+  to read it and the read amplification (decompressed / slice bytes).
+  """
+  n_chunks = [int(np.ceil(n / c)) for n, c in zip(shape, chunks)]
+  chunk_bytes = int(np.prod(chunks)) * itemsize
+  slices = {}
+  for axis, name in enumerate(SLICE_NAMES):
+    others = [k for k in range(3) if k != axis]
+    touched = n_chunks[others[0]] * n_chunks[others[1]]
+    slice_bytes = shape[others[0]] * shape[others[1]] * itemsize
+    slices[name] = {'chunks': touched,
+                    'bytes_read': touched * chunk_bytes,
+                    'amplification': round(touched * chunk_bytes /
+                                           slice_bytes, 2)}
+  report = {'shape': list(shape), 'chunks': list(chunks),
+            'chunk_bytes': chunk_bytes, 'n_chunks': int(np.prod(n_chunks)),
+            'slices': slices}
+  if stored_bytes is not None:
+    report['stored_bytes'] = int(stored_bytes)
+    report['compression_ratio'] = round(
+      float(np.prod(shape)) * itemsize / max(stored_bytes, 1), 2)
+  return report
+
+
+def format_report(report):
+  lines = ['shape {}, chunks {} ({:.1f} MB each), {} chunks'.format(
+    tuple(report['shape']), tuple(report['chunks']),
+    report['chunk_bytes'] / 2**20, report['n_chunks'])]
+  if 'compression_ratio' in report:
+    lines.append('stored {:.1f} MB, compression ratio {}'.format(
+      report['stored_bytes'] / 2**20, report['compression_ratio']))
+  for name, s in report['slices'].items():
+    lines.append('  {:<14} slice touches {:>6} chunks, reads {:>9.1f} MB '
+                 '({}x the slice)'.format(name, s['chunks'],
+                                          s['bytes_read'] / 2**20,
+                                          s['amplification']))
+  return '\n'.join(lines)
+
+
+def _deflate(chunk, chunks, level):
+  """ Compress a chunk as the HDF5 deflate filter does: zlib stream of the
+  full chunk, the edge chunks padded with zeros. zlib releases the GIL.
+  """
+  if chunk.shape != tuple(chunks):
+    padded = np.zeros(chunks, dtype=chunk.dtype)
+    padded[tuple(slice(0, n) for n in chunk.shape)] = chunk
+    chunk = padded
+  return zlib.compress(np.ascontiguousarray(chunk).tobytes(), level)
+
+
+def convert_volume(vol, output, dataset='seismic', chunk=64, codec='gzip',
+                   level=4, n_workers=None, max_memory=256 << 20):
+  """ Convert a volume to a chunked, compressed HDF5 dataset, Zarr array or
+  bricked .bvol file, streaming it block by block in bounded memory.
+
+  The chunks are cubic (see cubic_chunks) and compressed in parallel on a
+  thread pool: Zarr chunks are written concurrently; for HDF5 the gzip
+  chunks are deflated on the pool and stored with write_direct_chunk (the
+  lzf and blosc filters run inside HDF5, serially); the bricks of a .bvol
+  file are encoded on the pool too. The next block is read while the
+  current one is compressed.
+
+  Parameters:
+  vol: the input volume, see open_volume.
+  output: a .h5/.hdf5 file, a .zarr directory or .zip store, or a .bvol
+    file.
+  dataset: the dataset name in the HDF5 file (or the array path in Zarr).
+  codec: 'gzip', 'lzf' (HDF5 only), 'blosc' (needs hdf5plugin for HDF5,
+    numcodecs for Zarr) or 'none'; level is the compression level. A .bvol
+    file takes 'gzip' (per brick, when it saves space) or 'none'.
+  max_memory: int, bytes of the input read at once (two blocks in memory);
+    at least one chunk, else ValueError.
+
+  Returns the layout report (see layout_report), also written next to the
+  output as '<output>.layout.json'.
+  """
+  if codec not in CODECS:
+    raise ValueError('Unknown codec {}, not in {}'.format(codec, CODECS))
+  shape = tuple(vol.shape)
+  dtype = np.dtype(vol.dtype)
+  chunks = cubic_chunks(shape, chunk)
+  n_workers = n_workers or os.cpu_count() or 1
+  ext = os.path.splitext(output.rstrip(os.sep))[1].lower()
+  blocks = list(iter_blocks(shape, chunks, dtype.itemsize, max_memory))
+
+  def read(block):
+    return np.asarray(vol[block_index(block)])
+
+  with ThreadPoolExecutor(max_workers=n_workers) as pool, \
+       ThreadPoolExecutor(max_workers=1) as reader:
+    if ext in ('.h5', '.hdf5', '.hdf'):
+      stored = _convert_hdf5(blocks, read, reader, pool, output, dataset,
+                             shape, dtype, chunks, codec, level)
+    elif ext in ('.zarr', '.zip'):
+      stored = _convert_zarr(blocks, read, reader, pool, output, dataset,
+                             shape, dtype, chunks, codec, level)
+    elif ext == '.bvol':
+      stored = convert_bricks(blocks, read, reader, pool, output, dataset,
+                              shape, dtype, chunks, codec, level)
+    else:
+      raise ValueError('Unknown output format {}'.format(output))
+
+  report = layout_report(shape, chunks, dtype.itemsize, stored)
+  report.update({'output': output, 'dataset': dataset, 'codec': codec})
+  with open(output.rstrip(os.sep) + '.layout.json', 'w') as f:
+    json.dump(report, f, indent=2)
+  return report
+
+
+def _convert_hdf5(blocks, read, reader, pool, output, dataset, shape, dtype,
+                  chunks, codec, level):
+  import h5py
+  kwargs = {}
+  if codec == 'gzip':
+    kwargs = {'compression': 'gzip', 'compression_opts': level}
+  elif codec == 'lzf':
+    kwargs = {'compression': 'lzf'}
+  elif codec == 'blosc':
+    import hdf5plugin
+    kwargs = dict(hdf5plugin.Blosc(cname='lz4', clevel=level))
+  with h5py.File(output, 'w') as f:
+    dset = f.create_dataset(dataset, shape=shape, dtype=dtype,
+                            chunks=chunks, **kwargs)
+    stored = 0
+    for block, data in read_ahead(blocks, read, reader):
+      if codec != 'gzip':
+        dset[block_index(block)] = data
+        continue
+      offsets, parts = zip(*block_chunks(block, data, chunks))
+      compressed = pool.map(_deflate, parts, [chunks] * len(parts),
+                            [level] * len(parts))
+      for offset, buf in zip(offsets, compressed):
+        dset.id.write_direct_chunk(offset, buf)
+        stored += len(buf)
+    if codec != 'gzip':
+      stored = dset.id.get_storage_size()
+  return stored
+
+
+def _convert_zarr(blocks, read, reader, pool, output, dataset, shape, dtype,
+                  chunks, codec, level):
+  import zarr
+  if codec == 'lzf':
+    raise ValueError('lzf is not a Zarr codec, use gzip or blosc.')
+  compressor = None
+  if codec == 'gzip':
+    from numcodecs import GZip
+    compressor = GZip(level=level)
+  elif codec == 'blosc':
+    from numcodecs import Blosc
+    compressor = Blosc(cname='lz4', clevel=level, shuffle=Blosc.SHUFFLE)
+  if output.lower().endswith('.zip'):
+    store = zarr.ZipStore(output, mode='w')
+  else:
+    store = zarr.DirectoryStore(output)
+  try:
+    array = zarr.open_array(store, mode='w', path=dataset, shape=shape,
+                            chunks=chunks, dtype=dtype,
+                            compressor=compressor)
+    # A zip store cannot be written concurrently.
+    write_pool = pool if isinstance(store, zarr.DirectoryStore) else None
+    def write(item):
+      offset, part = item
+      array[tuple(slice(o, o + n) for o, n in zip(offset, part.shape))] = part
+    for block, data in read_ahead(blocks, read, reader):
+      if write_pool is not None:
+        list(write_pool.map(write, block_chunks(block, data, chunks)))
+      else:
+        for item in block_chunks(block, data, chunks):
+          write(item)
+    stored = array.nbytes_stored
+  finally:
+    if isinstance(store, zarr.ZipStore):
+      store.close()
+  return stored
@@ -9,19 +9,51 @@ import numpy as np
 from vispy import scene
 
 from .axis_aligned_image import AxisAlignedImage
+from .slice_cache import make_cache
+from .slice_prefetch import make_prefetcher
+from .volume_source import as_source
+from .volume_stats import auto_clim
 
 
 def volume_slices(volumes, x_pos=None, y_pos=None, z_pos=None,
                   preproc_funcs=None,
                   seismic_coord_system=True,
                   cmaps='grays', clims=None,
-                  interpolation='spline36', method='auto'):
+                  interpolation='spline36', method='auto',
+                  cache=None, prefetch=None,
+                  pyramid=None, lod_delay=0.3,
+                  texture_mode='float32', tile_size=None):
   """ Acquire a list of slices in the form of AxisAlignedImage.
   The list can be attached to a SeismicCanvas to visualize the volume
   in 3D interactively.
 
   Parameters:
-
+  volumes: a volume (np.ndarray, np.memmap, h5py dataset, Zarr array or any
+    VolumeSource), or a list of volumes of the same shape to overlay.
+  cache: the slice cache policy. None/False disables caching; True uses the
+    LRU cache shared by all slices; an int creates a private cache with this
+    many bytes; or pass a SliceCache instance directly.
+  prefetch: read ahead the slices along the dragging direction. None/False
+    disables prefetching; an int is the number of slices to read ahead; or
+    pass a SlicePrefetcher instance. Prefetching needs a cache, so the shared
+    cache is used if cache is None.
+  pyramid: coarse levels of detail displayed while a slice is moving. None/
+    False disables them; True or an int (number of levels) builds 2x
+    decimated levels with build_pyramid; or pass the precomputed levels as a
+    list [level1, level2, ...], where each level is a volume (or a list of
+    volumes, one per input volume) decimated by 2**level.
+  lod_delay: seconds without movement before the full-resolution slice is
+    swapped in, when a pyramid is used.
+  clims: the colormap range (cmin, cmax), or per volume in a list. None/
+    'auto' is the (min, max) of the volume and 'robust' its 1st to 99th
+    percentiles, computed by volume_stats.compute_stats. The statistics of
+    file-backed volumes are saved in a sidecar file (in the user cache, see
+    volume_stats.STATS_DIR), so only the first launch scans the volume.
+  texture_mode: 'float32', 'uint16' or 'uint8', the dtype the slices are
+    uploaded with, see AxisAlignedImage. The quantized modes upload fewer
+    bytes per update, which matters for overlays of large slices.
+  tile_size: the tile size of the slices, see AxisAlignedImage. By default
+    only the slices larger than the maximum texture size are tiled.
   """
   # Check whether single volume or multiple volumes are provided.
   if isinstance(volumes, (tuple, list)):
@@ -35,7 +67,9 @@ def volume_slices(volumes, x_pos=None, y_pos=None, z_pos=None,
       and len(cmaps) >= n_vol
     assert isinstance(clims, (tuple, list)) \
       and len(clims) >= n_vol \
-      and len(clims[0]) == 2 or clims[0] is None
+      and len(clims[0]) == 2 or clims[0] is None \
+      or isinstance(clims[0], str)
+    clims = list(clims)
     for vol in volumes:
       assert vol.shape == volumes[0].shape
   else:
@@ -45,24 +79,70 @@ def volume_slices(volumes, x_pos=None, y_pos=None, z_pos=None,
     clims = [clims]
     n_vol = 1
 
-  slices_list = []
   # z-axis down seismic coordinate system, or z-axis up normal system.
   #if seismic_coord_system:
-  for i_vol in range(n_vol):
-      volumes[i_vol] = volumes[i_vol][:, :, ::-1]
-  shape = volumes[0].shape
+  sources = [as_source(vol).flipped('z') for vol in volumes]
+
+  # Organize the coarse levels of detail, in the same coordinate system.
+  levels = []
+  if pyramid is not None and pyramid is not False:
+    if pyramid is True or isinstance(pyramid, int):
+      n_levels = None if pyramid is True else pyramid
+      pyramids = [build_pyramid(source.data, n_levels) for source in sources]
+      pyramid = [list(level) for level in zip(*pyramids)]
+    for level in pyramid:
+      if not isinstance(level, (tuple, list)):
+        level = [level]
+      assert len(level) >= n_vol
+      levels.append([as_source(vol).flipped('z') for vol in level[:n_vol]])
 
   # Automatically set clim (cmap range) if not specified.
   for i_vol in range(n_vol):
     clim = clims[i_vol]
-    vol = volumes[i_vol]
-    if clim is None or clim=='auto':
-      if type(vol) == np.memmap:
-        from warnings import warn
-        warn("cmap='auto' with np.memmap can significantly impact launching " +
-             "time, cmap=(cmin, cmax) is recommended.",
-             UserWarning, stacklevel=2)
-      clims[i_vol] = (vol.min(), vol.max())
+    if clim is None or isinstance(clim, str):
+      clims[i_vol] = auto_clim(sources[i_vol], clim)
+
+  return slices_from_sources(sources, x_pos=x_pos, y_pos=y_pos, z_pos=z_pos,
+    preproc_funcs=preproc_funcs,
+    seismic_coord_system=seismic_coord_system,
+    cmaps=cmaps, clims=clims,
+    interpolation=interpolation, method=method,
+    cache=cache, prefetch=prefetch, levels=levels, lod_delay=lod_delay,
+    texture_mode=texture_mode, tile_size=tile_size)
+
+
+def slices_from_sources(sources, x_pos=None, y_pos=None, z_pos=None,
+                        preproc_funcs=None,
+                        seismic_coord_system=True,
+                        cmaps=None, clims=None,
+                        interpolation='spline36', method='auto',
+                        cache=None, prefetch=None,
+                        levels=None, lod_delay=0.3,
+                        image_flips=None, texture_mode='float32',
+                        tile_size=None):
+  """ Create the AxisAlignedImage slices of a list of VolumeSource, which
+  are already in the display coordinate system. This is the common part of
+  volume_slices and volume_slices_hdf5; cmaps, clims and preproc_funcs are
+  lists with one element per source.
+
+  Parameters:
+  levels: a list [level1, level2, ...] of the coarse levels of detail, each
+    level being a list of VolumeSource (one per source).
+  image_flips: dict {axis: (flip_rows, flip_cols)} of the slice images.
+  """
+  n_vol = len(sources)
+  shape = sources[0].shape
+  if preproc_funcs is None:
+    preproc_funcs = [None] * n_vol
+  levels = levels if levels is not None else []
+  image_flips = image_flips if image_flips is not None else {}
+
+  prefetcher = make_prefetcher(prefetch)
+  if prefetcher is not None and cache is None:
+    cache = True # prefetched slices are handed over through the cache
+  cache = make_cache(cache)
+
+  slices_list = []
 
   # Function that returns the limitation of slice movement.
   def limit(axis):
@@ -70,28 +150,6 @@ def volume_slices(volumes, x_pos=None, y_pos=None, z_pos=None,
     elif axis == 'y': return (0, shape[1]-1)
     elif axis == 'z': return (0, shape[2]-1)
 
-  # Function that returns a function that provides the slice image at
-  # specified slicing position.
-  def get_image_func(axis, i_vol):
-    def slicing_at_axis(pos, get_shape=False):
-      if get_shape: # just return the shape information
-        if   axis == 'x': return shape[1], shape[2]
-        elif axis == 'y': return shape[0], shape[2]
-        elif axis == 'z': return shape[0], shape[1]
-      else: # will slice the volume and return an np array image
-        pos = int(np.round(pos))
-        vol = volumes[i_vol]
-        preproc_f = preproc_funcs[i_vol]
-        if preproc_f is not None:
-          if   axis == 'x': return preproc_f(vol[pos, :, :])
-          elif axis == 'y': return preproc_f(vol[:, pos, :])
-          elif axis == 'z': return preproc_f(vol[:, :, pos])
-        else:
-          if   axis == 'x': return vol[pos, :, :]
-          elif axis == 'y': return vol[:, pos, :]
-          elif axis == 'z': return vol[:, :, pos]
-    return slicing_at_axis
-
   # Organize the slice positions.
   for xyz_pos in (x_pos, y_pos, z_pos):
     if not (isinstance(xyz_pos, (list, tuple, int, float))
@@ -109,16 +167,37 @@ def volume_slices(volumes, x_pos=None, y_pos=None, z_pos=None,
         if axis in ('y', 'z'):
           # Revert y and z axis in seismic coordinate system.
           pos = limit(axis)[1] - pos
-        # Generate a list of image funcs for each input volume.
-        image_funcs = []
-        for i_vol in range(n_vol):
-          image_funcs.append(get_image_func(axis, i_vol))
-        # Construct the AxisAlignedImage node.
-        image_node = AxisAlignedImage(image_funcs,
+        # Construct the AxisAlignedImage node, it slices the sources itself.
+        image_node = AxisAlignedImage(sources,
           axis=axis, pos=pos, limit=limit(axis),
           seismic_coord_system=seismic_coord_system,
           cmaps=cmaps, clims=clims,
-          interpolation=interpolation, method=method)
+          interpolation=interpolation, method=method,
+          preproc_funcs=preproc_funcs, cache=cache,
+          image_flip=image_flips.get(axis, (False, False)),
+          prefetcher=prefetcher,
+          lod_funcs=levels, lod_delay=lod_delay,
+          texture_mode=texture_mode, tile_size=tile_size)
         slices_list.append(image_node)
 
-  return slices_list
\ No newline at end of file
+  return slices_list
+
+
+def build_pyramid(vol, n_levels=None, min_size=64):
+  """ Return the 2x decimated levels of detail [level1, level2, ...] of a
+  volume. The levels are strided views, so nothing is read or copied here;
+  save them (e.g. np.save(f, np.ascontiguousarray(level))) to get a pyramid
+  that reads faster than the strided access of the original volume.
+
+  Parameters:
+  n_levels: int, the number of levels. If None, decimate until the smallest
+    dimension of the coarsest level would be less than min_size.
+  """
+  if not isinstance(vol, np.ndarray):
+    raise ValueError('Only np.ndarray/np.memmap volumes can be decimated on ' +
+                     'the fly, pass the precomputed levels instead.')
+  if n_levels is None:
+    n_levels = 0
+    while min(vol.shape) // 2**(n_levels+1) >= min_size:
+      n_levels += 1
+  return [vol[::2**k, ::2**k, ::2**k] for k in range(1, n_levels + 1)]
@@ -0,0 +1,643 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import copy
+import functools
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+_AXES = ('x', 'y', 'z')
+
+def axis_index(axis):
+  """ Convert axis 'x'/'y'/'z' (or 0/1/2) to the dimension index. """
+  if isinstance(axis, str):
+    axis = axis.lower()
+    if axis not in _AXES:
+      raise ValueError('Invalid value for axis.')
+    return _AXES.index(axis)
+  return int(axis)
+
+
+class VolumeSource(object):
+  """ A 3D volume that provides 2D slices along the x, y and z axes. This is
+  the storage abstraction consumed by AxisAlignedImage: every backend gets
+  the slice cache, prefetch and levels of detail for free.
+
+  Subclasses implement _read_slice(i, pos) with the raw dimension index and
+  position, and may override _read_slices(i, positions) to serve several
+  slices with a single I/O call.
+
+  Parameters:
+  data: the array-like volume of shape (nx, ny, nz).
+  reverse: tuple of 3 bools, the dimensions read in reverse order (e.g. the
+    z-axis down seismic coordinate system). Reversing is done by index
+    mapping, nothing is copied.
+  """
+  def __init__(self, data, reverse=(False, False, False)):
+    self.data = data
+    self.reverse = tuple(bool(r) for r in reverse)
+
+  @property
+  def shape(self):
+    return tuple(int(n) for n in self.data.shape)
+
+  @property
+  def dtype(self):
+    return np.dtype(self.data.dtype)
+
+  def flipped(self, axes):
+    """ Return a copy of this source with the given axes reversed, e.g.
+    source.flipped('z'). The underlying data is shared.
+    """
+    reverse = list(self.reverse)
+    for axis in axes:
+      reverse[axis_index(axis)] ^= True
+    source = copy.copy(self)
+    source.reverse = tuple(reverse)
+    return source
+
+  def slice_shape(self, axis):
+    """ The shape of the slices perpendicular to axis. """
+    i = axis_index(axis)
+    return tuple(n for k, n in enumerate(self.shape) if k != i)
+
+  def get_slice(self, axis, pos, orient=True):
+    """ Return the 2D slice at position pos along axis. If orient is False,
+    the in-plane dimensions are left in storage order, see in_plane_reverse.
+    """
+    i = axis_index(axis)
+    image = self._read_slice(i, self._index(i, pos))
+    return self._orient(i, image) if orient else image
+
+  def get_slices(self, axis, positions, orient=True):
+    """ Return the 2D slices at positions along axis, stacked in a 3D array
+    of shape (len(positions), *slice_shape(axis)).
+    """
+    i = axis_index(axis)
+    positions = [self._index(i, pos) for pos in positions]
+    if len(positions) == 0:
+      return np.empty((0,) + self.slice_shape(i), dtype=self.dtype)
+    images = self._read_slices(i, positions)
+    return self._orient(i, images) if orient else images
+
+  def get_region(self, axis, pos, rows, cols, step=1):
+    """ Return the region [rows[0]:rows[1], cols[0]:cols[1]] of the slice at
+    position pos along axis, keeping one sample out of step. The rows and
+    columns are indices in storage order (see get_slice(orient=False)), so
+    only that region is read.
+    """
+    i = axis_index(axis)
+    index = [slice(rows[0], rows[1], step), slice(cols[0], cols[1], step)]
+    index.insert(i, self._index(i, pos))
+    return self._read_region(tuple(index))
+
+  def in_plane_reverse(self, axis):
+    """ The reversed (rows, columns) of the slices perpendicular to axis,
+    which get_slice(orient=False) leaves to the caller.
+    """
+    i = axis_index(axis)
+    return tuple(self.reverse[k] for k in range(3) if k != i)
+
+  def min_max(self):
+    """ Return the (min, max) of the volume, scanned slab by slab. """
+    cmin, cmax = np.inf, -np.inf
+    for slab in self.iter_slabs():
+      cmin = min(cmin, slab.min())
+      cmax = max(cmax, slab.max())
+    return cmin, cmax
+
+  def stored_min_max(self):
+    """ Return the (min, max) stored with the volume (e.g. in the header of
+    its file), or None if it has to be computed, see min_max.
+    """
+    return None
+
+  def iter_slabs(self, slab_size=None):
+    """ Iterate over the volume in slabs along the x axis. """
+    nx = self.shape[0]
+    if slab_size is None:
+      # About 64 MB per slab.
+      slab_size = max(1, (64 << 20) //
+                      (self.dtype.itemsize * self.shape[1] * self.shape[2]))
+    for i in range(0, nx, slab_size):
+      yield np.asarray(self.data[i:i+slab_size])
+
+  def _index(self, i, pos):
+    """ Map a position to the raw index in the data along dimension i. """
+    pos = int(np.round(pos))
+    n = self.shape[i]
+    if not 0 <= pos < n:
+      raise IndexError('pos={} is outside the range [0, {}).'.format(pos, n))
+    return n - 1 - pos if self.reverse[i] else pos
+
+  def _orient(self, i, image):
+    """ Reverse the in-plane dimensions of the (stack of) slice images. """
+    flips = tuple(slice(None, None, -1) if self.reverse[k] else slice(None)
+                  for k in range(3) if k != i)
+    return image[(Ellipsis,) + flips]
+
+  def _read_slice(self, i, pos):
+    index = [slice(None)] * 3
+    index[i] = pos
+    return np.asarray(self.data[tuple(index)])
+
+  def _read_slices(self, i, positions):
+    return np.stack([self._read_slice(i, pos) for pos in positions])
+
+  def _read_region(self, index):
+    return np.asarray(self.data[index])
+
+  def __repr__(self):
+    return '<{} shape={} dtype={}>'.format(
+      type(self).__name__, self.shape, self.dtype)
+
+
+class ArraySource(VolumeSource):
+  """ A VolumeSource of an in-memory np.ndarray, slices are views. """
+  def min_max(self):
+    return self.data.min(), self.data.max()
+
+  def _read_slices(self, i, positions):
+    # A single fancy indexing, the slices end up stacked along the 1st dim.
+    return np.moveaxis(np.take(self.data, positions, axis=i), i, 0)
+
+
+class MemmapSource(ArraySource):
+  """ A VolumeSource of a np.memmap, e.g. a large .npy file opened with
+  MemmapSource.open(path).
+  """
+  @classmethod
+  def open(cls, filename, dtype=None, shape=None, offset=0, order='C',
+           **kwargs):
+    """ Open a .npy file, or a raw binary file if dtype and shape are given,
+    as a read-only memory map.
+    """
+    if dtype is None:
+      data = np.load(filename, mmap_mode='r')
+    else:
+      data = np.memmap(filename, dtype=dtype, mode='r', shape=shape,
+                       offset=offset, order=order)
+    return cls(data, **kwargs)
+
+  def _read_slices(self, i, positions):
+    lo, hi = min(positions), max(positions)
+    if i == 0 and hi - lo + 1 == len(positions):
+      # A run of x slices is one sequential read of the file.
+      block = np.asarray(self.data[lo:hi+1])
+      return block[np.asarray(positions) - lo]
+    return ArraySource._read_slices(self, i, positions)
+
+
+def index_box(index, shape):
+  """ Split a basic index of a 3D volume (an int or a slice per dimension)
+  into the bounding box [(start, stop)] * 3 it reads, the steps of the
+  samples it keeps in the box, and the index that takes the int dimensions
+  out of the result.
+  """
+  box, steps, sub = [], [], []
+  for item, n in zip(index, shape):
+    if isinstance(item, slice):
+      start, stop, step = item.indices(n)
+      if step < 0:
+        raise IndexError('Negative steps are not supported.')
+      box.append((start, max(stop, start)))
+      steps.append(step)
+      sub.append(slice(None))
+    else:
+      item = int(item)
+      if item < 0:
+        item += n
+      if not 0 <= item < n:
+        raise IndexError('index {} is out of bounds for size {}'.format(
+          item, n))
+      box.append((item, item + 1))
+      steps.append(1)
+      sub.append(0)
+  return box, tuple(steps), tuple(sub)
+
+
+def read_chunk_box(box, chunks, dtype, read_chunk, steps=(1, 1, 1)):
+  """ Read the box [(start, stop)] * 3 of a volume stored in a grid of
+  chunks of shape chunks, chunk by chunk, keeping one sample out of
+  steps[k] along dimension k. Only the chunks holding a kept sample are
+  read.
+
+  read_chunk(coords, src) returns the chunk at the grid coordinates coords,
+  of which the samples src (a tuple of slices) are kept: an array (possibly
+  clipped at the border of the volume), a scalar for a chunk of a single
+  value, or a function returning either, called on the chunk thread pool
+  (e.g. a read or a decompression releasing the GIL). The kept samples are
+  copied into the output as the chunks arrive.
+  """
+  out = np.empty([len(range(start, stop, step)) for (start, stop), step
+                  in zip(box, steps)], dtype=dtype)
+  if out.size == 0:
+    return out
+  ranges = [np.unique(np.arange(start, stop, step) // c).tolist()
+            for (start, stop), c, step in zip(box, chunks, steps)]
+  futures = []
+  for coords in itertools.product(*ranges):
+    src, dst = [], []
+    for (start, stop), n, c, step in zip(box, coords, chunks, steps):
+      lo, hi = max(start, n * c), min(stop, (n + 1) * c)
+      # The kept samples k0 ... k1-1 of the output fall in this chunk.
+      k0, k1 = -(-(lo - start) // step), -(-(hi - start) // step)
+      src.append(slice(start + k0 * step - n * c,
+                       start + (k1 - 1) * step - n * c + 1, step))
+      dst.append(slice(k0, k1))
+    src, dst = tuple(src), tuple(dst)
+    chunk = read_chunk(coords, src)
+    if callable(chunk):
+      futures.append(get_chunk_executor().submit(
+        _copy_chunk, out, dst, src, chunk))
+    else:
+      _copy_chunk(out, dst, src, chunk)
+  for future in futures:
+    future.result()
+  return out
+
+
+def _copy_chunk(out, dst, src, chunk):
+  if callable(chunk):
+    chunk = chunk()
+  out[dst] = chunk[src] if np.ndim(chunk) else chunk
+
+
+class ChunkedSource(VolumeSource):
+  """ A VolumeSource of chunked storage that reads the bounding boxes of its
+  slices and regions by itself, see _read_box (typically with
+  read_chunk_box). The close positions of get_slices are read as one box,
+  so every chunk is read once. Subclasses that cannot read a box (see
+  _reads_boxes) fall back to the next class of their MRO.
+  """
+  def _reads_boxes(self):
+    return True
+
+  def _read_box(self, box, steps=(1, 1, 1)):
+    """ Return the box [(start, stop)] * 3 of the volume, keeping one sample
+    out of steps[k] along dimension k.
+    """
+    raise NotImplementedError
+
+  def _read_slice(self, i, pos):
+    if not self._reads_boxes():
+      return super()._read_slice(i, pos)
+    box = [(0, n) for n in self.shape]
+    box[i] = (pos, pos + 1)
+    return np.take(self._read_box(box), 0, axis=i)
+
+  def _read_slices(self, i, positions):
+    if not self._reads_boxes():
+      return super()._read_slices(i, positions)
+    lo, hi = min(positions), max(positions)
+    if hi - lo + 1 > 4 * len(positions):
+      # Scattered positions: one box each rather than the whole span.
+      return np.stack([self._read_slice(i, pos) for pos in positions])
+    box = [(0, n) for n in self.shape]
+    box[i] = (lo, hi + 1)
+    block = np.moveaxis(self._read_box(box), i, 0)
+    return block[np.asarray(positions) - lo]
+
+  def _read_region(self, index):
+    if not self._reads_boxes():
+      return super()._read_region(index)
+    box, steps, sub = index_box(index, self.shape)
+    return self._read_box(box, steps)[sub]
+
+
+class HDF5Source(VolumeSource):
+  """ A VolumeSource of a h5py dataset, each slice reads only its hyperslab.
+  Use HDF5Source.open(path, name) to open the file read-only; the file stays
+  open as long as the source is alive.
+  """
+  def __init__(self, data, reverse=(False, False, False), h5file=None,
+               chunk_cache=None):
+    VolumeSource.__init__(self, data, reverse=reverse)
+    self.h5file = h5file
+    self.chunk_cache = chunk_cache # the cache chosen by open, if any
+
+  @classmethod
+  def open(cls, filename, dataset_name, chunk_cache='auto', verbose=False,
+           **kwargs):
+    """ Open a dataset read-only. By default its chunk cache holds a full
+    slice along every axis, see hdf5_cache.chunk_cache_config; chunk_cache
+    can also be None (HDF5 default) or a dict {nbytes, nslots, w0}.
+    """
+    import h5py
+    from .hdf5_cache import open_hdf5_dataset
+    h5file = h5py.File(filename, 'r')
+    data, config = open_hdf5_dataset(h5file, dataset_name, chunk_cache,
+                                     verbose=verbose)
+    return cls(data, h5file=h5file, chunk_cache=config, **kwargs)
+
+  def iter_slabs(self, slab_size=None):
+    # Follow the chunk layout, so every chunk is read only once.
+    if slab_size is None and self.data.chunks is not None:
+      slab_size = self.data.chunks[0]
+    return VolumeSource.iter_slabs(self, slab_size)
+
+  def _read_slices(self, i, positions):
+    # h5py reads a hyperslab or a list of increasing indices in one call.
+    order = np.argsort(positions)
+    sorted_pos = [positions[k] for k in order]
+    index = [slice(None)] * 3
+    if sorted_pos[-1] - sorted_pos[0] + 1 == len(set(sorted_pos)):
+      index[i] = slice(sorted_pos[0], sorted_pos[-1] + 1)
+      block = np.moveaxis(self.data[tuple(index)], i, 0)
+      block = block[np.asarray(sorted_pos) - sorted_pos[0]]
+    else:
+      unique_pos = sorted(set(sorted_pos))
+      index[i] = unique_pos
+      block = np.moveaxis(self.data[tuple(index)], i, 0)
+      block = block[np.searchsorted(unique_pos, sorted_pos)]
+    images = np.empty_like(block)
+    images[order] = block
+    return images
+
+
+class ZarrSource(ChunkedSource):
+  """ A VolumeSource of a Zarr array. Use ZarrSource.open(path) to open a
+  directory, zip or N5 store read-only.
+
+  Zarr reads the chunks of a selection one after the other. Here the chunks
+  a slice intersects are fetched from the chunk store and decoded
+  concurrently on a thread pool (file reads and the blosc/zlib codecs
+  release the GIL), then copied into the slice; a missing chunk is the
+  fill value. The fetch goes through the chunk store of the array, so an
+  LRUStoreCache in front of the store (see open) serves the chunks it holds.
+  Without the Zarr 2 internals used here (Zarr 3 fetches concurrently by
+  itself), the selections are read by Zarr.
+  """
+  @classmethod
+  def open(cls, store, path=None, cache_bytes='auto', **kwargs):
+    """ Open an array read-only: a .zarr directory, a .zip or a .n5 path, or
+    any Zarr store.
+
+    Parameters:
+    cache_bytes: the size of a zarr.LRUStoreCache of the encoded chunks put
+      in front of the store; 'auto' holds the chunks of a full slice along
+      every axis (see hdf5_cache.chunk_cache_config); None/0 reads the store
+      directly.
+    """
+    import zarr
+    data = zarr.open(store, mode='r', path=path)
+    if cache_bytes == 'auto':
+      from .hdf5_cache import chunk_cache_config
+      # The decoded size of the chunks, an upper bound of their encoded size.
+      cache_bytes = chunk_cache_config(data.shape, data.chunks,
+                                       data.dtype.itemsize)['nbytes']
+    if cache_bytes:
+      data = zarr.Array(zarr.LRUStoreCache(data.store, max_size=cache_bytes),
+                        path=data.path, read_only=True)
+    return cls(data, **kwargs)
+
+  @property
+  def concurrent(self):
+    """ Whether the chunks are fetched here, on the chunk thread pool. """
+    return hasattr(self.data, '_chunk_key') and \
+      hasattr(self.data, '_decode_chunk')
+
+  def iter_slabs(self, slab_size=None):
+    if slab_size is None:
+      slab_size = self.data.chunks[0]
+    return VolumeSource.iter_slabs(self, slab_size)
+
+  def _reads_boxes(self):
+    return self.concurrent
+
+  def _read_slices(self, i, positions):
+    if self.concurrent:
+      return ChunkedSource._read_slices(self, i, positions)
+    index = [slice(None)] * 3
+    index[i] = np.asarray(positions)
+    block = self.data.get_orthogonal_selection(tuple(index))
+    return np.moveaxis(block, i, 0)
+
+  def _read_box(self, box, steps=(1, 1, 1)):
+    """ Read the box of the array, its chunks fetched and decoded
+    concurrently, see read_chunk_box.
+    """
+    return read_chunk_box(box, self.data.chunks, self.dtype,
+                          self._read_chunk, steps)
+
+  def _read_chunk(self, coords, src):
+    # The whole fetch runs on the chunk thread pool.
+    return functools.partial(self._fetch_chunk, coords)
+
+  def _fetch_chunk(self, coords):
+    """ Fetch and decode the chunk at coords, or return its fill value. """
+    try:
+      cdata = self.data.chunk_store[self.data._chunk_key(coords)]
+    except KeyError: # not stored, all fill value
+      fill = self.data.fill_value
+      return fill if fill is not None else 0
+    return self.data._decode_chunk(cdata)
+
+
+def as_source(vol):
+  """ Wrap an ndarray, np.memmap, h5py dataset, Zarr array or BrickVolume in
+  the matching VolumeSource. A VolumeSource is returned as is.
+  """
+  from .volume_bricks import BrickSource, BrickVolume
+  if isinstance(vol, VolumeSource):
+    return vol
+  if isinstance(vol, BrickVolume):
+    return BrickSource(vol)
+  if isinstance(vol, np.memmap):
+    return MemmapSource(vol)
+  if isinstance(vol, np.ndarray):
+    return ArraySource(vol)
+  module = type(vol).__module__.split('.')[0]
+  if module == 'h5py':
+    return HDF5Source(vol)
+  if module == 'zarr':
+    return ZarrSource(vol)
+  raise ValueError('Unsupported volume type {}'.format(type(vol)))
+
+
+class SliceFunc(object):
+  """ The image function of AxisAlignedImage slicing a VolumeSource along an
+  axis: func(pos) returns the slice image and func(pos, get_shape=True) its
+  shape. The images go through the slice cache if one is given.
+
+  The images are returned in storage order, without the reversed dimensions
+  of the source nor flip applied: the reversal is left to the display
+  transform of AxisAlignedImage, see the flips attribute. preproc_f still
+  sees the images oriented as get_slice returns them (the reversed
+  dimensions of the source applied, as in the slices of the z-reversed
+  volume): the images are reoriented for it and back, both views.
+
+  Parameters:
+  source: the VolumeSource.
+  axis: str, 'x', 'y' or 'z'.
+  preproc_f: function applied to every slice image, or None.
+  cache: a SliceCache, or None.
+  level: int, the level of detail of source, which is decimated by 2**level.
+    The positions given to the function are full-resolution positions.
+  flip: tuple of 2 bools, reverse the rows/columns of the slice images.
+  """
+  def __init__(self, source, axis, preproc_f=None, cache=None, level=0,
+               flip=(False, False)):
+    self.source = source
+    self.axis = axis
+    self.preproc_f = preproc_f
+    self.cache = cache
+    self.level = level
+    self.flip = tuple(bool(f) for f in flip)
+    # The (rows, columns) reversal the images must be displayed with.
+    self.flips = tuple(r != f for r, f in
+                       zip(source.in_plane_reverse(axis), self.flip))
+    # Index of the rows and columns reversed for preproc_f.
+    self._orient = tuple(slice(None, None, -1) if r else slice(None)
+                         for r in source.in_plane_reverse(axis))
+    self._n = source.shape[axis_index(axis)]
+    if cache is not None:
+      self._vol_id = cache.volume_id(source.data)
+
+  def _pos(self, pos):
+    return min(int(np.round(pos)) >> self.level, self._n - 1)
+
+  def _key(self, pos):
+    return (self._vol_id, self.axis, pos, self.preproc_f,
+            self.source.reverse[axis_index(self.axis)])
+
+  def _finish(self, image):
+    if self.preproc_f is not None:
+      image = self.preproc_f(image[self._orient])[self._orient]
+    return image
+
+  def __call__(self, pos, get_shape=False):
+    if get_shape: # just return the shape information
+      return self.source.slice_shape(self.axis)
+    if self.cache is not None:
+      image = self.cache.get(self._key(self._pos(pos)))
+      if image is not None:
+        return image
+    return self._deliver(pos, self._read(pos))
+
+  def _read_id(self):
+    """ The SliceFuncs with the same _read_id read the same raw images at a
+    given position, only their preproc_f may differ.
+    """
+    i = axis_index(self.axis)
+    return (id(self.source.data), i, self.source.reverse[i], self.level)
+
+  def _read(self, pos, region=None):
+    """ Read the raw image at pos, or its region (rows, cols, step). """
+    if region is not None:
+      return self.source.get_region(self.axis, self._pos(pos), *region)
+    return self.source.get_slice(self.axis, self._pos(pos), orient=False)
+
+  def _deliver(self, pos, image, region=None):
+    """ Preprocess a raw image read by _read, and cache it. """
+    image = self._finish(image)
+    if region is None and self.cache is not None:
+      image = self.cache.put(self._key(self._pos(pos)), image)
+    return image
+
+  def cached(self, pos):
+    """ Whether the image at pos is in the cache. """
+    return self.cache is not None and self._key(self._pos(pos)) in self.cache
+
+  def region(self, pos, rows, cols, step=1):
+    """ Return the image of the region [rows[0]:rows[1], cols[0]:cols[1]]
+    (in storage order) at pos, keeping one sample out of step. The regions
+    are read on demand, they do not go through the cache.
+    """
+    region = (rows, cols, step)
+    return self._deliver(pos, self._read(pos, region), region)
+
+  def load(self, positions):
+    """ Read the images at positions into the cache with a single batched
+    get_slices() call, skipping those already cached.
+    """
+    if self.cache is None:
+      return
+    positions = sorted(set(self._pos(pos) for pos in positions))
+    positions = [pos for pos in positions if self._key(pos) not in self.cache]
+    if not positions:
+      return
+    images = self.source.get_slices(self.axis, positions, orient=False)
+    for pos, image in zip(positions, images):
+      self.cache.put(self._key(pos), self._finish(image))
+
+
+def as_image_func(func, axis, preproc_f=None, cache=None, level=0,
+                  flip=(False, False)):
+  """ Return func if it is already an image function, or the SliceFunc of
+  func if it is a volume (VolumeSource or anything as_source accepts).
+  """
+  if callable(func) and not isinstance(func, VolumeSource):
+    return func
+  return SliceFunc(as_source(func), axis, preproc_f=preproc_f, cache=cache,
+                   level=level, flip=flip)
+
+
+# The thread pool reading the overlaid volumes concurrently.
+_fetch_executor = None
+
+def get_fetch_executor():
+  """ Return the process-wide fetch thread pool, create it on first use. """
+  global _fetch_executor
+  if _fetch_executor is None:
+    _fetch_executor = ThreadPoolExecutor(max_workers=8,
+                                         thread_name_prefix='slice-fetch')
+  return _fetch_executor
+
+
+# The thread pool reading and decoding the chunks of a slice (see
+# read_chunk_box), separate from the fetch pool, whose tasks wait for it.
+# The chunk reads wait on I/O, hence more threads than cores.
+_chunk_executor = None
+
+def get_chunk_executor():
+  """ Return the process-wide chunk thread pool, create it on first use. """
+  global _chunk_executor
+  if _chunk_executor is None:
+    _chunk_executor = ThreadPoolExecutor(
+      max_workers=min(32, 4 * (os.cpu_count() or 1)),
+      thread_name_prefix='chunk-fetch')
+  return _chunk_executor
+
+
+def fetch_images(funcs, pos, region=None):
+  """ Return the images of all the image functions at pos, e.g. the layers
+  of an AxisAlignedImage, as [func(pos) for func in funcs] would.
+
+  The SliceFuncs slicing the same volume read it once and only differ by
+  their preproc_f. The distinct volumes (e.g. attributes stored as separate
+  datasets) are read and preprocessed concurrently on a thread pool, so an
+  overlay of several attributes costs about the wall time of one.
+
+  Parameters:
+  region: (rows, cols, step) to fetch a region of the slices instead, see
+    SliceFunc.region. All the funcs must then be SliceFuncs.
+  """
+  images = [None] * len(funcs)
+  groups = {} # _read_id -> indices of the funcs reading the same images
+  for k, func in enumerate(funcs):
+    if isinstance(func, SliceFunc) and (region is not None
+                                        or not func.cached(pos)):
+      groups.setdefault(func._read_id(), []).append(k)
+    else:
+      images[k] = func(pos)
+
+  def fetch(indices):
+    raw = funcs[indices[0]]._read(pos, region)
+    for k in indices:
+      images[k] = funcs[k]._deliver(pos, raw, region)
+
+  groups = list(groups.values())
+  if len(groups) > 1:
+    list(get_fetch_executor().map(fetch, groups))
+  elif groups:
+    fetch(groups[0])
+  return images
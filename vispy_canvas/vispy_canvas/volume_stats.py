@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+# -----------------------------------------------------------------------------
+# Copyright (C) 2019 Yunzhi Shi @ The University of Texas at Austin.
+# All rights reserved.
+# Distributed under the MIT License. See LICENSE for more info.
+# -----------------------------------------------------------------------------
+
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .volume_bricks import BrickVolume
+from .volume_source import as_source
+
+
+# Percentiles computed by default, clim='robust' uses (1, 99).
+PERCENTILES = (0.1, 0.5, 1., 2., 5., 50., 95., 98., 99., 99.5, 99.9)
+
+# The directory of the sidecar files by default, see compute_stats.
+STATS_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'vispy_canvas',
+                         'stats')
+
+
+class VolumeStats(object):
+  """ Statistics of a volume computed by compute_stats: exact min, max, mean
+  and std, plus robust percentiles and a histogram estimated from a uniform
+  random sample of the samples (see sample_size in compute_stats).
+  """
+  def __init__(self, count, vmin, vmax, mean, std, percentiles,
+               hist_counts, hist_edges):
+    self.count = int(count)
+    self.min = float(vmin)
+    self.max = float(vmax)
+    self.mean = float(mean)
+    self.std = float(std)
+    self.percentiles = {float(q): float(v) for q, v in percentiles.items()}
+    self.hist_counts = np.asarray(hist_counts, dtype=np.int64)
+    self.hist_edges = np.asarray(hist_edges, dtype=np.float64)
+
+  def percentile(self, q):
+    """ Return the q-th percentile, interpolated between the stored ones. """
+    qs = sorted(self.percentiles)
+    if q in self.percentiles:
+      return self.percentiles[q]
+    return float(np.interp(q, [0.] + qs + [100.],
+      [self.min] + [self.percentiles[k] for k in qs] + [self.max]))
+
+  def clim(self, mode='auto'):
+    """ Return the colormap range: 'auto' is (min, max), 'robust' is the 1st
+    to 99th percentiles, or pass a (low, high) tuple of percentiles.
+    """
+    if mode is None or mode == 'auto':
+      return (self.min, self.max)
+    if mode == 'robust':
+      mode = (1., 99.)
+    return (self.percentile(mode[0]), self.percentile(mode[1]))
+
+  def to_dict(self):
+    return {'count': self.count, 'min': self.min, 'max': self.max,
+            'mean': self.mean, 'std': self.std,
+            'percentiles': {repr(q): v for q, v in self.percentiles.items()},
+            'hist_counts': self.hist_counts.tolist(),
+            'hist_edges': self.hist_edges.tolist()}
+
+  @classmethod
+  def from_dict(cls, d):
+    return cls(d['count'], d['min'], d['max'], d['mean'], d['std'],
+               {float(q): v for q, v in d['percentiles'].items()},
+               d['hist_counts'], d['hist_edges'])
+
+  def __repr__(self):
+    return ('<VolumeStats count={} min={:g} max={:g} mean={:g} std={:g}>'
+            .format(self.count, self.min, self.max, self.mean, self.std))
+
+
+def _file_spec(source):
+  """ Describe how a worker process reopens the data of source, or return
+  None if the data only lives in this process.
+  """
+  data = source.data
+  if isinstance(data, np.memmap) and isinstance(data.base, mmap.mmap) \
+     and data.filename is not None:
+    order = 'F' if data.flags.f_contiguous and not data.flags.c_contiguous \
+      else 'C'
+    return ('memmap', data.filename, data.dtype.str, data.shape,
+            data.offset, order)
+  module = type(data).__module__.split('.')[0]
+  if module == 'h5py':
+    return ('hdf5', data.file.filename, data.name)
+  # The store may be behind a zarr.LRUStoreCache, see ZarrSource.open.
+  store = getattr(data, 'store', None)
+  store = getattr(store, '_store', store)
+  if module == 'zarr' and getattr(store, 'path', None) is not None:
+    return ('zarr', store.path, data.path)
+  if isinstance(data, BrickVolume):
+    return ('bricks', data.filename)
+  return None
+
+
+def _open_spec(spec):
+  kind = spec[0]
+  if kind == 'memmap':
+    _, filename, dtype, shape, offset, order = spec
+    return np.memmap(filename, dtype=dtype, mode='r', shape=tuple(shape),
+                     offset=offset, order=order)
+  if kind == 'hdf5':
+    import h5py
+    return h5py.File(spec[1], 'r')[spec[2]]
+  if kind == 'zarr':
+    import zarr
+    return zarr.open(spec[1], mode='r', path=spec[2] or None)
+  if kind == 'bricks':
+    return BrickVolume(spec[1])
+  raise ValueError('Unknown data spec {}'.format(spec))
+
+
+def _slab_stats(data, start, stop, n_sample, seed):
+  """ Partial statistics of data[start:stop]: count, min, max, mean, M2 (sum
+  of squared deviations) and a random sample of n_sample values.
+  """
+  if isinstance(data, tuple): # a spec, in a worker process
+    data = _open_spec(data)
+  slab = np.asarray(data[start:stop]).ravel()
+  if slab.dtype.kind == 'f':
+    slab = slab[np.isfinite(slab)] # ignore NaN and dead traces set to inf
+  if slab.size == 0:
+    return (0, np.inf, -np.inf, 0., 0., np.empty(0))
+  mean = slab.mean(dtype=np.float64)
+  m2 = np.sum(np.square(slab - mean, dtype=np.float64))
+  rng = np.random.default_rng(seed)
+  sample = rng.choice(slab, size=min(n_sample, slab.size), replace=False)
+  return (slab.size, slab.min(), slab.max(), mean, m2,
+          sample.astype(np.float64))
+
+
+def compute_stats(vol, percentiles=PERCENTILES, bins=256,
+                  sample_size=1 << 20, slab_size=None, n_workers=None,
+                  sidecar=True):
+  """ Compute the statistics of a volume in one streaming pass over slabs
+  along the x axis, in parallel. The volumes backed by a file (np.memmap
+  from np.load/np.memmap, h5py dataset, Zarr array) are scanned on a process
+  pool, each worker reopening the file; in-memory arrays on a thread pool.
+
+  Parameters:
+  vol: a VolumeSource, or anything as_source accepts.
+  percentiles: the percentiles to estimate.
+  bins: int, number of histogram bins between min and max.
+  sample_size: int, size of the random sample used to estimate the
+    percentiles and the histogram.
+  sidecar: if True, load/save the result in a sidecar file keyed by the file
+    path, size and mtime (see sidecar_path), so the scan happens only once.
+    The sidecar files are in STATS_DIR, or in the directory given instead
+    of True; nothing is written next to the data. False disables them.
+
+  Returns a VolumeStats.
+  """
+  source = as_source(vol)
+  spec = _file_spec(source)
+  key = _sidecar_key(spec) if sidecar and spec is not None else None
+  directory = sidecar if isinstance(sidecar, str) else None
+  if key is not None:
+    stats = load_sidecar(key, directory)
+    if stats is not None:
+      return stats
+
+  shape = source.shape
+  if slab_size is None:
+    # About 64 MB per slab, following the chunks of chunked storage.
+    slab_size = max(1, (64 << 20) // (source.dtype.itemsize
+                                      * shape[1] * shape[2]))
+    chunks = getattr(source.data, 'chunks', None)
+    if chunks is not None:
+      slab_size = max(chunks[0], slab_size // chunks[0] * chunks[0])
+  starts = list(range(0, shape[0], slab_size))
+  total = float(np.prod(shape))
+  n_samples = [int(np.ceil(sample_size * min(slab_size, shape[0] - i)
+                           * shape[1] * shape[2] / total)) for i in starts]
+  n_workers = n_workers or os.cpu_count() or 1
+  n_workers = min(n_workers, len(starts))
+
+  if spec is not None and n_workers > 1:
+    # Spawned workers: forking a process with Qt, a GL context or the
+    # loader threads running can deadlock.
+    executor = ProcessPoolExecutor(
+      max_workers=n_workers, mp_context=multiprocessing.get_context('spawn'))
+    data = spec
+  else:
+    executor = ThreadPoolExecutor(max_workers=n_workers)
+    data = source.data
+  with executor:
+    parts = list(executor.map(_slab_stats, [data] * len(starts), starts,
+      [i + slab_size for i in starts], n_samples, range(len(starts))))
+
+  # Merge the partial moments (Chan et al. parallel algorithm).
+  count, vmin, vmax, mean, m2 = 0, np.inf, -np.inf, 0., 0.
+  for n_b, min_b, max_b, mean_b, m2_b, _ in parts:
+    if n_b == 0:
+      continue
+    n = count + n_b
+    delta = mean_b - mean
+    mean += delta * n_b / n
+    m2 += m2_b + delta**2 * count * n_b / n
+    count = n
+    vmin, vmax = min(vmin, min_b), max(vmax, max_b)
+  if count == 0:
+    raise ValueError('The volume has no finite value.')
+  sample = np.concatenate([part[-1] for part in parts])
+  hist, edges = np.histogram(sample, bins=bins, range=(vmin, vmax))
+  hist = np.round(hist * (count / max(sample.size, 1))).astype(np.int64)
+  stats = VolumeStats(count, vmin, vmax, mean, np.sqrt(m2 / count),
+    dict(zip(percentiles, np.percentile(sample, percentiles))), hist, edges)
+
+  if key is not None:
+    save_sidecar(key, stats, directory)
+  return stats
+
+
+def auto_clim(vol, mode='auto', **kwargs):
+  """ Return the clim of a volume for clim=None/'auto' (min, max) or
+  'robust' (1st to 99th percentiles), using compute_stats. With mode 'auto',
+  the min/max stored with the volume (see VolumeSource.stored_min_max) is
+  used as is, and in-memory arrays use a plain min/max.
+  """
+  source = as_source(vol)
+  if mode is None or mode == 'auto':
+    stored = source.stored_min_max()
+    if stored is not None:
+      return stored
+    if _file_spec(source) is None:
+      return source.min_max()
+  return compute_stats(source, **kwargs).clim(mode)
+
+
+def has_sidecar(vol, directory=None):
+  """ Whether the statistics of vol are already in a sidecar file (in
+  directory, STATS_DIR by default).
+  """
+  spec = _file_spec(as_source(vol))
+  return spec is not None and \
+    load_sidecar(_sidecar_key(spec), directory) is not None
+
+
+# ---------------------------------------------------------------------------
+# Sidecar files.
+
+def _tree_stat(directory):
+  """ The total size and the newest mtime of the files under directory. """
+  size, mtime_ns = 0, 0
+  for root, _, files in os.walk(directory):
+    for name in files:
+      st = os.stat(os.path.join(root, name))
+      size += st.st_size
+      mtime_ns = max(mtime_ns, st.st_mtime_ns)
+  return size, mtime_ns
+
+
+def _sidecar_key(spec):
+  filename = os.path.abspath(spec[1])
+  if os.path.isfile(filename):
+    st = os.stat(filename)
+    size, mtime_ns = st.st_size, st.st_mtime_ns
+  else: # e.g. a zarr directory store
+    array_dir = os.path.join(filename, spec[2] or '')
+    if not any(os.path.isfile(os.path.join(array_dir, meta)) for meta in
+               ('.zarray', '.zgroup', 'zarr.json', 'attributes.json')):
+      return None
+    # The chunk files, not only the metadata: chunks rewritten in place
+    # must invalidate the statistics.
+    size, mtime_ns = _tree_stat(array_dir)
+  return {'path': filename, 'size': size, 'mtime_ns': mtime_ns,
+          'spec': [str(s) for s in spec]}
+
+
+def sidecar_path(key, directory=None):
+  """ The sidecar file of a key in directory (STATS_DIR by default), named
+  after the data file path and its dataset.
+  """
+  directory = os.path.expanduser(directory or STATS_DIR)
+  name = hashlib.sha1(json.dumps(key['spec']).encode()).hexdigest()[:12]
+  return os.path.join(directory, '{}.{}.{}.stats.json'.format(
+    os.path.basename(key['path'].rstrip(os.sep)),
+    hashlib.sha1(key['path'].encode()).hexdigest()[:16], name))
+
+
+def _sidecar_dirs(directory):
+  """ The directories a sidecar file is looked for, or saved in, in order:
+  directory, and STATS_DIR as the fallback.
+  """
+  return [directory, None] if directory is not None else [None]
+
+
+def load_sidecar(key, directory=None):
+  """ Return the VolumeStats saved for key, or None if missing or stale. """
+  if key is None:
+    return None
+  for path in (sidecar_path(key, d) for d in _sidecar_dirs(directory)):
+    try:
+      with open(path) as f:
+        content = json.load(f)
+    except (OSError, ValueError):
+      continue
+    if content.get('key') == key: # else the file changed since
+      return VolumeStats.from_dict(content['stats'])
+  return None
+
+
+def save_sidecar(key, stats, directory=None):
+  """ Save the VolumeStats of key in directory, or in STATS_DIR if the
+  directory is not writable. The statistics are only cached, so a sidecar
+  that cannot be written anywhere is skipped.
+  """
+  for path in (sidecar_path(key, d) for d in _sidecar_dirs(directory)):
+    try:
+      os.makedirs(os.path.dirname(path), exist_ok=True)
+      with open(path, 'w') as f:
+        json.dump({'key': key, 'stats': stats.to_dict()}, f)
+      return path
+    except OSError: # e.g. PermissionError
+      continue
+  return None
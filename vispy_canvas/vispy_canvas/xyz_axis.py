@@ -80,6 +80,15 @@ class XYZAxis(scene.visuals.XYZAxis):
     # self.loc in order to get a relative anchor position.
     self.anchor = list(np.array(click_pos[:2]) - np.array(self.loc))
 
+  def intersect(self, pos):
+    """ Whether the canvas position pos is on the axis legend, i.e. within
+    its highlight circle (see slice_picking.pick_visual). The legend is
+    drawn over the scene, so a hit has the depth -inf; None otherwise.
+    """
+    if np.linalg.norm(np.array(pos[:2]) - np.array(self.loc)) <= self.size:
+      return -np.inf
+    return None
+
   def drag_visual_node(self, mouse_move_event):
     """ Drag this visual node while holding left click in the selection mode
     (<Ctrl> pressed). The highlighted axis will move with the mouse (the anchor
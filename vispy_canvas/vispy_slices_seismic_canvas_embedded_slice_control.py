@@ -2,6 +2,7 @@ import numpy as np
 from PyQt5 import QtWidgets, QtCore
 from vispy import scene
 from vispy_canvas import volume_slices, XYZAxis, CanvasControls, AxisAlignedImage
+from vispy_canvas.slice_loader import SliceLoader
 from typing import Union, Tuple, List, Dict
 
 IMAGE_SHAPE = (600, 800)  # (height, width)
@@ -88,6 +89,9 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls):
         for slice_ in self.slices:
             slice_.parent = self.view.scene
 
+        # Read the slices moved by the controls on a worker thread.
+        self.loader = SliceLoader()
+
         # Set up a 3D camera
         self.camera = scene.cameras.TurntableCamera(parent=self.view.scene, 
                                                     azimuth=self.azimuth, 
@@ -132,9 +136,10 @@ class CanvasWrapper(scene.SceneCanvas, CanvasControls):
         
         pos = int(pos)
         
+        # Only the newest position of each slice is read, off the GUI thread.
         for node in self.slices:
             if isinstance(node, AxisAlignedImage) and node.axis == axis:
-                node._update_location(pos)
+                self.loader.request(node, pos)
 
 class MyMainWindow(QtWidgets.QMainWindow):
     def __init__(self, *args, **kwargs):